@@ -1,6 +1,7 @@
 import os
 from flask import Flask
 from AEngineApps.json_dict import JsonDict
+from AEngineApps.warmup import warmup
 import netifaces
 from importlib import import_module
 import webview
@@ -14,6 +15,7 @@ class App:
         self.flask.root_path = self.project_root
         self.__config = {}
         self.window = None
+        self.warmup = warmup
     
     def add_router(self, path: str, view_func: callable, **options):
         self.flask.add_url_rule(path, view_func=view_func, **options)
@@ -24,8 +26,13 @@ class App:
             
     def load_config(self, path, encoding="utf-8"):
         self.config = JsonDict(path, encoding)
-    
+
+    def warm_up(self, name: str, factory: callable):
+        self.warmup.register(name, factory)
+
     def run(self):
+        # Тяжёлые ресурсы грузятся в фоне, сервер поднимается сразу
+        self.warmup.start()
         host = self.config.get("host")
         port = self.config.get("port")
         interfaces = [] 
@@ -78,6 +85,16 @@ class App:
                     self.add_router(cls.route, call, **options)
 
 
+            if value.get("warmup"):
+                for name, target in value["warmup"].items():
+                    # "module:attr" или ["module:attr", аргументы...]
+                    args = []
+                    if isinstance(target, list):
+                        target, *args = target
+                    module, attr = target.split(":")
+                    func = getattr(import_module(module), attr)
+                    self.warm_up(name, lambda func=func, args=args: func(*args))
+
             if value.get("root_path"):
                 self.flask.root_path = value["root_path"]
             for prop, value in value.items():       
@@ -0,0 +1,133 @@
+"""
+Прогрев тяжёлых ресурсов при старте приложения.
+
+Ресурс объявляется фабрикой без аргументов; App.run() запускает все фабрики
+в фоновых потоках, а экраны спрашивают состояние и не блокируют запрос, пока
+ресурс грузится.
+"""
+
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class NotReady(Exception):
+    """Ресурс ещё загружается или не смог загрузиться."""
+
+    def __init__(self, name: str, state: str, error: Optional[str] = None):
+        self.name = name
+        self.state = state
+        self.error = error
+        super().__init__(f"Resource '{name}' is {state}" + (f": {error}" if error else ""))
+
+
+class _Resource:
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self.factory = factory
+        self.state = PENDING
+        self.value = None
+        self.error: Optional[str] = None
+        self.started_at = 0.0
+        self.finished_at = 0.0
+        self.done = threading.Event()
+
+    def info(self) -> dict:
+        if self.started_at:
+            elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        else:
+            elapsed = 0.0
+        info = {"state": self.state, "elapsed_sec": round(elapsed, 3)}
+        if self.error:
+            info["error"] = self.error
+        return info
+
+
+class Warmup:
+    """
+    Реестр тяжёлых ресурсов (модели, OCR, клиенты API), которые создаются
+    в фоновых потоках при старте приложения, а не в первом запросе, которому они нужны.
+    """
+
+    def __init__(self):
+        self._resources: Dict[str, _Resource] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        with self._lock:
+            if name not in self._resources:
+                self._resources[name] = _Resource(name, factory)
+
+    def start(self, name: Optional[str] = None):
+        """Запускает загрузку одного ресурса (или всех ещё не начатых) в фоновых потоках."""
+        with self._lock:
+            if name is not None:
+                resources = [self._resources[name]]
+            else:
+                resources = list(self._resources.values())
+            to_start = [r for r in resources if r.state == PENDING]
+            for resource in to_start:
+                resource.state = LOADING
+                resource.started_at = time.monotonic()
+        for resource in to_start:
+            threading.Thread(
+                target=self._load, args=(resource,), name=f"Warmup-{resource.name}", daemon=True
+            ).start()
+
+    def retry_failed(self):
+        """Повторяет загрузку ресурсов, которые упали (например, микрофон подключили позже)."""
+        with self._lock:
+            for resource in self._resources.values():
+                if resource.state == FAILED:
+                    resource.state = PENDING
+                    resource.error = None
+                    resource.started_at = resource.finished_at = 0.0
+                    resource.done.clear()
+        self.start()
+
+    def state(self, name: str) -> str:
+        """Текущее состояние ресурса; если загрузку ещё никто не начал — начинает."""
+        self.start(name)
+        return self._resources[name].state
+
+    def get(self, name: str, timeout: Optional[float] = 0.0) -> Any:
+        """
+        Возвращает загруженный ресурс, ожидая не дольше timeout секунд (None — без ограничения).
+        Если ресурс ещё грузится или загрузка упала — NotReady.
+        """
+        self.start(name)
+        resource = self._resources[name]
+        resource.done.wait(timeout)
+        if resource.state != READY:
+            raise NotReady(name, resource.state, resource.error)
+        return resource.value
+
+    def status(self) -> dict:
+        with self._lock:
+            resources = list(self._resources.values())
+        ready = sum(1 for r in resources if r.state == READY)
+        return {
+            "ready": ready == len(resources),
+            "progress": ready / len(resources) if resources else 1.0,
+            "resources": {r.name: r.info() for r in resources},
+        }
+
+    def _load(self, resource: _Resource):
+        try:
+            resource.value = resource.factory()
+            resource.state = READY
+        except Exception as e:
+            resource.error = f"{type(e).__name__}: {e}"
+            resource.state = FAILED
+        finally:
+            resource.finished_at = time.monotonic()
+            resource.done.set()
+
+
+# Общий на процесс реестр: его заполняют App и экраны
+warmup = Warmup()
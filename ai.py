@@ -6,13 +6,17 @@ GitHub Models API Client с поддержкой чата и OCR
 
 import os
 import json
+import time
 import base64
-from typing import List, Dict, Optional, Union, Tuple
+import asyncio
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Dict, Iterator, Optional, Sequence, Union, Tuple
 from io import BytesIO
 from pathlib import Path
 
 try:
-    from openai import OpenAI
+    from openai import APIConnectionError, InternalServerError, RateLimitError
     import tiktoken
 except ImportError:
     print("Установите необходимые библиотеки: pip install openai tiktoken pillow pytesseract easyocr")
@@ -23,6 +27,23 @@ try:
 except ImportError:
     print("Для OCR установите: pip install pillow")
 
+from latency_stats import LatencyHistogram
+from response_cache import ResponseCache
+from rate_limiter import RateLimiter, INTERACTIVE, BATCH
+from client_registry import registry
+
+
+# Служебные токены: на каждое сообщение, на поле name и на начало ответа ассистента
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+REPLY_PRIMING_TOKENS = 3
+
+# Адрес OpenAI-совместимого API GitHub Models
+GITHUB_MODELS_URL = "https://models.github.ai/inference"
+
+# Ошибки, после которых запрос повторяется по расписанию RateLimiter
+RETRYABLE_ERRORS = (RateLimitError, InternalServerError, APIConnectionError)
+
 
 class GitHubModelsClient:
     """
@@ -35,7 +56,10 @@ class GitHubModelsClient:
         github_token: Optional[str] = None,
         model: str = "gpt-4o",
         max_tokens: int = 4096,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        base_url: str = GITHUB_MODELS_URL,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None
     ):
         """
         Инициализация клиента GitHub Models.
@@ -45,6 +69,10 @@ class GitHubModelsClient:
             model: Название модели (например, "gpt-4o", "gpt-4o-mini")
             max_tokens: Максимальное количество токенов в ответе
             temperature: Температура генерации (0.0 - 1.0)
+            base_url: Адрес OpenAI-совместимого API (например, локальной заглушки)
+            cache: Кэш ответов single_request для детерминированных запросов
+            rate_limiter: Бюджеты RPM/TPM и повторы после 429; общий для клиентов
+                одного токена. По умолчанию — без бюджетов, только повторы
         """
         self.token = github_token or os.environ.get("GITHUB_TOKEN")
         if not self.token:
@@ -56,36 +84,87 @@ class GitHubModelsClient:
         self.model = model
         self.max_tokens = max_tokens
         self.temperature = temperature
+        self.base_url = base_url
+        self.cache = cache
+        self.rate_limiter = rate_limiter or RateLimiter()
 
-        # Инициализация OpenAI клиента для GitHub Models
-        self.client = OpenAI(
-            base_url="https://models.github.ai/inference",
-            api_key=self.token
-        )
+        # OpenAI клиент для GitHub Models: общий пул соединений для всех клиентов с этим токеном
+        self.client = self._make_client()
 
-        # Инициализация токенайзера для подсчета токенов
-        try:
-            self.encoding = tiktoken.encoding_for_model("gpt-4")
-        except KeyError:
-            self.encoding = tiktoken.get_encoding("cl100k_base")
+        # Токенайзер для подсчета токенов, общий для всех клиентов этой модели
+        self.encoding = registry.encoding(self.model)
 
-    def single_request(
-        self, 
-        prompt: str, 
-        system_prompt: Optional[str] = None,
-        **kwargs
-    ) -> str:
-        """
-        Одиночное обращение к AI без сохранения истории.
+        # Время до первого токена потоковых ответов (от отправки запроса до первой дельты)
+        self.ttft = LatencyHistogram()
+        self.last_ttft: Optional[float] = None
 
-        Args:
-            prompt: Пользовательский запрос
-            system_prompt: Системный промпт для настройки поведения модели
-            **kwargs: Дополнительные параметры (model, temperature, max_tokens)
+    def _make_client(self):
+        # Повторы выполняет RateLimiter, встроенные повторы клиента отключены
+        return registry.client(self.base_url, self.token, max_retries=0)
 
-        Returns:
-            Ответ модели в виде строки
+    def _reserve(self, request_params: dict, prompt_tokens: Optional[int]) -> int:
+        """Оценка токенов запроса для бюджета TPM: промпт плюс максимум ответа."""
+        if prompt_tokens is None:
+            prompt_tokens = self.count_tokens(request_params["messages"])
+        return prompt_tokens + request_params["max_tokens"]
+
+    def _retry_sleep(self, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Сколько ждать перед повтором после ошибки; None — повторов больше нет.
+        После 429 ждут все запросы через RateLimiter, поэтому локальная пауза — 0.
         """
+        if attempt >= self.rate_limiter.max_retries:
+            return None
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if isinstance(error, RateLimitError):
+            self.rate_limiter.throttle(headers, attempt)
+            return 0.0
+        return self.rate_limiter.retry_delay(attempt, headers)
+
+    def _create(self, request_params: dict, priority: int = INTERACTIVE, prompt_tokens: Optional[int] = None):
+        """Запрос к API через RateLimiter: ожидание бюджета и повторы после 429, 5xx и сетевых ошибок."""
+        reserved = self._reserve(request_params, prompt_tokens)
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(reserved, priority)
+            # Резерв уточняется при любом исходе: запрос не дошёл или упал — токены возвращаются
+            used: Optional[int] = 0
+            try:
+                raw = self.client.chat.completions.with_raw_response.create(**request_params)
+                # Ответ получен: без usage (поток, ошибка разбора) резерв остаётся как есть
+                used = None
+                self.rate_limiter.update(raw.headers)
+                response = raw.parse()
+                used = getattr(getattr(response, "usage", None), "total_tokens", None)
+                return response
+            except RETRYABLE_ERRORS as e:
+                delay = self._retry_sleep(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self.rate_limiter.settle(reserved, used)
+            time.sleep(delay)
+            attempt += 1
+
+    def _request_params(self, messages: List[Dict[str, str]], kwargs: dict) -> dict:
+        """Параметры запроса: значения клиента, переопределенные kwargs (model, temperature, max_tokens)."""
+        return {
+            "model": kwargs.get("model", self.model),
+            "messages": messages,
+            "temperature": kwargs.get("temperature", self.temperature),
+            "max_tokens": kwargs.get("max_tokens", self.max_tokens)
+        }
+
+    def _cache_key(self, request_params: dict, bypass_cache: bool) -> Optional[str]:
+        """Ключ кэша для запроса; None — кэш не используется."""
+        if self.cache is None:
+            return None
+        if bypass_cache:
+            self.cache.record_bypass()
+            return None
+        return self.cache.key(request_params)
+
+    def _prompt_messages(self, prompt: str, system_prompt: Optional[str]) -> List[Dict[str, str]]:
         messages = []
 
         if system_prompt:
@@ -98,17 +177,78 @@ class GitHubModelsClient:
             "role": "user",
             "content": prompt
         })
+        return messages
 
+    def single_request(
+        self, 
+        prompt: str, 
+        system_prompt: Optional[str] = None,
+        stream: bool = False,
+        bypass_cache: bool = False,
+        **kwargs
+    ) -> Union[str, Iterator[str]]:
+        """
+        Одиночное обращение к AI без сохранения истории.
+
+        Args:
+            prompt: Пользовательский запрос
+            system_prompt: Системный промпт для настройки поведения модели
+            stream: Вернуть генератор фрагментов ответа по мере их генерации (мимо кэша)
+            bypass_cache: Не брать ответ из кэша и не сохранять его туда
+            **kwargs: Дополнительные параметры (model, temperature, max_tokens,
+                priority — INTERACTIVE или BATCH для RateLimiter)
+
+        Returns:
+            Ответ модели в виде строки или генератор фрагментов (stream=True)
+        """
         # Параметры запроса
-        request_params = {
-            "model": kwargs.get("model", self.model),
-            "messages": messages,
-            "temperature": kwargs.get("temperature", self.temperature),
-            "max_tokens": kwargs.get("max_tokens", self.max_tokens)
-        }
+        request_params = self._request_params(self._prompt_messages(prompt, system_prompt), kwargs)
+        priority = kwargs.get("priority", INTERACTIVE)
+
+        if stream:
+            return self._stream_completion(request_params, priority)
+
+        key = self._cache_key(request_params, bypass_cache)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        response = self._create(request_params, priority)
+        content = response.choices[0].message.content
+        if key is not None and content is not None:
+            self.cache.put(key, content)
+        return content
 
-        response = self.client.chat.completions.create(**request_params)
-        return response.choices[0].message.content
+    def _stream_completion(
+        self,
+        request_params: dict,
+        priority: int = INTERACTIVE,
+        prompt_tokens: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        Потоковый запрос: отдает фрагменты текста ответа по мере генерации.
+        Запрос уходит при первом обращении к генератору; время до первого
+        непустого фрагмента записывается в self.ttft и self.last_ttft.
+        """
+        started = time.perf_counter()
+        self.last_ttft = None
+        response = self._create(dict(request_params, stream=True), priority, prompt_tokens)
+        try:
+            for chunk in response:
+                # Служебные чанки (например, результаты фильтров) приходят без choices
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if self.last_ttft is None:
+                    self.last_ttft = time.perf_counter() - started
+                    self.ttft.add(self.last_ttft)
+                yield delta
+        finally:
+            # Генератор бросили на середине — закрываем HTTP-соединение сразу
+            response.close()
 
     def count_tokens(self, messages: List[Dict[str, str]]) -> int:
         """
@@ -120,21 +260,182 @@ class GitHubModelsClient:
         Returns:
             Общее количество токенов
         """
-        num_tokens = 0
-        tokens_per_message = 3  # Каждое сообщение добавляет служебные токены
-        tokens_per_name = 1
+        num_tokens = sum(self.message_tokens(message) for message in messages)
+        num_tokens += REPLY_PRIMING_TOKENS
+        return num_tokens
 
-        for message in messages:
-            num_tokens += tokens_per_message
-            for key, value in message.items():
-                num_tokens += len(self.encoding.encode(value))
-                if key == "name":
-                    num_tokens += tokens_per_name
+    def message_tokens(self, message: Dict[str, str]) -> int:
+        """
+        Количество токенов одного сообщения вместе со служебными.
+
+        Args:
+            message: Сообщение формата {"role": "...", "content": "..."}
 
-        num_tokens += 3  # Токены для начала ответа ассистента
+        Returns:
+            Количество токенов
+        """
+        num_tokens = TOKENS_PER_MESSAGE
+        for key, value in message.items():
+            num_tokens += len(self.encoding.encode(value))
+            if key == "name":
+                num_tokens += TOKENS_PER_NAME
         return num_tokens
 
 
+class ChatMessage:
+    """
+    Сообщение истории чата. Число токенов считается один раз при создании,
+    поэтому подсчет и усечение истории не вызывают токенайзер повторно.
+    """
+
+    __slots__ = ("role", "content", "name", "tokens")
+
+    def __init__(self, role: str, content: str, tokens: int, name: Optional[str] = None):
+        self.role = role
+        self.content = content
+        self.name = name
+        self.tokens = tokens
+
+    def to_dict(self) -> Dict[str, str]:
+        message = {"role": self.role, "content": self.content}
+        if self.name is not None:
+            message["name"] = self.name
+        return message
+
+
+class ChatHistory:
+    """
+    История чата: системный промпт отдельно, остальные сообщения в очереди
+    с текущей суммой токенов. Подсчет токенов — O(1), усечение — один проход
+    по удаляемым сообщениям.
+
+    Для совместимости с прежним ChatSession.history (списком словарей) история
+    читается как список: len(), итерация и индексы дают словари {"role", "content"},
+    append() принимает и словарь сообщения. Сам объект не сериализуется в JSON —
+    для json.dump и изменения списка напрямую есть копия messages().
+    """
+
+    def __init__(self, counter: Callable[[Dict[str, str]], int]):
+        """
+        Args:
+            counter: Функция подсчета токенов одного сообщения (см. message_tokens)
+        """
+        self._counter = counter
+        self.system: Optional[ChatMessage] = None
+        self._messages: Deque[ChatMessage] = deque()
+        self._tokens = 0
+
+    def __len__(self) -> int:
+        return len(self._messages) + (1 if self.system is not None else 0)
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        for item in self._items():
+            yield item.to_dict()
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, str], List[Dict[str, str]]]:
+        if isinstance(index, slice):
+            return self.to_list()[index]
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("индекс вне истории чата")
+        if self.system is not None:
+            if index == 0:
+                return self.system.to_dict()
+            index -= 1
+        return self._messages[index].to_dict()
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (ChatHistory, list)):
+            return self.to_list() == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def _items(self) -> Iterator[ChatMessage]:
+        if self.system is not None:
+            yield self.system
+        yield from self._messages
+
+    def _make(self, message: Dict[str, str]) -> ChatMessage:
+        return ChatMessage(message["role"], message["content"], self._counter(message), message.get("name"))
+
+    def append(
+        self, role: Union[str, Dict[str, str]], content: Optional[str] = None, name: Optional[str] = None
+    ) -> ChatMessage:
+        """
+        Добавить сообщение в конец истории (системный промпт задается через set_system).
+        Как у прежнего списка, можно передать словарь: append({"role": ..., "content": ...});
+        системное сообщение в пустую историю становится системным промптом.
+        """
+        if isinstance(role, dict):
+            message = role
+        else:
+            message = {"role": role, "content": content}
+            if name is not None:
+                message["name"] = name
+        item = self._make(message)
+        if item.role == "system" and self.system is None and not self._messages:
+            self.system = item
+            return item
+        self._messages.append(item)
+        self._tokens += item.tokens
+        return item
+
+    def set_system(self, content: Optional[str]):
+        """Установить системный промпт; None — убрать."""
+        self.system = None if content is None else self._make({"role": "system", "content": content})
+
+    def token_count(self) -> int:
+        """Токены всей истории, как count_tokens(to_list()), за O(1)."""
+        system_tokens = self.system.tokens if self.system is not None else 0
+        return system_tokens + self._tokens + REPLY_PRIMING_TOKENS
+
+    def truncate(self, max_tokens: int) -> int:
+        """
+        Удаляет самые старые сообщения (вместе с ответом ассистента на них),
+        пока история не войдет в лимит. Системный промпт сохраняется.
+
+        Returns:
+            Количество удаленных сообщений
+        """
+        removed = 0
+        messages = self._messages
+        while messages and self.token_count() > max_tokens:
+            self._tokens -= messages.popleft().tokens
+            removed += 1
+            if messages and messages[0].role == "assistant":
+                self._tokens -= messages.popleft().tokens
+                removed += 1
+        return removed
+
+    def clear(self, keep_system: bool = True):
+        self._messages.clear()
+        self._tokens = 0
+        if not keep_system:
+            self.system = None
+
+    def load(self, messages: List[Dict[str, str]]):
+        """Заменить историю списком сообщений формата [{"role": "...", "content": "..."}]."""
+        self.clear(keep_system=False)
+        for message in messages:
+            item = self._make(message)
+            if item.role == "system" and self.system is None and not self._messages:
+                self.system = item
+            else:
+                self._messages.append(item)
+                self._tokens += item.tokens
+
+    def to_list(self) -> List[Dict[str, str]]:
+        """История в формате API: [{"role": "...", "content": "..."}]."""
+        return [message.to_dict() for message in self._items()]
+
+    def messages(self) -> List[Dict[str, str]]:
+        """Копия истории списком словарей — то, чем был ChatSession.history до ChatHistory."""
+        return self.to_list()
+
+
 class ChatSession(GitHubModelsClient):
     """
     Класс для чат-сессии с автоматическим управлением историей.
@@ -148,7 +449,9 @@ class ChatSession(GitHubModelsClient):
         max_tokens: int = 4096,
         temperature: float = 0.7,
         max_history_tokens: int = 8000,
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        base_url: str = GITHUB_MODELS_URL,
+        rate_limiter: Optional[RateLimiter] = None
     ):
         """
         Инициализация чат-сессии.
@@ -160,19 +463,34 @@ class ChatSession(GitHubModelsClient):
             temperature: Температура генерации
             max_history_tokens: Максимальное количество токенов в истории
             system_prompt: Системный промпт (сохраняется на протяжении всей сессии)
+            base_url: Адрес OpenAI-совместимого API
+            rate_limiter: Общий ограничитель запросов (см. GitHubModelsClient)
         """
-        super().__init__(github_token, model, max_tokens, temperature)
+        super().__init__(github_token, model, max_tokens, temperature, base_url, rate_limiter=rate_limiter)
 
         self.max_history_tokens = max_history_tokens
-        self.history: List[Dict[str, str]] = []
+        self._history = ChatHistory(self.message_tokens)
         self.system_prompt = system_prompt
 
         # Добавляем системный промпт, если он указан
         if system_prompt:
-            self.history.append({
-                "role": "system",
-                "content": system_prompt
-            })
+            self.history.set_system(system_prompt)
+
+    @property
+    def history(self) -> ChatHistory:
+        """
+        История чата. Раньше это был список словарей; ChatHistory читается так же
+        (len, итерация, индексы, append словаря), а список целиком — history.messages().
+        """
+        return self._history
+
+    @history.setter
+    def history(self, messages: Union[ChatHistory, List[Dict[str, str]]]):
+        # Присваивание списка, как раньше, заменяет содержимое истории
+        if isinstance(messages, ChatHistory):
+            self._history = messages
+        else:
+            self._history.load(list(messages))
 
     def set_system_prompt(self, system_prompt: str):
         """
@@ -181,15 +499,8 @@ class ChatSession(GitHubModelsClient):
         Args:
             system_prompt: Новый системный промпт
         """
-        # Удаляем старый системный промпт, если он есть
-        if self.history and self.history[0]["role"] == "system":
-            self.history.pop(0)
-
-        # Добавляем новый системный промпт в начало
-        self.history.insert(0, {
-            "role": "system",
-            "content": system_prompt
-        })
+        # Старый системный промпт заменяется новым
+        self.history.set_system(system_prompt)
         self.system_prompt = system_prompt
 
     def _truncate_history(self):
@@ -197,68 +508,54 @@ class ChatSession(GitHubModelsClient):
         Усечение истории для соблюдения лимита токенов.
         Удаляет старые сообщения, сохраняя системный промпт.
         """
-        # Сохраняем системный промпт
-        system_message = None
-        messages = self.history.copy()
-
-        if messages and messages[0]["role"] == "system":
-            system_message = messages.pop(0)
-
-        # Удаляем старые сообщения, пока не войдем в лимит
-        while messages and self.count_tokens(
-            [system_message] + messages if system_message else messages
-        ) > self.max_history_tokens:
-            # Удаляем самое старое сообщение (пару user-assistant)
-            messages.pop(0)
-            if messages and messages[0]["role"] == "assistant":
-                messages.pop(0)
+        self.history.truncate(self.max_history_tokens)
 
-        # Восстанавливаем историю с системным промптом
-        self.history = []
-        if system_message:
-            self.history.append(system_message)
-        self.history.extend(messages)
-
-    def chat(self, user_message: str, **kwargs) -> str:
+    def chat(self, user_message: str, stream: bool = False, **kwargs) -> Union[str, Iterator[str]]:
         """
         Отправка сообщения в чат с сохранением истории.
 
         Args:
             user_message: Сообщение пользователя
+            stream: Вернуть генератор фрагментов ответа; ответ попадает
+                в историю один раз, когда поток закончился
             **kwargs: Дополнительные параметры (model, temperature, max_tokens)
 
         Returns:
-            Ответ модели в виде строки
+            Ответ модели в виде строки или генератор фрагментов (stream=True)
         """
         # Добавляем сообщение пользователя в историю
-        self.history.append({
-            "role": "user",
-            "content": user_message
-        })
+        self.history.append("user", user_message)
 
         # Усекаем историю, если превышен лимит
         self._truncate_history()
 
         # Параметры запроса
-        request_params = {
-            "model": kwargs.get("model", self.model),
-            "messages": self.history,
-            "temperature": kwargs.get("temperature", self.temperature),
-            "max_tokens": kwargs.get("max_tokens", self.max_tokens)
-        }
+        request_params = self._request_params(self.history.to_list(), kwargs)
+
+        if stream:
+            # Запрос уходит лениво; история уже зафиксирована в to_list() на момент вызова
+            return self._chat_stream(request_params, self.history.token_count())
 
         # Отправляем запрос
-        response = self.client.chat.completions.create(**request_params)
+        response = self._create(request_params, INTERACTIVE, self.history.token_count())
         assistant_message = response.choices[0].message.content
 
         # Добавляем ответ ассистента в историю
-        self.history.append({
-            "role": "assistant",
-            "content": assistant_message
-        })
+        self.history.append("assistant", assistant_message)
 
         return assistant_message
 
+    def _chat_stream(self, request_params: dict, prompt_tokens: int) -> Iterator[str]:
+        parts = []
+        try:
+            for delta in self._stream_completion(request_params, INTERACTIVE, prompt_tokens):
+                parts.append(delta)
+                yield delta
+        finally:
+            # Прерванный ответ тоже сохраняем: пользователь уже видел эту часть
+            if parts:
+                self.history.append("assistant", "".join(parts))
+
     def get_history(self) -> List[Dict[str, str]]:
         """
         Получить текущую историю чата.
@@ -266,7 +563,7 @@ class ChatSession(GitHubModelsClient):
         Returns:
             Список сообщений
         """
-        return self.history.copy()
+        return self.history.to_list()
 
     def clear_history(self, keep_system_prompt: bool = True):
         """
@@ -275,13 +572,9 @@ class ChatSession(GitHubModelsClient):
         Args:
             keep_system_prompt: Сохранить системный промпт
         """
+        self.history.clear(keep_system=keep_system_prompt)
         if keep_system_prompt and self.system_prompt:
-            self.history = [{
-                "role": "system",
-                "content": self.system_prompt
-            }]
-        else:
-            self.history = []
+            self.history.set_system(self.system_prompt)
 
     def get_token_count(self) -> int:
         """
@@ -290,7 +583,7 @@ class ChatSession(GitHubModelsClient):
         Returns:
             Количество токенов
         """
-        return self.count_tokens(self.history)
+        return self.history.token_count()
 
     def save_history(self, filepath: str):
         """
@@ -300,7 +593,7 @@ class ChatSession(GitHubModelsClient):
             filepath: Путь к файлу для сохранения
         """
         with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.history, f, ensure_ascii=False, indent=2)
+            json.dump(self.history.to_list(), f, ensure_ascii=False, indent=2)
 
     def load_history(self, filepath: str):
         """
@@ -310,7 +603,219 @@ class ChatSession(GitHubModelsClient):
             filepath: Путь к файлу с историей
         """
         with open(filepath, 'r', encoding='utf-8') as f:
-            self.history = json.load(f)
+            self.history.load(json.load(f))
+
+
+class AsyncGitHubModelsClient(GitHubModelsClient):
+    """
+    Асинхронный клиент GitHub Models на базе AsyncOpenAI.
+    Позволяет отправлять много запросов параллельно (batch_request) с ограничением
+    числа одновременных запросов. Для кода вне asyncio есть синхронные обертки
+    (*_sync), которые выполняют корутины в фоновом цикле событий клиента.
+    """
+
+    # Фоновый цикл событий для синхронных оберток; создается при первом вызове
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _loop_lock = threading.Lock()
+
+    def _make_client(self):
+        # Свой клиент: асинхронные соединения привязаны к циклу событий
+        return registry.async_client(self.base_url, self.token, max_retries=0)
+
+    async def _create(self, request_params: dict, priority: int = INTERACTIVE, prompt_tokens: Optional[int] = None):
+        """Асинхронный вариант GitHubModelsClient._create."""
+        reserved = self._reserve(request_params, prompt_tokens)
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire_async(reserved, priority)
+            # Резерв уточняется при любом исходе: запрос не дошёл или упал — токены возвращаются
+            used: Optional[int] = 0
+            try:
+                raw = await self.client.chat.completions.with_raw_response.create(**request_params)
+                # Ответ получен: без usage (поток, ошибка разбора) резерв остаётся как есть
+                used = None
+                self.rate_limiter.update(raw.headers)
+                response = raw.parse()
+                used = getattr(getattr(response, "usage", None), "total_tokens", None)
+                return response
+            except RETRYABLE_ERRORS as e:
+                delay = self._retry_sleep(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self.rate_limiter.settle(reserved, used)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def single_request(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        bypass_cache: bool = False,
+        **kwargs
+    ) -> str:
+        """
+        Одиночное обращение к AI без сохранения истории.
+
+        Args:
+            prompt: Пользовательский запрос
+            system_prompt: Системный промпт для настройки поведения модели
+            bypass_cache: Не брать ответ из кэша и не сохранять его туда
+            **kwargs: Дополнительные параметры (model, temperature, max_tokens, priority)
+
+        Returns:
+            Ответ модели в виде строки
+        """
+        request_params = self._request_params(self._prompt_messages(prompt, system_prompt), kwargs)
+        key = self._cache_key(request_params, bypass_cache)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        response = await self._create(request_params, kwargs.get("priority", INTERACTIVE))
+        content = response.choices[0].message.content
+        if key is not None and content is not None:
+            self.cache.put(key, content)
+        return content
+
+    async def batch_request(
+        self,
+        prompts: Sequence[str],
+        system_prompt: Optional[str] = None,
+        concurrency: int = 4,
+        **kwargs
+    ) -> List[Union[str, Exception]]:
+        """
+        Пакет одиночных запросов, не больше concurrency одновременно.
+
+        Ошибка одного запроса не прерывает остальные: на его месте в результате
+        будет исключение. При отмене batch_request отменяются все запросы в работе.
+
+        Args:
+            prompts: Пользовательские запросы
+            system_prompt: Общий системный промпт
+            concurrency: Максимальное число одновременных запросов
+            **kwargs: Дополнительные параметры (model, temperature, max_tokens);
+                приоритет по умолчанию — BATCH, интерактивные запросы идут раньше
+
+        Returns:
+            Ответы (или исключения) в порядке prompts
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency должен быть не меньше 1")
+        kwargs.setdefault("priority", BATCH)
+
+        results: List[Union[str, Exception, None]] = [None] * len(prompts)
+        # Общий итератор: каждый исполнитель берет следующий запрос, как только освободился
+        pending = iter(enumerate(prompts))
+
+        async def worker():
+            for index, prompt in pending:
+                try:
+                    results[index] = await self.single_request(prompt, system_prompt, **kwargs)
+                except Exception as e:
+                    results[index] = e
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(min(concurrency, len(prompts)))]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            # Отмена (или KeyboardInterrupt): дожидаемся, пока все запросы действительно остановятся
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+        return results
+
+    async def aclose(self):
+        """Закрыть HTTP-соединения клиента."""
+        await self.client.close()
+
+    # =========================
+    # Синхронные обертки
+    # =========================
+
+    def single_request_sync(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
+        """single_request для кода вне asyncio."""
+        return self._run_sync(self.single_request(prompt, system_prompt, **kwargs))
+
+    def batch_request_sync(
+        self,
+        prompts: Sequence[str],
+        system_prompt: Optional[str] = None,
+        concurrency: int = 4,
+        **kwargs
+    ) -> List[Union[str, Exception]]:
+        """batch_request для кода вне asyncio."""
+        return self._run_sync(self.batch_request(prompts, system_prompt, concurrency, **kwargs))
+
+    def close(self):
+        """Закрыть HTTP-соединения и остановить фоновый цикл событий."""
+        if self._loop is None:
+            return
+        self._run_sync(self.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+    def _run_sync(self, coro: Awaitable):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            coro.close()
+            raise RuntimeError("Синхронная обертка вызвана внутри цикла событий; используйте await")
+
+        # Один долгоживущий цикл: соединения AsyncOpenAI привязаны к циклу, в котором открыты
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="AsyncModelsLoop", daemon=True).start()
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result()
+        except BaseException:
+            # Например, Ctrl+C в вызывающем потоке — отменяем запросы в фоновом цикле
+            future.cancel()
+            raise
+
+
+class AsyncChatSession(AsyncGitHubModelsClient, ChatSession):
+    """
+    Асинхронная чат-сессия: история и усечение как у ChatSession, запросы через AsyncOpenAI.
+    Сообщения одной сессии обрабатываются по очереди, чтобы не перемешать историю.
+    """
+
+    _chat_lock: Optional[asyncio.Lock] = None
+
+    async def chat(self, user_message: str, **kwargs) -> str:
+        """
+        Отправка сообщения в чат с сохранением истории.
+
+        Args:
+            user_message: Сообщение пользователя
+            **kwargs: Дополнительные параметры (model, temperature, max_tokens)
+
+        Returns:
+            Ответ модели в виде строки
+        """
+        if self._chat_lock is None:
+            self._chat_lock = asyncio.Lock()
+        async with self._chat_lock:
+            self.history.append("user", user_message)
+            self._truncate_history()
+
+            request_params = self._request_params(self.history.to_list(), kwargs)
+            response = await self._create(request_params, INTERACTIVE, self.history.token_count())
+            assistant_message = response.choices[0].message.content
+
+            self.history.append("assistant", assistant_message)
+            return assistant_message
+
+    def chat_sync(self, user_message: str, **kwargs) -> str:
+        """chat для кода вне asyncio."""
+        return self._run_sync(self.chat(user_message, **kwargs))
 
 
 class TesseractOCR:
@@ -640,6 +1145,40 @@ def example_chat_session():
     print(f"Токенов в истории: {chat.get_token_count()}\n")
 
 
+def example_streaming_chat():
+    """Пример потокового ответа: текст печатается по мере генерации"""
+    print("=== Пример потокового чата ===")
+
+    chat = ChatSession(
+        github_token="your_github_token_here",
+        model="gpt-4o-mini"
+    )
+
+    print("Ассистент: ", end="", flush=True)
+    for delta in chat.chat("Расскажи короткую историю про робота", stream=True):
+        print(delta, end="", flush=True)
+    print(f"\nДо первого токена: {chat.last_ttft:.3f} с\n")
+
+
+def example_batch_request():
+    """Пример пакета запросов: до 4 одновременно, ответы в порядке вопросов"""
+    print("=== Пример пакетных запросов ===")
+
+    client = AsyncGitHubModelsClient(
+        github_token="your_github_token_here",
+        model="gpt-4o-mini"
+    )
+
+    questions = ["Что такое GIL?", "Что такое asyncio?", "Что такое WAL в SQLite?"]
+    answers = client.batch_request_sync(questions, system_prompt="Отвечай одним предложением.", concurrency=4)
+    for question, answer in zip(questions, answers):
+        if isinstance(answer, Exception):
+            answer = f"ошибка: {answer}"
+        print(f"{question} -> {answer}")
+    client.close()
+    print()
+
+
 def example_tesseract_ocr():
     """Пример использования Tesseract OCR (самый быстрый)"""
     print("=== Пример Tesseract OCR ===")
@@ -688,6 +1227,8 @@ if __name__ == "__main__":
     # Раскомментируйте нужный пример после добавления токена
     # example_single_request()
     # example_chat_session()
+    # example_streaming_chat()
+    # example_batch_request()
     # example_tesseract_ocr()
     example_easyocr()
 
@@ -0,0 +1,392 @@
+"""
+Предобработка звука перед распознавателем: цепочка векторизованных (NumPy) ступеней
+над int16 моно PCM с частотой распознавателя.
+
+Ступени:
+  - highpass — ФВЧ первого порядка: убирает постоянную составляющую и гул ниже cutoff_hz;
+  - denoise  — спектральное вычитание с оценкой шума по минимуму мощности;
+  - gate     — шумовой шлюз: приглушает чанки тише порога;
+  - agc      — автоматическая регулировка усиления к целевому уровню.
+
+Каждая ступень хранит состояние между чанками (хвост фильтра, текущее усиление,
+оценку шума), поэтому на стыках чанков нет щелчков; фильтры (highpass, denoise)
+от нарезки потока не зависят вовсе. Время каждой ступени на чанк копится
+в отдельной гистограмме.
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional, Union
+
+from latency_stats import LatencyHistogram
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+INT16_MAX = 32767.0
+
+# Длина блока для векторизации рекурсивного фильтра
+_IIR_BLOCK = 256
+
+
+def _db_to_gain(db: float) -> float:
+    return 10.0 ** (db / 20.0)
+
+
+def _level_dbfs(x) -> float:
+    if not len(x):
+        return float("-inf")
+    rms = float(np.sqrt(np.dot(x, x) / len(x)))
+    return 20.0 * np.log10(rms / INT16_MAX) if rms > 0 else float("-inf")
+
+
+def _ramp(start: float, end: float, n: int):
+    """Плавный переход усиления внутри чанка — без ступенек («молнии») на стыках."""
+    if start == end:
+        return start
+    return np.linspace(start, end, n, endpoint=False, dtype=np.float32) + (end - start) / n
+
+
+class DSPStage:
+    """Ступень цепочки: float32 моно на входе и выходе, состояние между вызовами."""
+
+    name = "stage"
+
+    def process(self, x):
+        raise NotImplementedError
+
+    def reset(self):
+        pass
+
+    def stats(self) -> Dict[str, object]:
+        return {}
+
+
+class HighPass(DSPStage):
+    """
+    ФВЧ первого порядка y[n] = a * (y[n-1] + x[n] - x[n-1]) — классический DC blocker.
+    Рекурсия считается блоками: внутри блока — умножение на треугольную матрицу степеней a,
+    между блоками переносится только последнее значение.
+    """
+
+    name = "highpass"
+
+    def __init__(self, sample_rate: int = 16000, cutoff_hz: float = 80.0):
+        if np is None:
+            raise RuntimeError("Для предобработки нужен NumPy: pip install numpy")
+        self.cutoff_hz = cutoff_hz
+        self.a = float(np.exp(-2.0 * np.pi * cutoff_hz / sample_rate))
+        k = np.arange(_IIR_BLOCK)
+        lag = k[:, None] - k[None, :]
+        # T[n, k] = a^(n-k) для k <= n: отклик блока при нулевом начальном состоянии
+        self._t = np.where(lag >= 0, self.a ** np.maximum(lag, 0), 0.0).astype(np.float32).T
+        self._carry_gain = (self.a ** (k + 1)).astype(np.float32)
+        self.reset()
+
+    def reset(self):
+        self._x_prev = 0.0
+        self._y_prev = 0.0
+
+    def process(self, x):
+        n = len(x)
+        if not n:
+            return x
+        diff = np.empty(n, dtype=np.float32)
+        diff[0] = x[0] - self._x_prev
+        np.subtract(x[1:], x[:-1], out=diff[1:])
+        self._x_prev = float(x[-1])
+
+        blocks = -(-n // _IIR_BLOCK)
+        padded = np.zeros(blocks * _IIR_BLOCK, dtype=np.float32)
+        padded[:n] = diff * self.a
+        y = (padded.reshape(blocks, _IIR_BLOCK) @ self._t)
+        carry = self._y_prev
+        for row in y:
+            row += self._carry_gain * carry
+            carry = float(row[-1])
+        y = y.reshape(-1)[:n]
+        self._y_prev = float(y[-1])
+        return y
+
+
+class AutomaticGainControl(DSPStage):
+    """
+    Подтягивает уровень речи к target_dbfs. Усиление меняется плавно (attack — вниз,
+    release — вверх) и замораживается на чанках тише noise_floor_dbfs, чтобы в паузах
+    не раздувать шум. Пики ограничиваются, чтобы усиление не давало перегрузку.
+    """
+
+    name = "agc"
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        target_dbfs: float = -20.0,
+        max_gain_db: float = 24.0,
+        min_gain_db: float = -12.0,
+        noise_floor_dbfs: float = -55.0,
+        attack_ms: float = 20.0,
+        release_ms: float = 500.0,
+    ):
+        self.sample_rate = sample_rate
+        self.target_dbfs = target_dbfs
+        self.max_gain_db = max_gain_db
+        self.min_gain_db = min_gain_db
+        self.noise_floor_dbfs = noise_floor_dbfs
+        self.attack_ms = attack_ms
+        self.release_ms = release_ms
+        self.reset()
+
+    def reset(self):
+        self._gain_db = 0.0
+
+    def process(self, x):
+        n = len(x)
+        if not n:
+            return x
+        level = _level_dbfs(x)
+        start = self._gain_db
+        if level > self.noise_floor_dbfs:
+            wanted = min(max(self.target_dbfs - level, self.min_gain_db), self.max_gain_db)
+            tau_ms = self.attack_ms if wanted < start else self.release_ms
+            # Экспоненциальное сглаживание с постоянной времени tau за длительность чанка
+            k = 1.0 - np.exp(-(n * 1000.0 / self.sample_rate) / max(tau_ms, 1e-3))
+            self._gain_db = start + (wanted - start) * float(k)
+        y = x * _ramp(_db_to_gain(start), _db_to_gain(self._gain_db), n)
+        peak = float(np.max(np.abs(y)))
+        if peak > INT16_MAX:
+            # Ограничитель: чанк целиком ужимается до полной шкалы, усиление сразу снижается
+            y *= INT16_MAX / peak
+            self._gain_db += float(20.0 * np.log10(INT16_MAX / peak))
+        return y
+
+    def stats(self) -> Dict[str, object]:
+        return {"gain_db": round(self._gain_db, 2)}
+
+
+class NoiseGate(DSPStage):
+    """
+    Шумовой шлюз: чанки тише threshold_dbfs приглушаются на attenuation_db.
+    Шлюз открывается сразу, а закрывается только после hold_ms тишины — хвосты слов не режутся.
+    """
+
+    name = "gate"
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        threshold_dbfs: float = -50.0,
+        attenuation_db: float = -30.0,
+        hold_ms: float = 300.0,
+    ):
+        self.sample_rate = sample_rate
+        self.threshold_dbfs = threshold_dbfs
+        self.attenuation_db = attenuation_db
+        self.hold_ms = hold_ms
+        self.chunks_open = 0
+        self.chunks_closed = 0
+        self.reset()
+
+    def reset(self):
+        self._gain = 1.0
+        self._quiet_ms = self.hold_ms
+
+    def process(self, x):
+        n = len(x)
+        if not n:
+            return x
+        if _level_dbfs(x) >= self.threshold_dbfs:
+            self._quiet_ms = 0.0
+        else:
+            self._quiet_ms += n * 1000.0 / self.sample_rate
+        start = self._gain
+        self._gain = 1.0 if self._quiet_ms < self.hold_ms else _db_to_gain(self.attenuation_db)
+        if self._gain == 1.0:
+            self.chunks_open += 1
+        else:
+            self.chunks_closed += 1
+        if start == self._gain == 1.0:
+            return x
+        return x * _ramp(start, self._gain, n)
+
+    def stats(self) -> Dict[str, object]:
+        return {"open": self._gain == 1.0, "chunks_open": self.chunks_open, "chunks_closed": self.chunks_closed}
+
+
+class SpectralSubtraction(DSPStage):
+    """
+    Спектральное вычитание: STFT с окном sqrt-Ханна и перекрытием 50 %, из мощности
+    каждого бина вычитается оценка шума (с коэффициентом over_subtraction), снизу
+    усиление ограничено floor_db — так меньше «музыкального» шума.
+
+    Шум оценивается по минимуму сглаженной мощности: в паузах оценка опускается сразу,
+    а вверх ползёт медленно (rise_db_per_sec), поэтому речь её почти не задевает.
+
+    Добавляет задержку в frame_size отсчётов (32 мс при 512 и 16 кГц); на выходе
+    ровно столько же отсчётов, сколько на входе.
+    """
+
+    name = "denoise"
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_size: int = 512,
+        over_subtraction: float = 2.0,
+        floor_db: float = -20.0,
+        rise_db_per_sec: float = 3.0,
+        smoothing: float = 0.7,
+    ):
+        if np is None:
+            raise RuntimeError("Для предобработки нужен NumPy: pip install numpy")
+        if frame_size % 2:
+            raise ValueError("frame_size должен быть чётным")
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        self.hop = frame_size // 2
+        self.over_subtraction = over_subtraction
+        self.floor = _db_to_gain(floor_db) ** 2
+        self.smoothing = smoothing
+        # Во сколько раз оценка шума может вырасти за один кадр
+        self._rise = 10.0 ** (rise_db_per_sec * self.hop / sample_rate / 10.0)
+        n = np.arange(frame_size)
+        self._window = np.sqrt(0.5 - 0.5 * np.cos(2.0 * np.pi * n / frame_size)).astype(np.float32)
+        self.reset()
+
+    def reset(self):
+        self._in = np.zeros(0, dtype=np.float32)
+        self._tail = np.zeros(self.frame_size - self.hop, dtype=np.float32)
+        # Готовые отсчёты; изначально — задержка frame_size нулей
+        self._out = np.zeros(self.frame_size, dtype=np.float32)
+        self._noise = None
+        self._power = None
+
+    def process(self, x):
+        n = len(x)
+        if not n:
+            return x
+        buf = np.concatenate((self._in, x))
+        frames = (len(buf) - self.frame_size) // self.hop + 1 if len(buf) >= self.frame_size else 0
+        if frames > 0:
+            view = np.lib.stride_tricks.sliding_window_view(buf, self.frame_size)[::self.hop][:frames]
+            spec = np.fft.rfft(view * self._window, axis=1)
+            power = spec.real ** 2 + spec.imag ** 2
+            gain = self._gains(power)
+            frames_out = np.fft.irfft(spec * gain, n=self.frame_size, axis=1).astype(np.float32) * self._window
+
+            # Перекрытие со сложением: кадр f начинается с отсчёта f * hop
+            ola = np.zeros((frames + 1) * self.hop, dtype=np.float32)
+            ola[:len(self._tail)] += self._tail
+            halves = frames_out.reshape(frames, 2, self.hop)
+            ola[:frames * self.hop] += halves[:, 0].reshape(-1)
+            ola[self.hop:] += halves[:, 1].reshape(-1)
+            done = frames * self.hop
+            self._out = np.concatenate((self._out, ola[:done]))
+            self._tail = ola[done:]
+            self._in = buf[done:]
+        else:
+            self._in = buf
+        y, self._out = self._out[:n], self._out[n:]
+        return y
+
+    def _gains(self, power):
+        if self._noise is None:
+            # Начальная оценка — первый кадр: поток обычно начинается с паузы
+            self._power = power[0].copy()
+            self._noise = power[0].copy()
+        # Рекурсия по кадрам (их единицы на чанк), векторно по бинам
+        noise = np.empty_like(power)
+        for f in range(len(power)):
+            self._power = self.smoothing * self._power + (1.0 - self.smoothing) * power[f]
+            self._noise = np.minimum(self._noise * self._rise, self._power)
+            noise[f] = self._noise
+        ratio = 1.0 - self.over_subtraction * noise / np.maximum(power, 1e-6)
+        return np.sqrt(np.maximum(ratio, self.floor)).astype(np.float32)
+
+    def stats(self) -> Dict[str, object]:
+        if self._noise is None:
+            return {"noise_dbfs": None}
+        # Мощность шума во временной области: сумма квадратов окна sqrt-Ханна равна N / 2
+        noise = float(self._noise.mean()) * 2.0 / self.frame_size
+        return {"noise_dbfs": round(float(10.0 * np.log10(max(noise, 1e-12) / INT16_MAX ** 2)), 1)}
+
+
+STAGES = {
+    HighPass.name: HighPass,
+    SpectralSubtraction.name: SpectralSubtraction,
+    NoiseGate.name: NoiseGate,
+    AutomaticGainControl.name: AutomaticGainControl,
+}
+
+# Порядок по умолчанию: шум убирается до того, как AGC его усилит
+DEFAULT_ORDER = ("highpass", "denoise", "gate", "agc")
+
+
+class DSPChain:
+    """
+    Последовательность ступеней над int16 моно PCM: bytes -> bytes той же длины.
+    Время каждой ступени на чанк копится в своей гистограмме (см. stats()).
+    """
+
+    def __init__(self, stages: Iterable[DSPStage], sample_rate: int = 16000):
+        if np is None:
+            raise RuntimeError("Для предобработки нужен NumPy: pip install numpy")
+        self.stages: List[DSPStage] = list(stages)
+        self.sample_rate = sample_rate
+        self.timings = {stage.name: LatencyHistogram() for stage in self.stages}
+        self.audio_sec = 0.0
+
+    @classmethod
+    def from_config(cls, config: Union[List, Dict, None], sample_rate: int = 16000) -> Optional["DSPChain"]:
+        """
+        Собирает цепочку из конфига (например, раздела "dsp" в config.json):
+          - список ["highpass", {"type": "agc", "target_dbfs": -18}, ...] — ступени в этом порядке;
+          - словарь {"highpass": {...}, "agc": true, "denoise": false} — ступени в порядке DEFAULT_ORDER.
+        Ступень с "enabled": false или значением false пропускается. Пустая цепочка — None.
+        """
+        if not config:
+            return None
+        if isinstance(config, dict):
+            unknown = set(config) - set(STAGES)
+            if unknown:
+                raise ValueError(f"Неизвестные ступени предобработки: {sorted(unknown)}, допустимы {sorted(STAGES)}")
+            items = [dict(config[name], type=name) if isinstance(config[name], dict) else
+                     ({"type": name} if config[name] else None) for name in DEFAULT_ORDER if name in config]
+        else:
+            items = [{"type": item} if isinstance(item, str) else dict(item) for item in config]
+
+        stages = []
+        for params in items:
+            if params is None or not params.pop("enabled", True):
+                continue
+            kind = params.pop("type", None)
+            if kind not in STAGES:
+                raise ValueError(f"Неизвестная ступень предобработки: {kind!r}, допустимы {sorted(STAGES)}")
+            stages.append(STAGES[kind](sample_rate=sample_rate, **params))
+        return cls(stages, sample_rate) if stages else None
+
+    def process(self, raw) -> bytes:
+        x = np.frombuffer(raw, dtype="<i2").astype(np.float32)
+        for stage in self.stages:
+            t0 = time.perf_counter()
+            x = stage.process(x)
+            self.timings[stage.name].add(time.perf_counter() - t0)
+        self.audio_sec += len(x) / self.sample_rate
+        return np.clip(np.rint(x), -32768, 32767).astype("<i2").tobytes()
+
+    def reset(self):
+        """Сбрасывает состояние ступеней (но не статистику)."""
+        for stage in self.stages:
+            stage.reset()
+
+    def stats(self) -> Dict[str, object]:
+        """По ступеням: время на чанк (мс, перцентили), мс процессора на секунду аудио и состояние."""
+        result = {}
+        for stage in self.stages:
+            hist = self.timings[stage.name]
+            info = hist.snapshot()
+            info["ms_per_audio_sec"] = hist.total * 1000.0 / self.audio_sec if self.audio_sec else 0.0
+            info.update(stage.stats())
+            result[stage.name] = info
+        return result
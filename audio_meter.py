@@ -0,0 +1,120 @@
+"""
+Измерение уровня int16 PCM-чанков: RMS, пик, dBFS, клиппинг и уровни по каналам.
+Основной путь векторизован на NumPy (np.frombuffer без копирования входных байт),
+при отсутствии NumPy используется чистый Python.
+"""
+
+import math
+import array
+from typing import Dict, List
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+FULL_SCALE = 32767.0
+# Сэмпл считается клипнутым, если он упёрся в границу диапазона int16
+CLIP_LEVEL = 32767
+
+
+def rms_to_dbfs(rms: float) -> float:
+    """
+    Перевод RMS (int16) в dBFS: 0 дБFS соответствует пиковой амплитуде 32767.
+    """
+    # Для RMS максимальное теоретическое значение меньше 32767,
+    # но используем 32767 как full-scale для удобной интерпретации.
+    if rms <= 0.0:
+        return -float("inf")
+    return 20.0 * math.log10(rms / FULL_SCALE)
+
+
+def _empty_levels(channels: int) -> Dict[str, object]:
+    return {
+        "rms": 0.0,
+        "peak": 0,
+        "dbfs": -float("inf"),
+        "peak_dbfs": -float("inf"),
+        "clipped": 0,
+        "channels": [0.0] * channels,
+    }
+
+
+def _finish_levels(rms: float, peak: int, clipped: int, per_channel: List[float]) -> Dict[str, object]:
+    return {
+        "rms": rms,
+        "peak": peak,
+        "dbfs": rms_to_dbfs(rms),
+        "peak_dbfs": rms_to_dbfs(float(peak)),
+        "clipped": clipped,
+        "channels": per_channel,
+    }
+
+
+def measure_levels_numpy(raw: bytes, channels: int = 1) -> Dict[str, object]:
+    """
+    Векторизованный замер уровня чанка. raw читается через np.frombuffer без копирования,
+    многоканальный ввод разворачивается в представление (frames, channels).
+    """
+    channels = max(1, int(channels))
+    frames = len(raw) // (2 * channels)
+    if frames == 0:
+        return _empty_levels(channels)
+
+    samples = np.frombuffer(raw, dtype="<i2", count=frames * channels)
+    peak = max(int(samples.max()), -int(samples.min()))
+    clipped = int(np.count_nonzero(samples >= CLIP_LEVEL)) + int(np.count_nonzero(samples <= -CLIP_LEVEL))
+
+    f = samples.astype(np.float64)
+    if channels == 1:
+        rms = math.sqrt(float(np.dot(f, f)) / frames)
+        return _finish_levels(rms, peak, clipped, [rms])
+
+    f = f.reshape(frames, channels)
+    per_channel = np.sqrt(np.einsum("ij,ij->j", f, f) / frames)
+    # Общий RMS считается по моно-миксу каналов, как и раньше
+    mono = f @ np.full(channels, 1.0 / channels)
+    rms = math.sqrt(float(np.dot(mono, mono)) / frames)
+    return _finish_levels(rms, peak, clipped, [float(v) for v in per_channel])
+
+
+def measure_levels_python(raw: bytes, channels: int = 1) -> Dict[str, object]:
+    """
+    Чистый Python-вариант measure_levels_numpy() на случай, если NumPy не установлен.
+    """
+    channels = max(1, int(channels))
+    frames = len(raw) // (2 * channels)
+    if frames == 0:
+        return _empty_levels(channels)
+
+    a = array.array("h")
+    a.frombytes(raw[: frames * channels * 2])
+    peak = max(max(a), -min(a))
+    clipped = a.count(32767) + a.count(-32767) + a.count(-32768)
+
+    if channels == 1:
+        acc = 0.0
+        for v in a:
+            acc += v * v
+        rms = math.sqrt(acc / frames)
+        return _finish_levels(rms, peak, clipped, [rms])
+
+    # Пофреймово: среднее по каналам -> моно, плюс суммы квадратов по каждому каналу
+    ch_acc = [0.0] * channels
+    acc = 0.0
+    idx = 0
+    for _ in range(frames):
+        s = 0.0
+        for c in range(channels):
+            v = a[idx + c]
+            s += v
+            ch_acc[c] += v * v
+        s /= channels
+        acc += s * s
+        idx += channels
+    rms = math.sqrt(acc / frames)
+    return _finish_levels(rms, peak, clipped, [math.sqrt(v / frames) for v in ch_acc])
+
+
+measure_levels = measure_levels_numpy if np is not None else measure_levels_python
@@ -0,0 +1,135 @@
+"""
+Потоковое приведение аудио к формату распознавателя: сведение каналов в моно
+и полифазный ресэмплинг с рациональным коэффициентом L/M (например, 48000 -> 16000
+или 44100 -> 16000).
+
+Состояние фильтра (хвост предыдущего чанка и фаза) сохраняется между вызовами,
+поэтому результат не зависит от того, как поток нарезан на чанки, — на стыках нет щелчков.
+"""
+
+from math import gcd
+from typing import Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def design_lowpass(num_taps: int, cutoff: float, beta: float = 8.0):
+    """
+    ФНЧ методом окна (Кайзер). cutoff — частота среза в долях частоты дискретизации (0..0.5).
+    Коэффициенты нормированы на единичное усиление по постоянному току.
+    """
+    n = np.arange(num_taps) - (num_taps - 1) / 2.0
+    h = 2.0 * cutoff * np.sinc(2.0 * cutoff * n) * np.kaiser(num_taps, beta)
+    return h / h.sum()
+
+
+def downmix(raw: bytes, channels: int):
+    """int16 PCM (чередующиеся каналы) -> моно float32."""
+    x = np.frombuffer(raw, dtype="<i2")
+    if channels == 1:
+        return x.astype(np.float32)
+    frames = len(x) // channels
+    f = x[:frames * channels].reshape(frames, channels).astype(np.float32)
+    # Матрично-векторное произведение быстрее f.mean(axis=1)
+    return f @ np.full(channels, 1.0 / channels, dtype=np.float32)
+
+
+class PolyphaseResampler:
+    """
+    Потоковый полифазный ресэмплер моно-сигнала in_rate -> out_rate.
+
+    Эквивалентен повышению частоты в L раз, фильтрации ФНЧ и прореживанию в M раз,
+    но вычисляет только нужные выходные отсчёты: каждый — скалярное произведение
+    taps_per_phase входных отсчётов на одну из L фаз фильтра.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, taps_per_phase: int = 32, rolloff: float = 0.9):
+        if np is None:
+            raise RuntimeError("Для ресэмплинга нужен NumPy: pip install numpy")
+        g = gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = out_rate // g
+        self.down = in_rate // g
+        self.taps = taps_per_phase
+
+        # Срез — чуть ниже Найквиста меньшей из частот, в долях частоты после повышения
+        cutoff = 0.5 * rolloff / max(self.up, self.down)
+        h = design_lowpass(self.taps * self.up, cutoff) * self.up
+        # phases[p, k] = h[p + k * L]: фаза p — коэффициенты для отсчётов x[base - k]
+        self._phases = np.ascontiguousarray(h.reshape(self.taps, self.up).T.astype(np.float32))
+        self._k = np.arange(self.taps)
+        self.reset()
+
+    def reset(self):
+        # Хвост предыдущих отсчётов (taps - 1), в начале — тишина
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        # Сколько входных отсчётов уже принято и позиция следующего выходного отсчёта
+        # в шкале повышенной частоты (в единицах 1 / (in_rate * L))
+        self._in_pos = 0
+        self._next_t = 0
+
+    @property
+    def delay(self) -> float:
+        """Групповая задержка фильтра, секунды."""
+        return (self.taps * self.up - 1) / 2.0 / (self.in_rate * self.up)
+
+    def process(self, x):
+        """Принимает очередной чанк (float32 моно), возвращает выходные отсчёты, готовые к этому моменту."""
+        buf = np.concatenate((self._history, x))
+        total_in = self._in_pos + len(x)
+        # Выходной отсчёт t готов, если его последний входной отсчёт t // L уже пришёл
+        last_t = total_in * self.up - 1
+        count = (last_t - self._next_t) // self.down + 1 if last_t >= self._next_t else 0
+        if count > 0:
+            t = self._next_t + self.down * np.arange(count, dtype=np.int64)
+            base, phase = np.divmod(t, self.up)
+            # Индекс в buf: buf[0] — входной отсчёт номер in_pos - (taps - 1)
+            idx = (base - (self._in_pos - (self.taps - 1)))[:, None] - self._k
+            y = np.einsum("nk,nk->n", self._phases[phase], buf[idx])
+            self._next_t += self.down * count
+        else:
+            y = np.zeros(0, dtype=np.float32)
+        self._in_pos = total_in
+        self._history = buf[len(buf) - (self.taps - 1):]
+        return y
+
+
+class AudioConverter:
+    """
+    int16 PCM с любой частотой и числом каналов -> int16 моно out_rate.
+    Без изменений формата данные проходят насквозь без копирования.
+    """
+
+    def __init__(self, in_rate: int, in_channels: int, out_rate: int = 16000, taps_per_phase: int = 32):
+        self.in_rate = in_rate
+        self.in_channels = in_channels
+        self.out_rate = out_rate
+        self.passthrough = in_rate == out_rate and in_channels == 1
+        self._resampler: Optional[PolyphaseResampler] = None
+        if not self.passthrough:
+            if np is None:
+                raise RuntimeError(
+                    f"Для приведения {in_rate} Гц x{in_channels} к {out_rate} Гц моно нужен NumPy: pip install numpy"
+                )
+            if in_rate != out_rate:
+                self._resampler = PolyphaseResampler(in_rate, out_rate, taps_per_phase)
+
+    def out_frames(self, in_frames: int) -> int:
+        """Сколько выходных фреймов в среднем получается из in_frames входных."""
+        return max(1, in_frames * self.out_rate // self.in_rate)
+
+    def convert(self, raw: bytes) -> bytes:
+        if self.passthrough:
+            return raw
+        x = downmix(raw, self.in_channels)
+        if self._resampler is not None:
+            x = self._resampler.process(x)
+        return np.clip(np.rint(x), -32768, 32767).astype("<i2").tobytes()
+
+    def reset(self):
+        if self._resampler is not None:
+            self._resampler.reset()
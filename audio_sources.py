@@ -0,0 +1,236 @@
+"""
+Источники аудио для SpeechStream.
+
+Источник отдаёт int16 PCM чанками в sink(data, captured_at) и сообщает о конце
+данных через on_end(). captured_at — время захвата конца чанка по time.time(). Микрофон (PyAudio) — «живой» источник: при переполнении
+очереди старые чанки отбрасываются. Файлы, сырые PCM-итераторы и генераторы
+воспроизводятся в отдельном потоке с ускорением N× или максимально быстро,
+и SpeechStream притормаживает их, а не теряет данные.
+"""
+
+import time
+import wave
+import threading
+import contextlib
+from typing import Callable, Iterable, Iterator, Optional
+
+Sink = Callable[[bytes, float], None]
+EndCallback = Callable[[], None]
+
+
+class AudioSource:
+    """Базовый класс источника int16 PCM."""
+
+    # True — данные идут в реальном времени и не могут ждать потребителя
+    live = False
+
+    def __init__(self, sample_rate: int = 16000, channels: int = 1, chunk_frames: int = 4096):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.chunk_frames = chunk_frames
+
+    @property
+    def bytes_per_frame(self) -> int:
+        return 2 * self.channels
+
+    def start(self, sink: Sink, on_end: Optional[EndCallback] = None):
+        raise NotImplementedError(f"Method 'start' of '{type(self).__name__}' is not implemented")
+
+    def stop(self):
+        raise NotImplementedError(f"Method 'stop' of '{type(self).__name__}' is not implemented")
+
+    def suspend(self):
+        """Приостанавливает захват и освобождает устройство; повторный start() возобновляет."""
+        self.stop()
+
+
+class PyAudioSource(AudioSource):
+    """Микрофон через PyAudio (callback-режим)."""
+
+    live = True
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        chunk_frames: int = 4096,
+        device_index: Optional[int] = None,
+    ):
+        super().__init__(sample_rate, channels, chunk_frames)
+        self.device_index = device_index
+        self._pa = None
+        self._stream = None
+        self._sink: Optional[Sink] = None
+
+    @staticmethod
+    def default_sample_rate(device_index: Optional[int] = None) -> int:
+        """Родная частота устройства ввода (или устройства по умолчанию) по данным PortAudio."""
+        import pyaudio
+
+        pa = pyaudio.PyAudio()
+        try:
+            if device_index is None:
+                info = pa.get_default_input_device_info()
+            else:
+                info = pa.get_device_info_by_index(device_index)
+            return int(info["defaultSampleRate"])
+        finally:
+            pa.terminate()
+
+    def start(self, sink: Sink, on_end: Optional[EndCallback] = None):
+        if self._stream is not None:
+            return
+        # Импорт здесь: без PyAudio остальные источники работают (CI, headless)
+        import pyaudio
+
+        self._sink = sink
+        self._continue = pyaudio.paContinue
+        if self._pa is None:
+            # Инициализация PortAudio (перебор устройств) — самая долгая часть; после suspend() не повторяется
+            self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(
+            format=pyaudio.paInt16,
+            channels=self.channels,
+            rate=self.sample_rate,
+            input=True,
+            input_device_index=self.device_index,
+            frames_per_buffer=self.chunk_frames,
+            stream_callback=self._pyaudio_callback,
+        )
+        self._stream.start_stream()
+
+    def stop(self):
+        self.suspend()
+        if self._pa:
+            with contextlib.suppress(Exception):
+                self._pa.terminate()
+            self._pa = None
+
+    def suspend(self):
+        # Закрываем только поток: устройство свободно, а PortAudio остаётся инициализированным
+        if self._stream:
+            with contextlib.suppress(Exception):
+                if self._stream.is_active():
+                    self._stream.stop_stream()
+            with contextlib.suppress(Exception):
+                self._stream.close()
+            self._stream = None
+
+    def _pyaudio_callback(self, in_data, frame_count, time_info, status):
+        self._sink(in_data, self._capture_time(frame_count, time_info))
+        return (None, self._continue)
+
+    def _capture_time(self, frame_count: int, time_info) -> float:
+        """
+        Время захвата последнего сэмпла буфера по часам PortAudio: насколько раньше
+        текущего момента АЦП записал конец буфера. Часть host API отдаёт нули —
+        тогда временем захвата считается момент вызова callback.
+        """
+        now = time.time()
+        if not time_info:
+            return now
+        adc = time_info.get("input_buffer_adc_time") or 0.0
+        current = time_info.get("current_time") or 0.0
+        if adc <= 0.0 or current <= 0.0:
+            return now
+        lag = current - (adc + frame_count / float(self.sample_rate))
+        return now - lag if lag > 0.0 else now
+
+
+class GeneratorSource(AudioSource):
+    """
+    Воспроизведение готовых чанков из итерируемого объекта в фоновом потоке.
+    speed: 1.0 — реальное время, N — в N раз быстрее, None или 0 — без пауз.
+    """
+
+    def __init__(
+        self,
+        chunks: Iterable[bytes],
+        sample_rate: int = 16000,
+        channels: int = 1,
+        chunk_frames: int = 4096,
+        speed: Optional[float] = 1.0,
+    ):
+        super().__init__(sample_rate, channels, chunk_frames)
+        self.chunks = chunks
+        self.speed = speed
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def start(self, sink: Sink, on_end: Optional[EndCallback] = None):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(sink, on_end), name=f"{type(self).__name__}Feeder", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def iter_chunks(self) -> Iterator[bytes]:
+        return iter(self.chunks)
+
+    def _run(self, sink: Sink, on_end: Optional[EndCallback]):
+        bytes_per_sec = self.sample_rate * self.bytes_per_frame
+        started = time.monotonic()
+        sent_bytes = 0
+        try:
+            for chunk in self.iter_chunks():
+                if self._stop_event.is_set():
+                    return
+                if not chunk:
+                    continue
+                sink(chunk, time.time())
+                sent_bytes += len(chunk)
+                if self.speed:
+                    # Темп по абсолютному расписанию, чтобы паузы не накапливали ошибку
+                    due = started + sent_bytes / bytes_per_sec / self.speed
+                    delay = due - time.monotonic()
+                    if delay > 0 and self._stop_event.wait(delay):
+                        return
+        finally:
+            if on_end is not None and not self._stop_event.is_set():
+                on_end()
+
+
+class PCMSource(GeneratorSource):
+    """Сырые int16 PCM-байты произвольными кусками; перенарезаются на чанки по chunk_frames."""
+
+    def iter_chunks(self) -> Iterator[bytes]:
+        chunk_bytes = self.chunk_frames * self.bytes_per_frame
+        buf = bytearray()
+        for piece in self.chunks:
+            buf += piece
+            while len(buf) >= chunk_bytes:
+                yield bytes(buf[:chunk_bytes])
+                del buf[:chunk_bytes]
+        # Хвост: только целые фреймы
+        tail = len(buf) - len(buf) % self.bytes_per_frame
+        if tail:
+            yield bytes(buf[:tail])
+
+
+class WavFileSource(GeneratorSource):
+    """WAV-файл (16 бит PCM); частота и число каналов берутся из заголовка."""
+
+    def __init__(self, path: str, chunk_frames: int = 4096, speed: Optional[float] = 1.0):
+        with wave.open(path, "rb") as wf:
+            if wf.getsampwidth() != 2:
+                raise ValueError(f"{path}: поддерживается только 16-битный PCM, а не {8 * wf.getsampwidth()} бит")
+            sample_rate = wf.getframerate()
+            channels = wf.getnchannels()
+        super().__init__((), sample_rate, channels, chunk_frames, speed)
+        self.path = path
+
+    def iter_chunks(self) -> Iterator[bytes]:
+        with wave.open(self.path, "rb") as wf:
+            while True:
+                data = wf.readframes(self.chunk_frames)
+                if not data:
+                    return
+                yield data
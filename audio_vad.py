@@ -0,0 +1,176 @@
+"""
+Детектор речевой активности (VAD) перед распознавателем.
+Решает, какие чанки отдавать в KaldiRecognizer: во время тишины чанки копятся
+в буфере предзаписи (pre-roll) и не декодируются, при начале речи буфер
+отдаётся распознавателю вместе с текущим чанком.
+"""
+
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class VoiceActivityDetector:
+    """
+    Энергетический VAD с удержанием (hangover) и необязательной проверкой
+    спектральной плоскостности.
+
+    mode:
+      - "energy": речь, если уровень чанка выше energy_threshold_dbfs;
+      - "flatness": речь, если спектральная плоскостность ниже flatness_threshold
+        (шум имеет плоский спектр, голос — выраженные гармоники);
+      - "both": должны выполниться оба условия.
+    Режимы с плоскостностью требуют NumPy; без него используется только энергия.
+    """
+
+    MODES = ("energy", "flatness", "both")
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        mode: str = "energy",
+        energy_threshold_dbfs: float = -45.0,
+        flatness_threshold: float = 0.45,
+        hangover_ms: int = 600,
+        preroll_ms: int = 300,
+    ):
+        """
+        sample_rate, channels: формат входного int16 PCM.
+        mode: "energy", "flatness" или "both".
+        energy_threshold_dbfs: порог уровня речи в dBFS.
+        flatness_threshold: порог спектральной плоскостности (0..1).
+        hangover_ms: сколько тишины после речи ещё декодируется, прежде чем
+            фраза будет принудительно завершена.
+        preroll_ms: сколько аудио до срабатывания отдаётся распознавателю,
+            чтобы не терять начало первого слова.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Неизвестный режим VAD: {mode!r}, допустимы {self.MODES}")
+
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.mode = mode
+        self.energy_threshold_dbfs = energy_threshold_dbfs
+        self.flatness_threshold = flatness_threshold
+        self.hangover_ms = hangover_ms
+        self.preroll_ms = preroll_ms
+
+        self._bytes_per_ms = sample_rate * channels * 2 / 1000.0
+        self._preroll: Deque[bytes] = deque()
+        self._preroll_bytes = 0
+        self._active = False
+        self._silence_ms = 0.0
+
+        self.chunks_total = 0
+        self.chunks_decoded = 0
+        self.chunks_skipped = 0
+        self.utterances = 0
+
+    def feed(self, data: bytes, dbfs: float) -> Tuple[List[bytes], bool]:
+        """
+        Принимает очередной чанк и его уровень (dBFS).
+        Возвращает (chunks, end_of_utterance):
+          - chunks: чанки, которые нужно подать в распознаватель (может быть пусто);
+          - end_of_utterance: True, если речь закончилась и фразу пора завершить.
+        """
+        self.chunks_total += 1
+        speech = self.is_speech(data, dbfs)
+
+        if speech:
+            self._silence_ms = 0.0
+            if self._active:
+                self.chunks_decoded += 1
+                return [data], False
+            # Начало речи: отдаём предзапись и текущий чанк
+            self._active = True
+            self.utterances += 1
+            chunks = list(self._preroll)
+            chunks.append(data)
+            self._preroll.clear()
+            self._preroll_bytes = 0
+            self.chunks_decoded += 1
+            return chunks, False
+
+        if self._active:
+            # Удержание: тишину после речи ещё декодируем
+            self.chunks_decoded += 1
+            self._silence_ms += len(data) / self._bytes_per_ms
+            if self._silence_ms >= self.hangover_ms:
+                self._active = False
+                self._silence_ms = 0.0
+                return [data], True
+            return [data], False
+
+        self.chunks_skipped += 1
+        self._push_preroll(data)
+        return [], False
+
+    def is_speech(self, data: bytes, dbfs: float) -> bool:
+        """Решение по одному чанку без учёта удержания."""
+        loud = dbfs >= self.energy_threshold_dbfs
+        if self.mode == "energy" or np is None:
+            return loud
+        if self.mode == "both" and not loud:
+            # Тихий чанк не может быть речью — спектр можно не считать
+            return False
+        flatness = self.spectral_flatness(data, self.channels)
+        if flatness is None:
+            return loud
+        tonal = flatness < self.flatness_threshold
+        if self.mode == "flatness":
+            return tonal
+        return loud and tonal
+
+    @staticmethod
+    def spectral_flatness(data: bytes, channels: int = 1) -> Optional[float]:
+        """
+        Спектральная плоскостность (геометрическое среднее / арифметическое среднее
+        спектра мощности): около 1 для белого шума, близко к 0 для тональных звуков.
+        """
+        if np is None:
+            return None
+        frames = len(data) // (2 * channels)
+        if frames < 32:
+            return None
+        x = np.frombuffer(data, dtype="<i2", count=frames * channels).astype(np.float32)
+        if channels > 1:
+            x = x.reshape(frames, channels).mean(axis=1)
+        power = np.abs(np.fft.rfft(x * np.hanning(frames))) ** 2 + 1e-10
+        return float(np.exp(np.mean(np.log(power))) / np.mean(power))
+
+    def reset(self):
+        """Сбрасывает состояние (но не статистику)."""
+        self._preroll.clear()
+        self._preroll_bytes = 0
+        self._active = False
+        self._silence_ms = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    def stats(self) -> Dict[str, object]:
+        total = self.chunks_total
+        return {
+            "speech": self._active,
+            "chunks_total": total,
+            "chunks_decoded": self.chunks_decoded,
+            "chunks_skipped": self.chunks_skipped,
+            "skipped_ratio": (self.chunks_skipped / total) if total else 0.0,
+            "utterances": self.utterances,
+        }
+
+    def _push_preroll(self, data: bytes):
+        if self.preroll_ms <= 0:
+            return
+        self._preroll.append(data)
+        self._preroll_bytes += len(data)
+        limit = self.preroll_ms * self._bytes_per_ms
+        # Оставляем хотя бы последний чанк, даже если он длиннее предзаписи
+        while len(self._preroll) > 1 and self._preroll_bytes - len(self._preroll[0]) >= limit:
+            self._preroll_bytes -= len(self._preroll.popleft())
@@ -0,0 +1,117 @@
+"""
+Пакетная расшифровка архива WAV-файлов на всех ядрах.
+Каждый файл проходит через тот же SpeechStream._recognition_worker, что и микрофон,
+но без PyAudio и без пауз реального времени. Модель грузится один раз на процесс пула.
+
+Запуск:
+    python batch_transcribe.py --model vosk-model-small-ru-0.22 archive/ --out result.jsonl
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from audio_sources import WavFileSource
+from mic_stream import SpeechStream
+from recognizer_pool import get_model
+
+
+def transcribe_file(path: str, model_path: str, chunk_frames: int = 4096) -> Dict[str, object]:
+    """
+    Расшифровывает один WAV-файл (16-битный PCM) максимально быстро. Частота и число
+    каналов — любые: перед распознаванием звук сводится в моно и передискретизируется
+    к частоте модели.
+    Возвращает словарь с полями path, text, segments, audio_sec, elapsed_sec, rtf.
+    """
+    segments: List[str] = []
+
+    def on_text(client_id: str, text: str, final: bool):
+        if final:
+            segments.append(text)
+
+    with wave.open(path, "rb") as wf:
+        audio_sec = wf.getnframes() / float(wf.getframerate())
+
+    started = time.perf_counter()
+    stream = SpeechStream(
+        model_path=model_path,
+        use_partial=False,
+        source=WavFileSource(path, chunk_frames=chunk_frames, speed=None),
+        # События уровня в пакетном режиме никому не нужны
+        level_interval=float("inf"),
+        on_text=on_text,
+    )
+    stream.start()
+    try:
+        stream.wait_finished()
+    finally:
+        stream.stop()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "path": path,
+        "text": " ".join(segments),
+        "segments": segments,
+        "audio_sec": audio_sec,
+        "elapsed_sec": elapsed,
+        "rtf": elapsed / audio_sec if audio_sec else 0.0,
+    }
+
+
+def _transcribe_job(args) -> Dict[str, object]:
+    path, model_path, chunk_frames = args
+    try:
+        return transcribe_file(path, model_path, chunk_frames)
+    except Exception as e:
+        # Битый файл не должен останавливать весь архив
+        return {"path": path, "error": f"{type(e).__name__}: {e}"}
+
+
+def transcribe_directory(
+    directory: str,
+    model_path: str,
+    processes: Optional[int] = None,
+    pattern: str = "**/*.wav",
+    chunk_frames: int = 4096,
+) -> List[Dict[str, object]]:
+    """
+    Расшифровывает все WAV-файлы каталога пулом процессов (по умолчанию — по числу ядер).
+    Результаты возвращаются в порядке отсортированных путей.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, pattern), recursive=True))
+    if not paths:
+        return []
+
+    jobs = [(path, model_path, chunk_frames) for path in paths]
+    # initializer заранее грузит модель: каждый процесс делает это ровно один раз
+    with ProcessPoolExecutor(max_workers=processes, initializer=get_model, initargs=(model_path,)) as pool:
+        return list(pool.map(_transcribe_job, jobs))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", help="Каталог с WAV-файлами")
+    parser.add_argument("--model", required=True, help="Путь к папке модели Vosk")
+    parser.add_argument("--processes", type=int, default=None, help="Число процессов (по умолчанию — все ядра)")
+    parser.add_argument("--out", default=None, help="Файл JSON Lines для результатов (по умолчанию — stdout)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = transcribe_directory(args.directory, args.model, args.processes)
+    lines = [json.dumps(r, ensure_ascii=False) for r in results]
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+    else:
+        print("\n".join(lines))
+
+    audio = sum(r.get("audio_sec", 0.0) for r in results)
+    wall = time.perf_counter() - started
+    print(f"Файлов: {len(results)}, аудио: {audio:.1f} с, время: {wall:.1f} с", file=sys.stderr)
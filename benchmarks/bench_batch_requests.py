@@ -0,0 +1,266 @@
+"""
+Пакетные запросы AsyncGitHubModelsClient против заглушки API без сети.
+
+Заглушка — MockTransport HTTP-библиотеки, на которой собран openai (httpx или httpx2),
+отвечающий как OpenAI-совместимый /chat/completions с заданной задержкой. Клиент
+строится через DefaultAsyncHttpxClient самого SDK. Сценарии:
+  concurrency — batch_request держит не больше concurrency запросов одновременно
+                и ускоряется по сравнению с последовательной отправкой;
+  priority    — когда бюджет RPM исчерпан (сервер прислал x-ratelimit-remaining-requests: 0),
+                интерактивный запрос обгоняет уже ждущий пакет;
+  retry_after — после 429 с retry-after-ms ни один запрос не уходит раньше указанного
+                времени, а отклонённый запрос повторяется и завершается успешно;
+  refund      — резерв токенов TPM запроса, завершившегося ошибкой 400, возвращается в бюджет;
+  cancel      — отмена batch_request посреди пакета: после неё нет запросов в работе,
+                новых запросов к API и оставшихся задач.
+
+Каждый сценарий печатает замеры и проверку; при нарушении — код выхода 1.
+
+Запуск из корня проекта:
+    python benchmarks/bench_batch_requests.py
+    python benchmarks/bench_batch_requests.py --prompts 40 --concurrency 8 --delay-ms 20
+"""
+
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import importlib
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient  # noqa: E402
+
+from ai import AsyncGitHubModelsClient  # noqa: E402
+from rate_limiter import INTERACTIVE, RateLimiter  # noqa: E402
+
+STUB_URL = "http://stub.models.local/inference"
+
+# HTTP-библиотека, на которой собран SDK: DefaultAsyncHttpxClient — наследник её AsyncClient
+transport = importlib.import_module(DefaultAsyncHttpxClient.__mro__[1].__module__.partition(".")[0])
+
+
+def completion(content: str, total_tokens: int = 16) -> dict:
+    return {
+        "id": "stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": total_tokens - 1, "completion_tokens": 1, "total_tokens": total_tokens},
+    }
+
+
+class StubAPI:
+    """
+    Заглушка API: отвечает через delay секунд, ведёт журнал запросов и число одновременных.
+    respond(номер запроса, текст промпта) -> (статус, заголовки, тело) позволяет менять ответы.
+    """
+
+    def __init__(self, delay: float, respond: Optional[Callable[[int, str], tuple]] = None):
+        self.delay = delay
+        self.respond = respond
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # (момент прихода (monotonic), текст последнего сообщения, статус ответа)
+        self.log: List[tuple] = []
+
+    async def handle(self, request):
+        prompt = json.loads(request.content)["messages"][-1]["content"]
+        index = self.requests
+        self.requests += 1
+        arrived = time.monotonic()
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            status, headers, body = (
+                self.respond(index, prompt) if self.respond else (200, {}, completion(f"ответ: {prompt}"))
+            )
+        finally:
+            self.in_flight -= 1
+        self.log.append((arrived, prompt, status))
+        return transport.Response(status, headers=headers, json=body)
+
+
+def make_client(stub: StubAPI, limiter: Optional[RateLimiter] = None) -> AsyncGitHubModelsClient:
+    client = AsyncGitHubModelsClient(github_token="stub", base_url=STUB_URL, max_tokens=64, rate_limiter=limiter)
+    # Общий клиент реестра подменяется клиентом поверх заглушки: сеть не используется
+    client.client = AsyncOpenAI(
+        base_url=STUB_URL,
+        api_key="stub",
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(transport=transport.MockTransport(stub.handle)),
+    )
+    return client
+
+
+def report(name: str, ok: bool, details: Dict[str, object]) -> bool:
+    values = "  ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in details.items())
+    print(f"{'OK ' if ok else 'FAIL'} {name:<12} {values}")
+    return ok
+
+
+async def scenario_concurrency(prompts: int, concurrency: int, delay: float) -> bool:
+    stub = StubAPI(delay)
+    client = make_client(stub)
+    items = [f"запрос {i}" for i in range(prompts)]
+
+    t0 = time.perf_counter()
+    results = await client.batch_request(items, concurrency=concurrency)
+    elapsed = time.perf_counter() - t0
+
+    ordered = results == [f"ответ: {p}" for p in items]
+    return report("concurrency", stub.max_in_flight == concurrency and ordered, {
+        "prompts": prompts,
+        "limit": concurrency,
+        "max_in_flight": stub.max_in_flight,
+        "in_order": ordered,
+        "elapsed_s": elapsed,
+        "sequential_s": prompts * delay,
+    })
+
+
+async def scenario_priority(prompts: int, delay: float) -> bool:
+    # Первый ответ сообщает, что бюджет запросов исчерпан: дальше по одному раз в 0.1 с
+    def respond(index: int, prompt: str):
+        headers = {"x-ratelimit-remaining-requests": "0"} if index == 0 else {}
+        return 200, headers, completion(f"ответ: {prompt}")
+
+    stub = StubAPI(delay, respond)
+    limiter = RateLimiter(rpm=600)
+    client = make_client(stub, limiter)
+    await client.single_request("прогрев")
+
+    batch = asyncio.ensure_future(client.batch_request([f"пакет {i}" for i in range(prompts)], concurrency=prompts))
+    # Пакет уже в очереди ограничителя, когда приходит интерактивный запрос
+    await asyncio.sleep(0.02)
+    t0 = time.perf_counter()
+    await client.single_request("интерактивный", priority=INTERACTIVE)
+    interactive_s = time.perf_counter() - t0
+    await batch
+    batch_s = time.perf_counter() - t0
+
+    order = [prompt for _, prompt, _ in sorted(stub.log)][1:]
+    position = order.index("интерактивный")
+    return report("priority", position == 0, {
+        "batch": prompts,
+        "interactive_position": position,
+        "interactive_s": interactive_s,
+        "batch_done_s": batch_s,
+    })
+
+
+async def scenario_retry_after(prompts: int, concurrency: int, delay: float, retry_after_ms: float) -> bool:
+    def respond(index: int, prompt: str):
+        if index == 0:
+            return 429, {"retry-after-ms": str(retry_after_ms)}, {"error": {"message": "rate limited"}}
+        return 200, {}, completion(f"ответ: {prompt}")
+
+    stub = StubAPI(delay, respond)
+    limiter = RateLimiter()
+    client = make_client(stub, limiter)
+    results = await client.batch_request([f"запрос {i}" for i in range(prompts)], concurrency=concurrency)
+
+    log = sorted(stub.log)
+    throttled_at = next(arrived for arrived, _, status in log if status == 429) + delay
+    unblocked_at = throttled_at + retry_after_ms / 1000.0
+    # Запросы, отправленные после ответа 429, не уходят раньше retry-after
+    after = [arrived for arrived, _, _ in log if arrived > throttled_at]
+    early = sum(1 for arrived in after if arrived < unblocked_at - 0.005)
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    stats = limiter.stats()
+    return report("retry_after", early == 0 and failed == 0 and stats["throttled"] == 1, {
+        "retry_after_s": retry_after_ms / 1000.0,
+        "first_after_429_s": min(after) - throttled_at if after else 0.0,
+        "sent_early": early,
+        "failed": failed,
+        "throttled": stats["throttled"],
+        "retries": stats["retries"],
+    })
+
+
+async def scenario_refund(delay: float) -> bool:
+    stub = StubAPI(delay, lambda index, prompt: (400, {}, {"error": {"message": "bad request"}}))
+    # Маленький бюджет пополняется медленно: невозвращённый резерв был бы заметен
+    limiter = RateLimiter(tpm=600)
+    client = make_client(stub, limiter)
+    before = limiter.stats()["tokens_available"]
+    try:
+        await client.single_request("ошибочный запрос")
+        raised = False
+    except Exception:
+        raised = True
+    after = limiter.stats()["tokens_available"]
+    return report("refund", raised and after >= before - 1.0, {
+        "tokens_before": before,
+        "tokens_after": after,
+        "raised": raised,
+    })
+
+
+async def scenario_cancel(prompts: int, concurrency: int, delay: float) -> bool:
+    stub = StubAPI(delay)
+    limiter = RateLimiter()
+    client = make_client(stub, limiter)
+    batch = asyncio.ensure_future(
+        client.batch_request([f"запрос {i}" for i in range(prompts)], concurrency=concurrency)
+    )
+    # Отмена посреди третьей волны: часть ответов получена, concurrency запросов в работе
+    await asyncio.sleep(delay * 2.5)
+    in_flight_at_cancel = stub.in_flight
+    batch.cancel()
+    try:
+        await batch
+        cancelled = False
+    except asyncio.CancelledError:
+        cancelled = True
+    # batch_request возвращается только после остановки всех своих запросов
+    in_flight_after = stub.in_flight
+    sent = stub.requests
+    await asyncio.sleep(delay * 3)
+    sent_after = stub.requests - sent
+    leftover = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    waiting = limiter.stats()["waiting"]
+    ok = (cancelled and in_flight_at_cancel == concurrency and in_flight_after == 0
+          and sent_after == 0 and not leftover and waiting == 0 and sent < prompts)
+    return report("cancel", ok, {
+        "sent": sent,
+        "of": prompts,
+        "in_flight_at_cancel": in_flight_at_cancel,
+        "in_flight_after": in_flight_after,
+        "sent_after_cancel": sent_after,
+        "leftover_tasks": len(leftover),
+        "limiter_waiting": waiting,
+    })
+
+
+async def main_async(args) -> bool:
+    delay = args.delay_ms / 1000.0
+    results = [
+        await scenario_concurrency(args.prompts, args.concurrency, delay),
+        await scenario_priority(6, delay),
+        await scenario_retry_after(args.prompts, args.concurrency, delay, args.retry_after_ms),
+        await scenario_refund(delay),
+        await scenario_cancel(args.prompts, args.concurrency, delay),
+    ]
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prompts", type=int, default=20, help="Запросов в пакете")
+    parser.add_argument("--concurrency", type=int, default=4, help="Предел одновременных запросов")
+    parser.add_argument("--delay-ms", type=float, default=50.0, help="Задержка ответа заглушки, мс")
+    parser.add_argument("--retry-after-ms", type=float, default=300.0, help="retry-after-ms в ответе 429")
+    args = parser.parse_args()
+    ok = asyncio.run(main_async(args))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Стоимость управления историей чата: прежний подсчёт токенов по всему списку
+(токенайзер на каждой итерации усечения) против ChatHistory с кэшем токенов.
+
+Сценарии для истории из N сообщений:
+  count     — get_token_count();
+  step      — шаг chat() без сети: сообщение пользователя, усечение до лимита, ответ ассистента;
+  truncate  — усечение истории вдвое за один вызов (прежний способ квадратичен,
+              поэтому для больших N он пропускается, см. --legacy-max).
+
+Запуск из корня проекта:
+    python benchmarks/bench_chat_history.py
+    python benchmarks/bench_chat_history.py --sizes 1000,10000 --legacy-max 10000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import itertools
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai import ChatSession  # noqa: E402
+
+WORDS = (
+    "как почему сколько модель ответ вопрос история токен python функция список "
+    "the quick brown fox jumps over lazy dog model stream latency request"
+).split()
+
+
+def make_messages(count: int, seed: int = 0) -> List[Dict[str, str]]:
+    rng = random.Random(seed)
+    messages = []
+    for i in range(count):
+        role = "user" if i % 2 == 0 else "assistant"
+        content = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 60)))
+        messages.append({"role": role, "content": content})
+    return messages
+
+
+def legacy_truncate(session: ChatSession, history: List[Dict[str, str]], max_tokens: int) -> List[Dict[str, str]]:
+    """Прежний ChatSession._truncate_history: count_tokens по всему списку на каждой итерации."""
+    system_message = None
+    messages = history.copy()
+    if messages and messages[0]["role"] == "system":
+        system_message = messages.pop(0)
+    while messages and session.count_tokens(
+        [system_message] + messages if system_message else messages
+    ) > max_tokens:
+        messages.pop(0)
+        if messages and messages[0]["role"] == "assistant":
+            messages.pop(0)
+    return ([system_message] if system_message else []) + messages
+
+
+def timed(func, repeat: int) -> float:
+    """Лучшее время одного вызова из repeat, мс."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+
+def bench_size(session: ChatSession, size: int, steps: int, legacy_max: int) -> Dict[str, object]:
+    messages = [{"role": "system", "content": "Ты — дружелюбный помощник."}] + make_messages(size)
+    extra = make_messages(steps * 2, seed=size + 1)
+    session.history.load(messages)
+    limit = session.get_token_count()
+
+    # Хранимая история сразу в лимите: каждый шаг вытесняет столько же, сколько добавил
+    legacy_history = list(messages)
+    legacy_turns = itertools.cycle(zip(extra[::2], extra[1::2]))
+    cached_turns = itertools.cycle(zip(extra[::2], extra[1::2]))
+
+    def legacy_step():
+        nonlocal legacy_history
+        user, reply = next(legacy_turns)
+        legacy_history.append(user)
+        legacy_history = legacy_truncate(session, legacy_history, limit)
+        legacy_history.append(reply)
+
+    def cached_step():
+        user, reply = next(cached_turns)
+        session.history.append(user["role"], user["content"])
+        session.history.truncate(limit)
+        session.history.append(reply["role"], reply["content"])
+
+    result = {
+        "size": size,
+        "count_legacy_ms": timed(lambda: session.count_tokens(messages), 3),
+        "count_cached_ms": timed(session.get_token_count, 3),
+        "step_legacy_ms": timed(legacy_step, steps),
+        "step_cached_ms": timed(cached_step, steps),
+        "truncate_legacy_ms": None,
+    }
+
+    half = session.count_tokens(messages[:1] + messages[size // 2 + 1:])
+    if size <= legacy_max:
+        result["truncate_legacy_ms"] = timed(lambda: legacy_truncate(session, messages, half), 1)
+
+    def cached_truncate():
+        session.history.truncate(half)
+
+    # Загрузка (токенизация каждого сообщения один раз) — не часть усечения
+    session.history.load(messages)
+    result["truncate_cached_ms"] = timed(cached_truncate, 1)
+    t0 = time.perf_counter()
+    session.history.load(messages)
+    result["load_ms"] = (time.perf_counter() - t0) * 1000.0
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100,1000,10000", help="Размеры истории, сообщений")
+    parser.add_argument("--steps", type=int, default=20, help="Шагов chat() на размер")
+    parser.add_argument("--legacy-max", type=int, default=2000,
+                        help="Наибольший размер, для которого мерить прежнее усечение вдвое")
+    args = parser.parse_args()
+
+    # Без сети: запросов к API нет, нужен только токенайзер
+    session = ChatSession(github_token="benchmark", max_history_tokens=10 ** 9)
+
+    def fmt(value):
+        return f"{value:>10.3f}" if value is not None else f"{'-':>10}"
+
+    print(f"{'N':>6} {'count был':>10} {'count стал':>10} {'step был':>10} {'step стал':>10} "
+          f"{'trunc был':>10} {'trunc стал':>10} {'load':>10}")
+    for size in (int(v) for v in args.sizes.split(",")):
+        r = bench_size(session, size, args.steps, args.legacy_max)
+        print(f"{size:>6} {fmt(r['count_legacy_ms'])} {fmt(r['count_cached_ms'])} "
+              f"{fmt(r['step_legacy_ms'])} {fmt(r['step_cached_ms'])} "
+              f"{fmt(r['truncate_legacy_ms'])} {fmt(r['truncate_cached_ms'])} {fmt(r['load_ms'])}")
+    print("Значения — мс; load — разовая токенизация истории при загрузке.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Стоимость предобработки перед распознавателем: процессорное время каждой ступени
+audio_dsp на секунду аудио при разных размерах чанка.
+
+Запуск из корня проекта:
+    python benchmarks/bench_dsp.py
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_dsp import DSPChain, DEFAULT_ORDER, np  # noqa: E402
+
+
+def make_audio(seconds: float, rate: int) -> bytes:
+    """Речеподобный сигнал: тон с огибающей слогов, шум и постоянная составляющая."""
+    rng = np.random.default_rng(rate)
+    t = np.arange(int(seconds * rate)) / rate
+    envelope = np.clip(np.sin(2 * np.pi * 3 * t), 0, None)
+    x = 4000 * envelope * np.sin(2 * np.pi * 220 * t) + rng.normal(0, 300, len(t)) + 400
+    return np.clip(x, -32768, 32767).astype("<i2").tobytes()
+
+
+def bench(stages: list, raw: bytes, chunk_frames: int, rate: int) -> dict:
+    """Лучший из трёх прогонов: мс процессорного времени на секунду аудио по ступеням и всего."""
+    chunk_bytes = chunk_frames * 2
+    seconds = len(raw) / 2 / rate
+    best = None
+    for _ in range(3):
+        chain = DSPChain.from_config(stages, rate)
+        t0 = time.process_time()
+        for i in range(0, len(raw), chunk_bytes):
+            chain.process(raw[i:i + chunk_bytes])
+        total = (time.process_time() - t0) / seconds * 1000.0
+        if best is None or total < best["total"]:
+            best = {name: info["ms_per_audio_sec"] for name, info in chain.stats().items()}
+            best["total"] = total
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stages", default=",".join(DEFAULT_ORDER), help="Ступени через запятую, в порядке применения")
+    parser.add_argument("--chunk-ms", default="20,100,256", help="Длительность чанка, мс")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Длительность тестового сигнала")
+    parser.add_argument("--rate", type=int, default=16000, help="Частота распознавателя")
+    args = parser.parse_args()
+
+    if np is None:
+        print("NumPy не установлен: предобработка недоступна.")
+        return
+
+    stages = args.stages.split(",")
+    raw = make_audio(args.seconds, args.rate)
+    columns = stages + ["total"]
+    print(f"{'chunk, мс':>10} " + " ".join(f"{name:>9}" for name in columns) + f" {'доля ядра':>10}")
+    for ms in (float(v) for v in args.chunk_ms.split(",")):
+        frames = max(1, int(args.rate * ms / 1000.0))
+        cost = bench(stages, raw, frames, args.rate)
+        print(f"{ms:>10.0f} " + " ".join(f"{cost[name]:>9.2f}" for name in columns) + f" {cost['total'] / 10.0:>9.2f}%")
+    print("Значения — мс процессорного времени на секунду аудио.")
+
+
+if __name__ == "__main__":
+    main()
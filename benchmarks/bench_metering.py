@@ -0,0 +1,133 @@
+"""
+Микробенчмарк замера уровня для разных размеров чанка и числа каналов.
+
+Точка отсчёта — прежний замер из mic_stream.py (SpeechStream._rms_int16 и
+_rms_to_dbfs), скопированный сюда без изменений: он считал только RMS и dBFS.
+Рядом — оба пути audio_meter.measure_levels (NumPy и запасной на чистом Python),
+которые за тот же проход считают ещё пик, клиппинг и уровни по каналам.
+Ускорение — прежний замер / NumPy-путь.
+
+Запуск из корня проекта:
+    python benchmarks/bench_metering.py
+"""
+
+import os
+import sys
+import math
+import random
+import array
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_meter import measure_levels_numpy, measure_levels_python, np  # noqa: E402
+
+
+def _rms_int16(raw: bytes, bytes_per_frame: int) -> float:
+    """
+    Быстрый RMS для int16 моно/стерео; возвращает величину в диапазоне ~0..32768 для 16‑бит.
+    Для многоканального ввода берётся среднее RMS по каналам.
+    """
+    # Разворачиваем в int16
+    import array
+
+    # Если не целое число сэмплов — обрезаем хвост
+    tail = len(raw) % 2
+    if tail:
+        raw = raw[:-tail]
+
+    if not raw:
+        return 0.0
+
+    a = array.array("h")
+    a.frombytes(raw)
+
+    # Если несколько каналов, усредняем по каналам
+    if bytes_per_frame > 2:
+        channels = bytes_per_frame // 2
+        n = len(a) // channels
+        if n == 0:
+            return 0.0
+        # Пофреймово среднее по каналам -> моно, затем RMS
+        # Это компромисс: можно точнее, но дороже.
+        acc = 0.0
+        idx = 0
+        for _ in range(n):
+            s = 0.0
+            for c in range(channels):
+                s += a[idx + c]
+            s /= channels
+            acc += s * s
+            idx += channels
+        mean_sq = acc / n
+        return math.sqrt(mean_sq)
+
+    # Моно
+    acc = 0.0
+    for v in a:
+        acc += v * v
+    mean_sq = acc / len(a)
+    return math.sqrt(mean_sq)
+
+
+def _rms_to_dbfs(rms: float) -> float:
+    """
+    Перевод RMS (int16) в dBFS: 0 дБFS соответствует пиковой амплитуде 32767.
+    """
+    # Для RMS максимальное теоретическое значение меньше 32767,
+    # но используем 32767 как full-scale для удобной интерпретации.
+    full_scale = 32767.0
+    if rms <= 0.0:
+        return -float("inf")
+    ratio = rms / full_scale
+    return 20.0 * math.log10(ratio)
+
+
+def measure_levels_baseline(raw: bytes, channels: int) -> float:
+    """Прежний замер в рабочем потоке: RMS и dBFS чанка."""
+    return _rms_to_dbfs(_rms_int16(raw, 2 * channels))
+
+
+def make_chunk(frames: int, channels: int) -> bytes:
+    rnd = random.Random(frames * 31 + channels)
+    a = array.array("h", (rnd.randint(-12000, 12000) for _ in range(frames * channels)))
+    return a.tobytes()
+
+
+def bench(func, raw: bytes, channels: int, repeat: int) -> float:
+    """Лучшее время одного вызова, мкс."""
+    number = max(1, repeat)
+    best = min(timeit.repeat(lambda: func(raw, channels), number=number, repeat=5))
+    return best / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="256,1024,4096,16384", help="Размеры чанка во фреймах")
+    parser.add_argument("--channels", default="1,2", help="Количество каналов")
+    parser.add_argument("--repeat", type=int, default=20, help="Вызовов на замер")
+    args = parser.parse_args()
+
+    sizes = [int(v) for v in args.sizes.split(",")]
+    channel_counts = [int(v) for v in args.channels.split(",")]
+
+    print(f"{'frames':>8} {'ch':>3} {'прежний, мкс':>13} {'python, мкс':>12} {'numpy, мкс':>11} {'ускорение':>10}")
+    for channels in channel_counts:
+        for frames in sizes:
+            raw = make_chunk(frames, channels)
+            slow_repeat = max(1, args.repeat // 4)
+            t_base = bench(measure_levels_baseline, raw, channels, slow_repeat)
+            t_py = bench(measure_levels_python, raw, channels, slow_repeat)
+            if np is None:
+                print(f"{frames:>8} {channels:>3} {t_base:>13.1f} {t_py:>12.1f} {'-':>11} {'-':>10}")
+                continue
+            t_np = bench(measure_levels_numpy, raw, channels, args.repeat)
+            print(f"{frames:>8} {channels:>3} {t_base:>13.1f} {t_py:>12.1f} {t_np:>11.1f} {t_base / t_np:>9.1f}x")
+
+    if np is None:
+        print("NumPy не установлен: замерен только запасной путь на чистом Python.")
+
+
+if __name__ == "__main__":
+    main()
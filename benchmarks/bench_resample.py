@@ -0,0 +1,69 @@
+"""
+Стоимость приведения захвата к 16 кГц моно: процессорное время на секунду аудио
+для разных частот, числа каналов и размеров чанка.
+
+Запуск из корня проекта:
+    python benchmarks/bench_resample.py
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_resample import AudioConverter, np  # noqa: E402
+
+
+def make_audio(seconds: float, rate: int, channels: int) -> bytes:
+    rng = np.random.default_rng(rate * 31 + channels)
+    t = np.arange(int(seconds * rate)) / rate
+    mono = 8000 * np.sin(2 * np.pi * 440 * t) + rng.normal(0, 1000, len(t))
+    frames = np.repeat(mono[:, None], channels, axis=1)
+    return np.clip(frames, -32768, 32767).astype("<i2").tobytes()
+
+
+def bench(rate: int, channels: int, chunk_frames: int, seconds: float, out_rate: int, taps: int) -> float:
+    """Лучшее из трёх: мс процессорного времени на секунду аудио."""
+    raw = make_audio(seconds, rate, channels)
+    chunk_bytes = chunk_frames * 2 * channels
+    best = float("inf")
+    for _ in range(3):
+        conv = AudioConverter(rate, channels, out_rate, taps)
+        t0 = time.process_time()
+        for i in range(0, len(raw), chunk_bytes):
+            conv.convert(raw[i:i + chunk_bytes])
+        best = min(best, time.process_time() - t0)
+    return best / seconds * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rates", default="8000,22050,44100,48000", help="Частоты захвата, Гц")
+    parser.add_argument("--channels", default="1,2", help="Количество каналов")
+    parser.add_argument("--chunk-ms", default="20,100,256", help="Длительность чанка захвата, мс")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Длительность тестового сигнала")
+    parser.add_argument("--out-rate", type=int, default=16000, help="Частота распознавателя")
+    parser.add_argument("--taps", type=int, default=32, help="Отводов фильтра на фазу")
+    args = parser.parse_args()
+
+    if np is None:
+        print("NumPy не установлен: ресэмплинг недоступен.")
+        return
+
+    rates = [int(v) for v in args.rates.split(",")]
+    channel_counts = [int(v) for v in args.channels.split(",")]
+    chunk_ms = [float(v) for v in args.chunk_ms.split(",")]
+
+    print(f"{'rate':>7} {'ch':>3} {'chunk, мс':>10} {'CPU, мс/с аудио':>16} {'доля ядра':>10}")
+    for rate in rates:
+        for channels in channel_counts:
+            for ms in chunk_ms:
+                frames = max(1, int(rate * ms / 1000.0))
+                cost = bench(rate, channels, frames, args.seconds, args.out_rate, args.taps)
+                print(f"{rate:>7} {channels:>3} {ms:>10.0f} {cost:>16.2f} {cost / 10.0:>9.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Задержка кэша ответов: вычисление ключа, попадание в память, попадание в SQLite
+(после «перезапуска» — новый экземпляр кэша над тем же файлом) и промах.
+Для сравнения: запрос к GitHub Models — сотни миллисекунд.
+
+Запуск из корня проекта:
+    python benchmarks/bench_response_cache.py
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_cache import ResponseCache, make_key  # noqa: E402
+
+
+def make_params(i: int, history: int) -> dict:
+    messages = [{"role": "system", "content": "Классифицируй команду пользователя одним словом."}]
+    messages += [{"role": "user", "content": f"Сообщение {j}: открой браузер и найди погоду"} for j in range(history)]
+    messages.append({"role": "user", "content": f"Команда номер {i}: выключи звук"})
+    return {"model": "gpt-4o-mini", "messages": messages, "temperature": 0.0, "max_tokens": 64}
+
+
+def per_call_us(func, items) -> float:
+    t0 = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - t0) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=2000, help="Сколько разных запросов")
+    parser.add_argument("--history", type=int, default=4, help="Сообщений в каждом запросе")
+    parser.add_argument("--answer-chars", type=int, default=400, help="Длина ответа")
+    args = parser.parse_args()
+
+    params = [make_params(i, args.history) for i in range(args.entries)]
+    answer = "ответ " * (args.answer_chars // 6)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "responses.sqlite")
+        cache = ResponseCache(max_entries=args.entries, path=path)
+        keys = [make_key(p) for p in params]
+
+        key_us = per_call_us(make_key, params)
+        put_us = per_call_us(lambda k: cache.put(k, answer), keys)
+        memory_us = per_call_us(cache.get, keys)
+        miss_us = per_call_us(cache.get, [k[::-1] for k in keys])
+        cache.close()
+
+        # Новый процесс после перезапуска: память пуста, ответы на диске
+        restarted = ResponseCache(max_entries=args.entries, path=path)
+        disk_us = per_call_us(restarted.get, keys)
+        promoted_us = per_call_us(restarted.get, keys)
+        stats = restarted.stats()
+        restarted.close()
+
+    print(f"{'операция':<28} {'мкс/вызов':>10}")
+    for name, value in (
+        ("ключ (SHA-256)", key_us),
+        ("put (память + SQLite)", put_us),
+        ("get: память", memory_us),
+        ("get: промах (память + диск)", miss_us),
+        ("get: SQLite после рестарта", disk_us),
+        ("get: поднятые в память", promoted_us),
+    ):
+        print(f"{name:<28} {value:>10.1f}")
+    print(f"Попаданий после рестарта: диск {stats['disk_hits']}, память {stats['memory_hits']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Бенчмарк всего конвейера SpeechStream на записанном аудио, без PyAudio.
+
+WAV-файлы (свои через --wav или сгенерированные) проигрываются через WavFileSource
+для каждой комбинации chunk_frames, partial вкл/выкл и worker thread/process.
+Каждая комбинация запускается в отдельном процессе, чтобы пиковая память и кэш
+модели не перетекали между замерами.
+
+Метрики:
+  rtf                  — время обработки / длительность аудио (меньше 1 — быстрее реального времени);
+  first_partial_sec    — от первого чанка до первой частичной гипотезы;
+  final_sec            — от конца аудио до последнего финала (дожимание фразы);
+  cpu_ms_per_audio_sec — процессорное время приложения и процессов распознавания на секунду аудио;
+  peak_rss_mb          — пиковая память процесса (и процессов распознавания отдельно).
+
+Результат — JSON (stdout или --out), чтобы сравнивать релизы между собой.
+
+Запуск из корня проекта:
+    python benchmarks/bench_speech_stream.py --out bench.json
+    python benchmarks/bench_speech_stream.py --wav samples/*.wav --speed 1
+"""
+
+import os
+import sys
+import json
+import time
+import wave
+import argparse
+import platform
+import tempfile
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from audio_sources import WavFileSource  # noqa: E402
+
+try:
+    import resource
+except ImportError:
+    # Windows: пиковая память процесса недоступна
+    resource = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def make_wav(path: str, seconds: float, rate: int = 16000):
+    """Речеподобный сигнал: гармоники с огибающей слогов, паузы между «фразами» и слабый шум."""
+    if np is None:
+        raise RuntimeError("Для генерации тестового WAV нужен NumPy; передайте свои файлы через --wav")
+    rng = np.random.default_rng(int(seconds * 1000))
+    t = np.arange(int(seconds * rate)) / rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+    # Фразы по 2.5 с, между ними 1 с тишины — VAD и финалы срабатывают как в жизни
+    phrases = (t % 3.5) < 2.5
+    x = 6000 * voice * syllables * phrases + rng.normal(0, 60, len(t))
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(np.clip(x, -32768, 32767).astype("<i2").tobytes())
+
+
+class _TimedSource(WavFileSource):
+    """WavFileSource, который запоминает время первого чанка и конца файла."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.first_chunk_at: Optional[float] = None
+        self.ended_at: Optional[float] = None
+
+    def start(self, sink, on_end=None):
+        def timed_sink(data, captured_at=None):
+            if self.first_chunk_at is None:
+                self.first_chunk_at = time.perf_counter()
+            sink(data, captured_at)
+
+        def timed_end():
+            self.ended_at = time.perf_counter()
+            if on_end is not None:
+                on_end()
+
+        super().start(timed_sink, timed_end)
+
+
+def _proc_stat(pid: int) -> Dict[str, float]:
+    """Процессорное время (с) и пиковая память (МБ) процесса по /proc; вне Linux — пусто."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Имя процесса в скобках может содержать пробелы — поля считаем после ")"
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            hwm = next((line.split()[1] for line in f if line.startswith("VmHWM:")), "0")
+    except (OSError, IndexError):
+        return {}
+    ticks = os.sysconf("SC_CLK_TCK")
+    return {"cpu_sec": (int(fields[11]) + int(fields[12])) / ticks, "peak_rss_mb": int(hwm) / 1024.0}
+
+
+def _worker_pids(stream) -> List[int]:
+    worker = stream.stats().get("worker", {})
+    if "models" in worker:
+        return [m["pid"] for m in worker["models"].values() if m.get("pid")]
+    return [worker["pid"]] if worker.get("pid") else []
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux — килобайты, macOS — байты
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def run_file(path: str, config: dict, model, speed: float) -> Dict[str, object]:
+    from mic_stream import SpeechStream
+
+    first_partial = []
+    last_final = []
+
+    def on_text(client_id: str, text: str, final: bool):
+        now = time.perf_counter()
+        if final:
+            last_final[:] = [now]
+        elif not first_partial:
+            first_partial.append(now)
+
+    source = _TimedSource(path, chunk_frames=config["chunk_frames"], speed=speed or None)
+    stream = SpeechStream(
+        model_path=model,
+        use_partial=config["partial"],
+        source=source,
+        worker=config["worker"],
+        level_interval=float("inf"),
+        on_text=on_text,
+    )
+    # Загрузка модели (и запуск процесса) в замер не входит: время считается от первого чанка
+    stream.start()
+    workers = {pid: _proc_stat(pid) for pid in _worker_pids(stream)}
+    cpu_started = time.process_time()
+    try:
+        stream.wait_finished()
+        finished_at = time.perf_counter()
+        cpu = time.process_time() - cpu_started
+        worker_rss = 0.0
+        for pid, before in workers.items():
+            after = _proc_stat(pid)
+            if before and after:
+                cpu += after["cpu_sec"] - before["cpu_sec"]
+                worker_rss += after["peak_rss_mb"]
+    finally:
+        stream.stop()
+
+    with wave.open(path, "rb") as wf:
+        audio_sec = wf.getnframes() / float(wf.getframerate())
+    started = source.first_chunk_at or finished_at
+    ended = source.ended_at or finished_at
+    return {
+        "path": path,
+        "audio_sec": audio_sec,
+        "rtf": (finished_at - started) / audio_sec if audio_sec else 0.0,
+        "first_partial_sec": first_partial[0] - started if first_partial else None,
+        "final_sec": max(0.0, last_final[0] - ended) if last_final else None,
+        "cpu_ms_per_audio_sec": cpu * 1000.0 / audio_sec if audio_sec else 0.0,
+        "worker_peak_rss_mb": worker_rss if workers else None,
+    }
+
+
+def run_config(config: dict, paths: List[str], model, speed: float) -> Dict[str, object]:
+    """Одна комбинация параметров на всех файлах; выполняется в отдельном процессе."""
+    files = [run_file(path, config, model, speed) for path in paths]
+    audio = sum(f["audio_sec"] for f in files)
+
+    def weighted(key):
+        return sum(f[key] * f["audio_sec"] for f in files) / audio if audio else 0.0
+
+    def worst(key):
+        values = [f[key] for f in files if f[key] is not None]
+        return max(values) if values else None
+
+    return dict(
+        config,
+        audio_sec=audio,
+        rtf=weighted("rtf"),
+        cpu_ms_per_audio_sec=weighted("cpu_ms_per_audio_sec"),
+        first_partial_sec=worst("first_partial_sec"),
+        final_sec=worst("final_sec"),
+        peak_rss_mb=_peak_rss_mb(),
+        worker_peak_rss_mb=worst("worker_peak_rss_mb"),
+        files=files,
+    )
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=ROOT, capture_output=True, text=True, timeout=5
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=os.path.join(ROOT, "vosk-model-small-ru-0.22"),
+                        help="Путь к модели Vosk; несколько через запятую имя=путь — все модели сразу")
+    parser.add_argument("--wav", nargs="*", default=None, help="WAV-файлы (16 бит); по умолчанию генерируются")
+    parser.add_argument("--seconds", type=float, default=20.0, help="Длительность сгенерированного WAV")
+    parser.add_argument("--chunk-frames", default="1024,4096,8000", help="Размеры чанка во фреймах")
+    parser.add_argument("--partial", default="on,off", help="Частичные гипотезы: on, off или оба")
+    parser.add_argument("--worker", default="thread,process", help="Где декодировать: thread, process или оба")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="Темп проигрывания: 0 — максимально быстро (RTF), 1 — реальное время (задержки)")
+    parser.add_argument("--out", default=None, help="Файл для JSON (по умолчанию — stdout)")
+    args = parser.parse_args()
+
+    if "=" in args.model:
+        model = dict(item.split("=", 1) for item in args.model.split(","))
+    else:
+        model = args.model
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = args.wav
+        if not paths:
+            paths = [os.path.join(tmp, "generated.wav")]
+            make_wav(paths[0], args.seconds)
+
+        configs = [
+            {"chunk_frames": int(frames), "partial": partial == "on", "worker": worker}
+            for frames in args.chunk_frames.split(",")
+            for partial in args.partial.split(",")
+            for worker in args.worker.split(",")
+            # Несколько моделей распознаются только в процессах
+            if not (isinstance(model, dict) and len(model) > 1 and worker != "process")
+        ]
+
+        results = []
+        spawn = multiprocessing.get_context("spawn")
+        for config in configs:
+            # Свежий процесс на комбинацию: пиковая память и загрузка модели не накапливаются
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                result = pool.submit(run_config, config, paths, model, args.speed).result()
+            results.append(result)
+            first = result["first_partial_sec"]
+            print(
+                f"chunk={config['chunk_frames']:>5} partial={'on ' if config['partial'] else 'off'} "
+                f"worker={config['worker']:<7} rtf={result['rtf']:.3f} "
+                f"cpu={result['cpu_ms_per_audio_sec']:.1f} мс/с "
+                f"first_partial={'-' if first is None else f'{first:.3f}'} с",
+                file=sys.stderr,
+            )
+
+    report = {
+        "benchmark": "speech_stream",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "model": model,
+        "speed": args.speed,
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
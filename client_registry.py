@@ -0,0 +1,281 @@
+"""
+Общие на процесс клиенты API моделей и токенайзеры.
+
+Каждый GitHubModelsClient/ChatSession раньше создавал свой OpenAI(...) со своим
+пулом соединений и заново загружал токенайзер. С отдельной ChatSession на каждый
+чат это лишние TLS-рукопожатия и копии таблиц токенайзера. Реестр выдаёт один
+пул keep-alive соединений на пару (base_url, токен) и один объект кодировки на
+модель. Клиенты с разными max_retries — копии над одним пулом (with_options).
+
+Пулы строятся через DefaultHttpxClient/DefaultAsyncHttpxClient самого SDK: отдельный
+HTTP-транспорт (httpx или httpx2, смотря на чём собран openai) не импортируется.
+
+Асинхронные клиенты не разделяются: асинхронные соединения привязаны
+к циклу событий, в котором открыты. Они создаются с теми же настройками пула
+и учитываются в той же статистике.
+"""
+
+import hashlib
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+import tiktoken
+from openai import (
+    DEFAULT_CONNECTION_LIMITS,
+    DEFAULT_TIMEOUT,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    DefaultHttpxClient,
+    OpenAI,
+    Timeout,
+)
+
+# Тип настроек пула того транспорта, на котором собран SDK
+Limits = type(DEFAULT_CONNECTION_LIMITS)
+
+# Пул по умолчанию: несколько чатов и пакет запросов одновременно
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 10
+# Держим соединение между сообщениями чата, чтобы не повторять TLS-рукопожатие, с
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+# Кодировка, если tiktoken не знает модель
+FALLBACK_ENCODING = "cl100k_base"
+# Байт UTF-8 на токен в оценке, когда таблицы tiktoken недоступны
+APPROX_BYTES_PER_TOKEN = 4
+
+
+def _digest(token: str) -> str:
+    """Полный SHA-256 токена — ключ клиента: сам токен в словарях реестра не хранится."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _fingerprint(digest: str) -> str:
+    """Короткий отпечаток для статистики; как ключ не годится — возможны совпадения."""
+    return digest[:8]
+
+
+class _ConnectionStats:
+    __slots__ = ("base_url", "requests", "connections", "tls_handshakes")
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "base_url": self.base_url,
+            "requests": self.requests,
+            "connections": self.connections,
+            "tls_handshakes": self.tls_handshakes,
+            # Доля запросов, ушедших по уже открытому соединению
+            "reuse_rate": 1.0 - self.connections / self.requests if self.requests else 0.0,
+        }
+
+
+class _ApproxEncoding:
+    """
+    Оценка числа токенов без таблиц tiktoken: они скачиваются при первой загрузке,
+    и без сети (и без локального кэша) кодировку не получить. Для подсчёта токенов
+    и резерва TPM достаточно длины: один токен на APPROX_BYTES_PER_TOKEN байт UTF-8.
+    """
+
+    name = "approx"
+
+    def encode(self, text: str, **kwargs) -> list:
+        size = len(text.encode("utf-8"))
+        return [0] * (-(-size // APPROX_BYTES_PER_TOKEN))
+
+
+class ClientRegistry:
+    """
+    Использование:
+        from client_registry import registry
+        registry.configure(max_connections=10, keepalive_expiry=120)
+        client = registry.client("https://models.github.ai/inference", token)
+        encoding = registry.encoding("gpt-4o")
+        registry.stats()
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (base_url, SHA-256 токена, max_retries) -> клиент. Клиенты одного токена с разными
+        # max_retries — копии with_options() над одним пулом соединений
+        self._clients: Dict[Tuple[str, str, int], OpenAI] = {}
+        # (base_url, SHA-256 токена) -> клиент, владеющий пулом
+        self._owners: Dict[Tuple[str, str], OpenAI] = {}
+        self._encodings: Dict[str, "tiktoken.Encoding"] = {}
+        # Модели, для которых таблицы не загрузились и токены считаются оценкой
+        self._approx_encodings: Set[str] = set()
+        # Статистика соединений — на (base_url, SHA-256 токена), общая для любых max_retries
+        self._stats: Dict[Tuple[str, str], _ConnectionStats] = {}
+
+        self.max_connections = DEFAULT_MAX_CONNECTIONS
+        self.max_keepalive_connections = DEFAULT_MAX_KEEPALIVE_CONNECTIONS
+        self.keepalive_expiry = DEFAULT_KEEPALIVE_EXPIRY
+        self.timeout = DEFAULT_TIMEOUT
+
+        self.client_hits = 0
+        self.async_clients = 0
+        self.encoding_hits = 0
+
+    def configure(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Настройки пула для клиентов, созданных после вызова (уже выданные не меняются).
+        max_connections: предел одновременных соединений на клиент.
+        max_keepalive_connections: сколько простаивающих соединений держать открытыми.
+        keepalive_expiry: через сколько секунд простоя закрывать соединение.
+        timeout: общий таймаут запроса, с.
+        """
+        with self._lock:
+            if max_connections is not None:
+                self.max_connections = max_connections
+            if max_keepalive_connections is not None:
+                self.max_keepalive_connections = max_keepalive_connections
+            if keepalive_expiry is not None:
+                self.keepalive_expiry = keepalive_expiry
+            if timeout is not None:
+                self.timeout = Timeout(timeout, connect=5.0)
+
+    def client(self, base_url: str, token: str, max_retries: int = 0) -> OpenAI:
+        """
+        Общий синхронный клиент для (base_url, token, max_retries).
+        max_retries: встроенные повторы openai; по умолчанию их выполняет RateLimiter.
+        """
+        digest = _digest(token)
+        key = (base_url, digest, max_retries)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self.client_hits += 1
+                return client
+            owner = self._owners.get((base_url, digest))
+            if owner is not None:
+                client = owner.with_options(max_retries=max_retries)
+            else:
+                stats = self._stats_locked((base_url, digest))
+                http_client = DefaultHttpxClient(
+                    limits=self._limits(),
+                    timeout=self.timeout,
+                    event_hooks={"request": [lambda request: self._trace_request(request, stats)]},
+                )
+                client = OpenAI(base_url=base_url, api_key=token, max_retries=max_retries, http_client=http_client)
+                self._owners[(base_url, digest)] = client
+            self._clients[key] = client
+            return client
+
+    def async_client(self, base_url: str, token: str, max_retries: int = 0) -> AsyncOpenAI:
+        """Новый асинхронный клиент с настройками пула реестра (см. описание модуля)."""
+        with self._lock:
+            self.async_clients += 1
+            stats = self._stats_locked((base_url, _digest(token)))
+            limits = self._limits()
+            timeout = self.timeout
+
+        async def on_request(request):
+            self._trace_request(request, stats, asynchronous=True)
+
+        http_client = DefaultAsyncHttpxClient(limits=limits, timeout=timeout, event_hooks={"request": [on_request]})
+        return AsyncOpenAI(base_url=base_url, api_key=token, max_retries=max_retries, http_client=http_client)
+
+    def encoding(self, model: str) -> "tiktoken.Encoding":
+        """Общая кодировка tiktoken для модели ("gpt-4o", "openai/gpt-4o-mini", ...)."""
+        with self._lock:
+            encoding = self._encodings.get(model)
+            if encoding is not None:
+                self.encoding_hits += 1
+                return encoding
+        # Загрузка таблиц — сотни миллисекунд; вне блокировки, чтобы не держать другие потоки
+        name = model.rsplit("/", 1)[-1]
+        try:
+            try:
+                encoding = tiktoken.encoding_for_model(name)
+            except KeyError:
+                encoding = tiktoken.get_encoding(FALLBACK_ENCODING)
+        except (OSError, ValueError) as e:
+            # Таблицы не скачались (нет сети) или кэш повреждён — работаем по оценке
+            print(f"Кодировка tiktoken для {model} недоступна ({e.__class__.__name__}), токены считаются приближённо")
+            encoding = _ApproxEncoding()
+            with self._lock:
+                self._approx_encodings.add(model)
+        with self._lock:
+            return self._encodings.setdefault(model, encoding)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "client_hits": self.client_hits,
+                "async_clients": self.async_clients,
+                "encodings": sorted(self._encodings),
+                "encoding_hits": self.encoding_hits,
+                "approx_encodings": sorted(self._approx_encodings),
+                "pool": {
+                    "max_connections": self.max_connections,
+                    "max_keepalive_connections": self.max_keepalive_connections,
+                    "keepalive_expiry": self.keepalive_expiry,
+                },
+                "connections": {
+                    f"{base_url} #{_fingerprint(digest)}": stats.snapshot()
+                    for (base_url, digest), stats in self._stats.items()
+                },
+            }
+
+    def close(self):
+        """Закрыть соединения общих клиентов (например, при выходе из приложения)."""
+        with self._lock:
+            clients = list(self._owners.values())
+            self._owners.clear()
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+    # =========================
+    # Внутренние методы
+    # =========================
+
+    def _limits(self) -> Limits:
+        return Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def _stats_locked(self, key: Tuple[str, str]) -> _ConnectionStats:
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = _ConnectionStats(key[0])
+        return stats
+
+    def _trace_request(self, request, stats: _ConnectionStats, asynchronous: bool = False):
+        # Трассировка httpcore сообщает о новых TCP-соединениях и TLS-рукопожатиях;
+        # запрос без них ушёл по соединению из пула
+        def on_event(name: str):
+            if name == "connection.connect_tcp.started":
+                with self._lock:
+                    stats.connections += 1
+            elif name == "connection.start_tls.started":
+                with self._lock:
+                    stats.tls_handshakes += 1
+
+        if asynchronous:
+            async def trace(name, info):
+                on_event(name)
+        else:
+            def trace(name, info):
+                on_event(name)
+
+        request.extensions["trace"] = trace
+        with self._lock:
+            stats.requests += 1
+
+
+# Реестр процесса
+registry = ClientRegistry()
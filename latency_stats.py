@@ -0,0 +1,117 @@
+"""
+Гистограммы задержек с фиксированными логарифмическими корзинами.
+Запись — O(log корзин) без выделения памяти, снимок — count/min/max/mean и перцентили.
+"""
+
+import bisect
+import threading
+from typing import Dict, List, Optional
+
+
+def _log_bounds(lo: float, hi: float, per_decade: int) -> List[float]:
+    bounds = []
+    v = lo
+    step = 10 ** (1.0 / per_decade)
+    while v < hi * (1 + 1e-9):
+        bounds.append(v)
+        v *= step
+    return bounds
+
+
+# Верхние границы корзин в секундах: от 1 мкс до ~30 с, 10 корзин на декаду
+DEFAULT_BOUNDS = _log_bounds(1e-6, 30.0, 10)
+
+
+class LatencyHistogram:
+    def __init__(self, bounds: Optional[List[float]] = None):
+        self.bounds = list(bounds or DEFAULT_BOUNDS)
+        # Последняя корзина — всё, что больше верхней границы
+        self._counts = [0] * (len(self.bounds) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        if seconds < 0.0:
+            seconds = 0.0
+        idx = bisect.bisect_left(self.bounds, seconds)
+        with self._lock:
+            self._counts[idx] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds < self.min:
+                self.min = seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """Оценка перцентиля (0..100) по верхней границе корзины, в секундах."""
+        with self._lock:
+            return self._percentile_locked(q)
+
+    def snapshot(self) -> Dict[str, object]:
+        """Сводка в миллисекундах — для JSON."""
+        with self._lock:
+            if not self.count:
+                return {"count": 0}
+            return {
+                "count": self.count,
+                "mean_ms": self.total / self.count * 1000.0,
+                "min_ms": self.min * 1000.0,
+                "max_ms": self.max * 1000.0,
+                "p50_ms": self._percentile_locked(50) * 1000.0,
+                "p90_ms": self._percentile_locked(90) * 1000.0,
+                "p99_ms": self._percentile_locked(99) * 1000.0,
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(self.bounds) + 1)
+            self.count = 0
+            self.total = 0.0
+            self.min = float("inf")
+            self.max = 0.0
+
+    def _percentile_locked(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for idx, c in enumerate(self._counts):
+            seen += c
+            if seen >= rank and c:
+                upper = self.bounds[idx] if idx < len(self.bounds) else self.max
+                # Оценка не выходит за реально наблюдавшиеся min/max
+                return max(min(upper, self.max), self.min)
+        return self.max
+
+
+class LatencyStats:
+    """Набор именованных гистограмм; гистограмма создаётся при первом обращении."""
+
+    def __init__(self):
+        self._hists: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> LatencyHistogram:
+        hist = self._hists.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self._hists.setdefault(name, LatencyHistogram())
+        return hist
+
+    def add(self, name: str, seconds: float):
+        self[name].add(seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            hists = dict(self._hists)
+        return {name: hist.snapshot() for name, hist in hists.items()}
+
+    def reset(self):
+        with self._lock:
+            hists = list(self._hists.values())
+        for hist in hists:
+            hist.reset()
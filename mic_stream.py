@@ -1,12 +1,183 @@
-import json
 import math
-import queue
+import time
 import threading
 import contextlib
-from typing import Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
-import pyaudio
-from vosk import Model, KaldiRecognizer
+from vosk import KaldiRecognizer
+
+from audio_meter import measure_levels
+from audio_sources import AudioSource, PyAudioSource
+from audio_resample import AudioConverter
+from audio_vad import VoiceActivityDetector
+from audio_dsp import DSPChain
+from speech_archive import SpeechArchive
+from wake_word import WakeWordGate
+from speech_events import EventHub, TranscriptBuffer
+from recognizer_pool import RecognizerPool
+from recognizer_worker import AUDIO_TIMING, CPU_TIMING, RecognizerProcess, decode_chunks
+from recognizer_fanout import ModelFanout
+from pcm_ring import PCMRingBuffer, DROP_OLDEST, BLOCK
+from latency_stats import LatencyStats
+
+# Сессия по умолчанию — для poll() без client_id
+DEFAULT_CLIENT = "default"
+
+# Ёмкость буфера захвата в чанках (раньше — maxsize очереди), но не меньше RING_MIN_SEC секунд
+RING_CHUNKS = 32
+RING_MIN_SEC = 4.0
+
+
+# Сколько гипотез подряд слово должно продержаться без изменений, чтобы считаться стабильным
+STABLE_HYPOTHESES = 3
+
+
+class _ClientSession:
+    """Распознаватель клиента, его последний непрочитанный текст и слова текущей фразы."""
+
+    __slots__ = ("rec", "last_text", "words", "ages", "stable")
+
+    def __init__(self, rec: KaldiRecognizer):
+        self.rec = rec
+        self.last_text: Optional[str] = None
+        # Слова последней отправленной гипотезы и сколько гипотез подряд каждое не менялось
+        self.words: List[str] = []
+        self.ages: List[int] = []
+        self.stable = 0
+
+    def delta(self, words: List[dict], final: bool) -> Optional[dict]:
+        """
+        Дельта новой гипотезы относительно предыдущей:
+          keep — сколько слов предыдущей гипотезы осталось без изменений,
+          stable — длина префикса, который уже не меняется (финал — вся фраза),
+          words — хвост после keep: [{"w", "start", "end"}], время в секундах от начала распознавания.
+        None — гипотеза не изменилась. После финала следующая фраза начинается с keep = 0.
+        """
+        texts = [w["word"] for w in words]
+        prev = self.words
+        keep = 0
+        limit = min(len(prev), len(texts))
+        while keep < limit and prev[keep] == texts[keep]:
+            keep += 1
+
+        if final:
+            stable = len(texts)
+        else:
+            ages = self.ages[:keep]
+            for i in range(keep):
+                ages[i] += 1
+            ages.extend([1] * (len(texts) - keep))
+            stable = 0
+            while stable < len(ages) and ages[stable] >= STABLE_HYPOTHESES:
+                stable += 1
+            if keep == len(prev) == len(texts) and stable == self.stable:
+                self.ages = ages
+                return None
+
+        delta = {
+            "keep": keep,
+            "stable": stable,
+            "words": [_word_timing(w) for w in words[keep:]],
+            "final": final,
+        }
+        if final:
+            self.words, self.ages, self.stable = [], [], 0
+        else:
+            self.words, self.ages, self.stable = texts, ages, stable
+        return delta
+
+
+def _word_timing(word: dict) -> dict:
+    start = word.get("start")
+    end = word.get("end")
+    return {
+        "w": word["word"],
+        "start": round(start, 3) if start is not None else None,
+        "end": round(end, 3) if end is not None else None,
+    }
+
+
+class AdaptiveBatcher:
+    """
+    Размер пачки аудио для распознавателя в режиме низкой задержки.
+    Пока поток успевает, пачка равна периоду захвата (минимальная задержка);
+    при отставании забирается весь накопившийся хвост (до max_ms). Если декодирование
+    съедает больше cpu_budget от длительности аудио, нижняя граница пачки растёт:
+    реже вызывается PartialResult — меньше CPU ценой задержки. Когда нагрузка спадает,
+    граница постепенно возвращается к target_latency_ms и ниже.
+    """
+
+    def __init__(
+        self,
+        bytes_per_ms: float,
+        frame_bytes: int,
+        min_ms: float = 20.0,
+        max_ms: float = 500.0,
+        target_latency_ms: float = 150.0,
+        cpu_budget: float = 0.6,
+    ):
+        self.bytes_per_ms = bytes_per_ms
+        self.frame_bytes = frame_bytes
+        self.min_ms = min_ms
+        self.max_ms = max(max_ms, min_ms)
+        self.target_latency_ms = target_latency_ms
+        self.cpu_budget = cpu_budget
+
+        self.floor_ms = min_ms
+        self.cpu_ratio = 0.0
+        self.last_batch_ms = 0.0
+        self.last_latency_ms = 0.0
+        self.fallbacks = 0
+        self._since_change = 0
+
+    @property
+    def max_bytes(self) -> int:
+        return self._to_bytes(self.max_ms)
+
+    def next_read(self, backlog_bytes: int) -> Tuple[int, int]:
+        """(min_bytes, max_bytes) для следующего чтения из буфера захвата."""
+        floor = self._to_bytes(self.floor_ms)
+        # Отстаём — забираем всё накопившееся одной пачкой, иначе ровно нижнюю границу
+        batch = min(max(backlog_bytes, floor), self.max_bytes)
+        return floor, batch
+
+    def record(self, audio_ms: float, cpu_ms: float, latency_ms: float):
+        """Учитывает пачку: её длительность, CPU на декодирование и задержку от захвата."""
+        if audio_ms <= 0:
+            return
+        self.last_batch_ms = audio_ms
+        self.last_latency_ms = latency_ms
+        # Экспоненциальное сглаживание, чтобы одиночные всплески не дёргали размер
+        self.cpu_ratio = 0.8 * self.cpu_ratio + 0.2 * (cpu_ms / audio_ms)
+        # После изменения размера даём сглаженной оценке догнать новый режим
+        self._since_change += 1
+        if self._since_change < 5:
+            return
+
+        if self.cpu_ratio > self.cpu_budget and self.floor_ms < self.max_ms:
+            # Перегрузка: откатываемся к более крупным пачкам
+            self.floor_ms = min(self.max_ms, self.floor_ms * 1.5)
+            self.fallbacks += 1
+            self._since_change = 0
+        elif self.cpu_ratio < self.cpu_budget * 0.5 and self.floor_ms > self.min_ms:
+            limit = self.min_ms if latency_ms <= self.target_latency_ms else self.floor_ms
+            self.floor_ms = max(limit, self.floor_ms / 1.25)
+            self._since_change = 0
+
+    def stats(self) -> dict:
+        return {
+            "floor_ms": self.floor_ms,
+            "last_batch_ms": self.last_batch_ms,
+            "last_latency_ms": self.last_latency_ms,
+            "target_latency_ms": self.target_latency_ms,
+            "cpu_ratio": self.cpu_ratio,
+            "cpu_budget": self.cpu_budget,
+            "fallbacks": self.fallbacks,
+        }
+
+    def _to_bytes(self, ms: float) -> int:
+        n = int(ms * self.bytes_per_ms)
+        return max(self.frame_bytes, n - n % self.frame_bytes)
 
 
 class SpeechStream:
@@ -24,243 +195,701 @@ class SpeechStream:
             stream.stop()
     """
 
+    WORKERS = ("thread", "process")
+
     def __init__(
         self,
-        model_path: str,
-        sample_rate: int = 16000,
+        model_path: Union[str, Dict[str, str]],
+        sample_rate: Optional[int] = 16000,
         channels: int = 1,
         chunk_frames: int = 4096,
         device_index: Optional[int] = None,
         use_partial: bool = True,
+        vad: Optional[VoiceActivityDetector] = None,
+        level_interval: float = 0.1,
+        pool: Optional[RecognizerPool] = None,
+        source: Optional[AudioSource] = None,
+        on_text: Optional[Callable[[str, str, bool], None]] = None,
+        overflow_policy: str = DROP_OLDEST,
+        low_latency: bool = False,
+        capture_ms: float = 20.0,
+        target_latency_ms: float = 150.0,
+        cpu_budget: float = 0.6,
+        model_rate: int = 16000,
+        wake: Optional[WakeWordGate] = None,
+        worker: str = "thread",
+        worker_timeout: float = 5.0,
+        idle_suspend_sec: Optional[float] = None,
+        silence_suspend_sec: Optional[float] = None,
+        dsp: Optional[DSPChain] = None,
+        archive: Optional[SpeechArchive] = None,
     ):
         """
-        model_path: путь к папке распознающей модели Vosk.
-        sample_rate: частота дискретизации, рекомендуем 16000 Гц.
-        channels: 1 (моно) для Vosk.
+        model_path: путь к папке распознающей модели Vosk или словарь {имя: путь} для нескольких
+             моделей (например, {"ru": ..., "en": ...}): один захват распознаётся всеми, каждая модель
+             в своём процессе, из гипотез выбирается самая уверенная (см. recognizer_fanout).
+             Несколько моделей требуют worker="process"; первая из них — для пула и фразы активации.
+        sample_rate: частота захвата микрофона; None = родная частота устройства (44100/48000 у многих
+             USB-гарнитур). Аудио в любом случае приводится к model_rate моно.
+        channels: число каналов захвата; каналы сводятся в моно перед распознаванием.
         chunk_frames: размер аудиочанка (в фреймах) на итерацию.
         device_index: индекс устройства микрофона PyAudio (None = по умолчанию).
         use_partial: если True, poll() будет возвращать частичные распознавания.
+        vad: детектор речевой активности; если задан, распознаватель получает только
+             речь (плюс предзапись), а конец фразы определяется VAD. None = декодировать всё.
+        level_interval: минимальный интервал (сек) между событиями "level" в self.events.
+        pool: пул распознавателей над общей моделью; каждый клиент (client_id в poll())
+              получает из него свой KaldiRecognizer и независимую расшифровку одного и того же
+              аудио. None = собственный пул на один распознаватель без вытеснения; сессия
+              по умолчанию открывается в нём сразу, в общем пуле — при первом touch()/poll().
+        source: источник аудио (см. audio_sources); None = микрофон PyAudio с параметрами выше.
+              Частота и число каналов берутся из источника.
+        on_text: колбэк on_text(client_id, text, final) из рабочего потока на каждый новый текст.
+        overflow_policy: поведение буфера захвата при переполнении для живого источника:
+              "drop_oldest", "drop_newest" или "block". Записи и генераторы всегда ждут ("block").
+        low_latency: режим низкой задержки — захват короткими периодами capture_ms и подача
+              в распознаватель адаптивными пачками (см. AdaptiveBatcher) вместо chunk_frames.
+        capture_ms: период захвата микрофона в режиме низкой задержки.
+        target_latency_ms: желаемая задержка от захвата до подачи в распознаватель.
+        cpu_budget: доля длительности аудио, которую может занимать декодирование;
+              при превышении пачки автоматически укрупняются.
+        model_rate: частота, с которой работает распознаватель (и VAD, и замер уровня).
+        wake: режим ожидания по фразе активации; если задан, полный распознаватель включается
+              только после фразы активации и выключается после тишины (см. wake_word).
+        worker: где декодировать: "thread" — поток в этом процессе, "process" — отдельный
+              процесс со своей копией модели (аудио через общую память, см. recognizer_worker);
+              не конкурирует за GIL с Flask/webview и позволяет нескольким стримам занять несколько ядер.
+        worker_timeout: процесс, не вернувший результат пачки за столько секунд, перезапускается.
+        idle_suspend_sec: приостановить захват и декодирование, если столько секунд нет обращений
+              клиентов (poll, poll_since, touch). Модель и распознаватели остаются загруженными,
+              микрофон освобождается; возобновление — при следующем обращении (см. resume()).
+              Только для живого источника. None = не приостанавливать.
+        silence_suspend_sec: то же, если столько секунд не распознано ни слова. В режиме ожидания
+              фразы активации (wake) не применяется: ожидание и так дешёвое, а микрофон нужен.
+        dsp: предобработка аудио для распознавателя (ФВЧ, шумоподавление, шлюз, AGC;
+              см. audio_dsp.DSPChain.from_config). Работает в рабочем потоке на model_rate моно
+              и применяется к чанкам, которые пропустили VAD и фраза активации; уровни
+              громкости и решения VAD считаются по звуку до предобработки.
+        archive: архив услышанного (см. speech_archive): захваченное аудио до предобработки
+              уходит в WAV-сегменты, финалы — в полнотекстовый индекс. Запускается и
+              останавливается вместе со стримом.
         """
+        if worker not in self.WORKERS:
+            raise ValueError(f"Неизвестный режим worker: {worker!r}, допустимы {self.WORKERS}")
+        models = model_path if isinstance(model_path, dict) else {"default": model_path}
+        if not models:
+            raise ValueError("Нужна хотя бы одна модель")
+        if len(models) > 1 and worker != "process":
+            raise ValueError("Несколько моделей распознаются только в процессах: worker=\"process\"")
+        model_path = next(iter(models.values()))
+        if source is None:
+            if sample_rate is None:
+                sample_rate = PyAudioSource.default_sample_rate(device_index)
+            if low_latency:
+                chunk_frames = max(1, int(sample_rate * capture_ms / 1000.0))
+            source = PyAudioSource(sample_rate, channels, chunk_frames, device_index)
+        self.source = source
+
         self.model_path = model_path
-        self.sample_rate = sample_rate
-        self.channels = channels
-        self.chunk_frames = chunk_frames
+        self.models = models
+        # Источник работает в своём формате, распознаватель всегда получает model_rate моно
+        self._converter = AudioConverter(source.sample_rate, source.channels, model_rate)
+        self.sample_rate = model_rate
+        self.channels = 1
+        self.chunk_frames = self._converter.out_frames(source.chunk_frames)
         self.device_index = device_index
+        self.on_text = on_text
         self.use_partial = use_partial
-
-        # Инициализация Vosk
-        self._model = Model(self.model_path)
-        self._rec = KaldiRecognizer(self._model, self.sample_rate)
-
-        # Очередь для аудиоданных из callback
-        self._audio_q: "queue.Queue[bytes]" = queue.Queue(maxsize=32)
-
-        # PyAudio объекты
-        self._pa: Optional[pyaudio.PyAudio] = None
-        self._stream: Optional[pyaudio.Stream] = None
+        self.vad = vad
+        self.dsp = dsp
+        self.archive = archive
+        self.wake = wake
+        self.level_interval = level_interval
+
+        # Push-события для подписчиков (SSE): "level" с ограничением частоты, "delta" сразу
+        self.events = EventHub()
+        # Все partial/final с номерами seq — для опроса по курсору без потерь
+        self.transcript = TranscriptBuffer()
+        self._last_level_event = 0.0
+
+        self.worker = worker
+        self._remote: Optional[Union[RecognizerProcess, ModelFanout]] = None
+        if len(models) > 1:
+            # Аудио пишется в общую память один раз, каждая модель читает его в своём процессе
+            self._remote = ModelFanout(
+                models,
+                self.sample_rate,
+                use_partial=use_partial,
+                on_results=self._on_remote_results,
+                slow_timeout=worker_timeout,
+            )
+        elif worker == "process":
+            self._remote = RecognizerProcess(
+                model_path,
+                self.sample_rate,
+                use_partial=use_partial,
+                on_results=self._on_remote_results,
+                slow_timeout=worker_timeout,
+            )
+
+        # Инициализация Vosk: модель общая на процесс, распознаватели — из пула.
+        # В режиме процесса пул только ведёт учёт клиентов, распознаватели живут в процессе
+        own_pool = pool is None
+        if own_pool:
+            pool = RecognizerPool(
+                model_path,
+                self.sample_rate,
+                max_recognizers=1,
+                idle_timeout=None,
+                factory=(lambda: None) if self._remote is not None else None,
+            )
+        self.pool = pool
+        self._sessions: Dict[str, _ClientSession] = {}
+        self._sessions_lock = threading.RLock()
+        self._last_sweep = 0.0
+        if own_pool:
+            # Собственный пул — единственный клиент по умолчанию (on_text, poll() без client_id).
+            # В общем пуле место под него занимается при первом обращении, а не заранее
+            self.open_session(DEFAULT_CLIENT)
+
+        # Предвыделенный кольцевой буфер для аудио из источника и буфер чтения рабочего потока
+        bytes_per_frame = 2 * self.channels
+        self._chunk_bytes = self.chunk_frames * bytes_per_frame
+        bytes_per_sec = self.sample_rate * bytes_per_frame
+        self._ring = PCMRingBuffer(
+            capacity=max(RING_CHUNKS * self._chunk_bytes, int(RING_MIN_SEC * bytes_per_sec)),
+            policy=overflow_policy if self.source.live else BLOCK,
+            frame_bytes=bytes_per_frame,
+        )
+        self._batcher: Optional[AdaptiveBatcher] = None
+        if low_latency:
+            self._batcher = AdaptiveBatcher(
+                bytes_per_ms=bytes_per_sec / 1000.0,
+                frame_bytes=bytes_per_frame,
+                min_ms=self.chunk_frames * 1000.0 / self.sample_rate,
+                target_latency_ms=target_latency_ms,
+                cpu_budget=cpu_budget,
+            )
+        read_size = self._batcher.max_bytes if self._batcher else self._chunk_bytes
+        self._read_buf = bytearray(read_size)
+        self._read_view = memoryview(self._read_buf)
+
+        # Гистограммы задержек: ожидание в буфере, декодирование, разбор JSON, захват -> публикация
+        self.latency = LatencyStats()
 
         # Поток обработки распознавания
         self._worker_thread: Optional[threading.Thread] = None
         self._stop_event = threading.Event()
+        # Выставляется, когда конечный источник (файл, генератор) полностью обработан
+        self._finished = threading.Event()
+
+        # Автоприостановка: захват и рабочий цикл стоят, модель и распознаватели загружены
+        self.idle_suspend_sec = idle_suspend_sec
+        self.silence_suspend_sec = silence_suspend_sec if wake is None else None
+        self._suspend_lock = threading.Lock()
+        self._resume_event = threading.Event()
+        self._suspended = False
+        self._suspended_at = 0.0
+        self._last_activity = time.monotonic()
+        self._last_speech = time.monotonic()
+        self.suspends = 0
+        self.resumes = 0
+        self.suspended_sec_total = 0.0
+        self.last_suspend_reason: Optional[str] = None
 
         # Для передачи последних значений наружу
         self._result_lock = threading.Lock()
-        self._last_text: Optional[str] = None
         self._last_rms: float = 0.0
         self._last_dbfs: float = -float("inf")
+        self._last_levels: dict = measure_levels(b"", self.channels)
 
     def start(self):
-        """Запускает микрофон и поток обработки."""
-        if self._pa is not None:
+        """Запускает источник аудио и поток обработки."""
+        if self._worker_thread is not None:
             return
 
-        self._pa = pyaudio.PyAudio()
-        self._stream = self._pa.open(
-            format=pyaudio.paInt16,
-            channels=self.channels,
-            rate=self.sample_rate,
-            input=True,
-            input_device_index=self.device_index,
-            frames_per_buffer=self.chunk_frames,
-            stream_callback=self._pyaudio_callback,
-        )
-        self._stream.start_stream()
-
         self._stop_event.clear()
+        self._finished.clear()
+        self._suspended = False
+        self._resume_event.clear()
+        self._last_activity = self._last_speech = time.monotonic()
+        self._ring.reset()
+        self._converter.reset()
+        if self.vad is not None:
+            self.vad.reset()
+        if self.dsp is not None:
+            self.dsp.reset()
+        if self.wake is not None:
+            self.wake.reset()
+        if self._remote is not None:
+            # Ждёт, пока процесс загрузит модель
+            self._remote.start()
+        if self.archive is not None:
+            self.archive.start()
         self._worker_thread = threading.Thread(
             target=self._recognition_worker, name="SpeechStreamWorker", daemon=True
         )
         self._worker_thread.start()
 
-    def poll(self) -> Tuple[Optional[str], float, float]:
+        try:
+            self.source.start(self._on_audio, self._on_source_end)
+        except Exception:
+            self.stop()
+            raise
+
+    def wait_finished(self, timeout: Optional[float] = None) -> bool:
+        """Ждёт, пока конечный источник будет дочитан и распознан. Для микрофона не завершается."""
+        return self._finished.wait(timeout)
+
+    def poll(self, client_id: Optional[str] = None) -> Tuple[Optional[str], float, float]:
         """
         Возвращает кортеж (text, rms, dbfs):
           - text: распознанный фрагмент (partial или финальный), либо None, если нового текста нет
           - rms: корень среднеквадратичный уровень текущего чанка (0..32768 для int16)
           - dbfs: уровень в децибелах относительно full scale (0 дБFS = максимум, -∞ тишина)
         Вызывать часто (например, в цикле GUI/событий), чтобы получать обновления в реальном времени.
+        client_id: клиент со своим распознавателем (создаётся при первом обращении,
+            может бросить PoolExhausted); None = сессия по умолчанию.
         """
+        session = self.touch(client_id)
         with self._result_lock:
-            text = self._last_text
+            text = session.last_text
             rms = self._last_rms
             dbfs = self._last_dbfs
             # Сбрасываем только текст, чтобы не повторять тот же фрагмент:
-            self._last_text = None
+            session.last_text = None
         return text, rms, dbfs
 
+    def poll_since(self, since: int = 0, client_id: Optional[str] = None) -> Tuple[list, int, bool, float, float]:
+        """
+        Опрос по курсору: возвращает (events, cursor, gap, rms, dbfs).
+          - events: все события расшифровки клиента с seq > since, каждое —
+            {"seq", "kind": "partial"|"final", "client", "text", "ts"};
+          - cursor: передать как since в следующем вызове;
+          - gap: True, если буфер переполнился и часть событий после since потеряна.
+        В отличие от poll(), ничего не сбрасывает: клиенты не мешают друг другу.
+        """
+        client_id = client_id or DEFAULT_CLIENT
+        self.touch(client_id)
+        events, cursor, gap = self.transcript.since(since, client_id)
+        with self._result_lock:
+            rms = self._last_rms
+            dbfs = self._last_dbfs
+        return events, cursor, gap, rms, dbfs
+
+    def hypothesis(self, client_id: Optional[str] = None) -> List[str]:
+        """Слова текущей незавершённой гипотезы клиента — для пересинхронизации подписчика после пропуска."""
+        with self._sessions_lock:
+            session = self._sessions.get(client_id or DEFAULT_CLIENT)
+            return list(session.words) if session is not None else []
+
+    def open_session(self, client_id: str) -> _ClientSession:
+        """Выдаёт клиенту распознаватель из пула (повторный вызов возвращает ту же сессию)."""
+        with self._sessions_lock:
+            session = self._sessions.get(client_id)
+            if session is None:
+                rec = self.pool.acquire(client_id, on_evict=self._drop_session)
+                session = _ClientSession(rec)
+                self._sessions[client_id] = session
+            return session
+
+    def close_session(self, client_id: str):
+        """Возвращает распознаватель клиента в пул."""
+        with self._sessions_lock:
+            self._sessions.pop(client_id, None)
+            self.pool.release(client_id)
+
+    def touch(self, client_id: Optional[str] = None, resume: bool = True) -> _ClientSession:
+        """
+        Отмечает активность клиента; открывает сессию заново, если её вытеснили по простою.
+        resume: возобновить приостановленный стрим. Периодические пинги уже открытых
+            подписок передают False: они не дают уснуть по простою, но не будят после тишины.
+        """
+        client_id = client_id or DEFAULT_CLIENT
+        self._last_activity = time.monotonic()
+        if resume and self._suspended:
+            self.resume()
+        with self._sessions_lock:
+            session = self._sessions.get(client_id)
+            if session is not None and self.pool.touch(client_id):
+                return session
+            return self.open_session(client_id)
+
+    @property
+    def suspended(self) -> bool:
+        return self._suspended
+
+    def resume(self) -> bool:
+        """
+        Возобновляет приостановленный захват: открывает поток устройства и отпускает
+        рабочий цикл (без загрузки модели и создания потоков). False — стрим не был приостановлен.
+        """
+        with self._suspend_lock:
+            if not self._suspended:
+                return False
+            t0 = time.perf_counter()
+            # Аудио, застрявшее в буфере до приостановки, уже неактуально
+            self._ring.reset()
+            self._converter.reset()
+            if self.vad is not None:
+                self.vad.reset()
+            if self.dsp is not None:
+                self.dsp.reset()
+            self.source.start(self._on_audio, self._on_source_end)
+            now = time.monotonic()
+            self.suspended_sec_total += now - self._suspended_at
+            self._last_activity = self._last_speech = now
+            self._suspended = False
+            self.resumes += 1
+            self._resume_event.set()
+            self.latency.add("resume", time.perf_counter() - t0)
+        self.events.publish("suspend", {"suspended": False})
+        return True
+
+    def suspend_stats(self) -> dict:
+        """Сколько раз стрим засыпал и просыпался, сколько проспал и почему уснул в последний раз."""
+        with self._suspend_lock:
+            suspended_sec = self.suspended_sec_total
+            if self._suspended:
+                suspended_sec += time.monotonic() - self._suspended_at
+            return {
+                "suspended": self._suspended,
+                "suspends": self.suspends,
+                "resumes": self.resumes,
+                "suspended_sec_total": suspended_sec,
+                "last_reason": self.last_suspend_reason,
+                "idle_suspend_sec": self.idle_suspend_sec,
+                "silence_suspend_sec": self.silence_suspend_sec,
+            }
+
+    def levels(self) -> dict:
+        """
+        Полный замер последнего чанка: rms, peak, dbfs, peak_dbfs, clipped
+        (число сэмплов на границе int16) и channels (RMS по каждому каналу).
+        """
+        with self._result_lock:
+            return dict(self._last_levels)
+
+    def vad_stats(self) -> dict:
+        """
+        Статистика VAD: сколько чанков пропущено без декодирования, сколько подано
+        в распознаватель, идёт ли сейчас речь. Пустой словарь, если VAD не задан.
+        """
+        if self.vad is None:
+            return {}
+        return self.vad.stats()
+
     def stop(self):
         """Останавливает поток распознавания и освобождает ресурсы."""
         self._stop_event.set()
+        # Будит рабочий цикл, если стрим приостановлен
+        self._resume_event.set()
+        # Закрытие буфера будит писателя, ждущего места, и читателя
+        self._ring.close()
+
+        with contextlib.suppress(Exception):
+            self.source.stop()
 
         if self._worker_thread:
             self._worker_thread.join(timeout=2.0)
             self._worker_thread = None
 
-        if self._stream:
-            with contextlib.suppress(Exception):
-                if self._stream.is_active():
-                    self._stream.stop_stream()
-            with contextlib.suppress(Exception):
-                self._stream.close()
-            self._stream = None
+        if self._remote is not None:
+            self._remote.stop()
 
-        if self._pa:
-            with contextlib.suppress(Exception):
-                self._pa.terminate()
-            self._pa = None
+        if self.archive is not None:
+            # После дожатых финалов: они тоже попадут в индекс
+            self.archive.stop()
 
-        # Очистка очереди
-        with self._drain_queue(self._audio_q):
-            pass
+        self._ring.reset()
 
     # =========================
     # Внутренние методы
     # =========================
 
-    def _pyaudio_callback(self, in_data, frame_count, time_info, status):
-        # Неблокирующе складываем данные; при переполнении тихо отбрасываем самый старый элемент
-        try:
-            self._audio_q.put_nowait(in_data)
-        except queue.Full:
-            try:
-                _ = self._audio_q.get_nowait()
-            except queue.Empty:
-                pass
-            try:
-                self._audio_q.put_nowait(in_data)
-            except queue.Full:
-                pass
-        return (None, pyaudio.paContinue)
+    def stats(self) -> dict:
+        """
+        Сводка для настройки: задержки (мс, перцентили) по этапам
+          queue_wait — от захвата до чтения рабочим потоком,
+          decode — AcceptWaveform, result — Result/PartialResult/FinalResult,
+          json_parse — разбор ответа Vosk,
+          cpu — CPU процесса распознавания на пачку (worker="process"),
+          to_partial / to_final — от захвата аудио до публикации текста,
+        а также состояние буфера захвата, VAD, режима ожидания и пула распознавателей.
+        """
+        return {
+            "chunk_frames": self.chunk_frames,
+            "chunk_ms": self.chunk_frames * 1000.0 / self.sample_rate,
+            "capture": {"sample_rate": self.source.sample_rate, "channels": self.source.channels},
+            "latency": self.latency.snapshot(),
+            "buffer": self._ring.stats(),
+            "vad": self.vad_stats(),
+            "dsp": self.dsp.stats() if self.dsp is not None else {},
+            "wake": self.wake.stats() if self.wake else None,
+            "pool": self.pool.stats(),
+            "batching": self._batcher.stats() if self._batcher else None,
+            "suspend": self.suspend_stats(),
+            "archive": self.archive.stats() if self.archive is not None else None,
+            "worker": dict(self._remote.stats(), mode=self.worker) if self._remote else {"mode": self.worker},
+        }
+
+    def buffer_stats(self) -> dict:
+        """Состояние буфера захвата: заполненность, переполнения (overruns, dropped_bytes), underruns."""
+        return self._ring.stats()
+
+    def _on_audio(self, data: bytes, captured_at: Optional[float] = None):
+        # Приведение к формату распознавателя и одна запись в кольцевой буфер вместе со временем захвата
+        pcm = self._converter.convert(data)
+        captured_at = captured_at or time.time()
+        self._ring.write(pcm, captured_at)
+        if self.archive is not None:
+            # Копия в буфер архива; на диск пишет его фоновый поток
+            self.archive.write(pcm, captured_at)
+
+    def _on_source_end(self):
+        self._ring.close()
 
     def _recognition_worker(self):
-        # int16, моно: 2 байта на фрейм
-        bytes_per_frame = 2 * self.channels
         while not self._stop_event.is_set():
-            try:
-                data = self._audio_q.get(timeout=0.1)
-            except queue.Empty:
+            reason = self._suspend_reason()
+            if reason is not None:
+                self._suspend(reason)
+            if self._suspended:
+                # Цикл стоит до resume() или stop()
+                self._resume_event.wait(0.5)
                 continue
-
-            # Обновляем измерения громкости
-            rms = self._rms_int16(data, bytes_per_frame)
-            dbfs = self._rms_to_dbfs(rms)
-
-            text_update: Optional[str] = None
-            try:
-                # Подаём чанки в Vosk
-                accepted = self._rec.AcceptWaveform(data)
-                if accepted:
-                    # Финальная гипотеза после детектированной паузы
-                    res = json.loads(self._rec.Result())
-                    t = res.get("text", "").strip()
-                    if t:
-                        text_update = t
-                else:
-                    if self.use_partial:
-                        # Частичная гипотеза для онлайна
-                        pres = json.loads(self._rec.PartialResult())
-                        pt = pres.get("partial", "").strip()
-                        if pt:
-                            text_update = pt
-            except Exception:
-                # Ошибки распознавания не должны валить поток
-                pass
+            if self._batcher is not None:
+                min_bytes, max_bytes = self._batcher.next_read(self._ring.available)
+            else:
+                min_bytes = max_bytes = self._chunk_bytes
+            n, captured_at = self._ring.readinto(self._read_view[:max_bytes], min_bytes=min_bytes, timeout=0.1)
+            if n == 0:
+                if self._ring.closed and self._ring.available == 0 and not self._stop_event.is_set():
+                    # Конечный источник дочитан
+                    self._flush_sessions()
+                    self._finished.set()
+                    break
+                continue
+            self.latency.add("queue_wait", time.time() - captured_at)
+            # Копия нужна: чанк может остаться в предзаписи VAD, а буфер чтения переиспользуется
+            data = bytes(self._read_view[:n])
+
+            # Уровень и решения VAD/фразы активации — по исходному звуку:
+            # после AGC шум комнаты поднимается до уровня речи и открывал бы VAD
+            levels = measure_levels(data, self.channels)
+
+            chunks, end_of_utterance = self._gate(data, levels["dbfs"])
+            if chunks and self.dsp is not None:
+                # Предобработка — только для аудио, которое уходит распознавателю
+                chunks = [self.dsp.process(chunk) for chunk in chunks]
+
+            updates = []
+            fed = False
+            cpu_started = time.thread_time()
+            if (chunks or end_of_utterance) and self._remote is not None:
+                # Декодирование в отдельном процессе; результаты и CPU пачки придут в _on_remote_results
+                with self._sessions_lock:
+                    clients = list(self._sessions)
+                fed = self._remote.feed(chunks, end_of_utterance, clients, captured_at) and bool(chunks)
+            elif chunks or end_of_utterance:
+                # Под блокировкой: сессию не вернут в пул посреди декодирования
+                with self._sessions_lock:
+                    for client_id, session in self._sessions.items():
+                        try:
+                            results = self._decode(session.rec, chunks, end_of_utterance)
+                        except Exception:
+                            # Ошибки распознавания не должны валить поток
+                            continue
+                        for text_update, words, final in results:
+                            updates.append((client_id, session, text_update, words, final))
+            if self._batcher is not None and not fed:
+                self._batcher.record(
+                    audio_ms=n / self._batcher.bytes_per_ms,
+                    cpu_ms=(time.thread_time() - cpu_started) * 1000.0,
+                    latency_ms=(time.time() - captured_at) * 1000.0,
+                )
 
             with self._result_lock:
-                self._last_rms = rms
-                self._last_dbfs = dbfs
-                # Обновляем текст, только если есть новый фрагмент
-                if text_update:
-                    self._last_text = text_update
-
-    @staticmethod
-    def _rms_int16(raw: bytes, bytes_per_frame: int) -> float:
+                self._last_rms = levels["rms"]
+                self._last_dbfs = levels["dbfs"]
+                self._last_levels = levels
+            entries = self._store_updates(updates, captured_at)
+
+            self._publish(levels, entries)
+            self._sweep_idle()
+
+    def _suspend_reason(self) -> Optional[str]:
+        if self._suspended or not self.source.live:
+            return None
+        now = time.monotonic()
+        if self.idle_suspend_sec is not None and now - self._last_activity >= self.idle_suspend_sec:
+            return "idle"
+        if self.silence_suspend_sec is not None and now - self._last_speech >= self.silence_suspend_sec:
+            return "silence"
+        return None
+
+    def _suspend(self, reason: str):
+        # Вызывается из рабочего потока: устройство освобождается, фразы дожимаются
+        with self._suspend_lock:
+            if self._suspended or self._stop_event.is_set():
+                return
+            self._suspended = True
+            self._resume_event.clear()
+            self._suspended_at = time.monotonic()
+            self.suspends += 1
+            self.last_suspend_reason = reason
+            with contextlib.suppress(Exception):
+                self.source.suspend()
+        self._flush_sessions()
+        self.events.publish("suspend", {"suspended": True, "reason": reason})
+
+    def _gate(self, data: bytes, dbfs: float) -> Tuple[List[bytes], bool]:
+        """Какие чанки отдать полному распознавателю: фраза активации, затем VAD."""
+        if self.wake is not None:
+            was_awake = self.wake.awake
+            replay, fell_asleep = self.wake.feed(data, dbfs)
+            if fell_asleep:
+                self.events.publish("wake", {"awake": False})
+                # Ожидание: дожимаем начатую фразу, дальше полный распознаватель простаивает
+                if self.vad is not None:
+                    self.vad.reset()
+                return [], True
+            if not self.wake.awake:
+                return [], False
+            if not was_awake:
+                self.events.publish("wake", {"awake": True, "phrase": self.wake.last_phrase})
+                # Предзапись VAD устарела: всё до срабатывания уже в replay
+                if self.vad is not None:
+                    self.vad.reset()
+                return replay, False
+
+        if self.vad is not None:
+            return self.vad.feed(data, dbfs)
+        return [data], False
+
+    def _flush_sessions(self):
+        # Конец данных: дожимаем финальные гипотезы всех сессий
+        if self._remote is not None:
+            with self._sessions_lock:
+                clients = list(self._sessions)
+            self._remote.flush(clients, timeout=self._remote.slow_timeout * 2)
+            return
+        updates = []
+        with self._sessions_lock:
+            for client_id, session in self._sessions.items():
+                try:
+                    results = self._decode(session.rec, [], True)
+                except Exception:
+                    continue
+                for text_update, words, final in results:
+                    updates.append((client_id, session, text_update, words, final))
+        for entry, delta in self._store_updates(updates, time.time()):
+            self._publish_text(entry, delta)
+
+    def _on_remote_results(self, updates: list, captured_at: float, timings: list):
+        # Поток чтения результатов процесса: замеры и тексты, как у локального декодирования
+        cpu_sec = audio_sec = 0.0
+        for name, seconds in timings:
+            if name == AUDIO_TIMING:
+                audio_sec += seconds
+                continue
+            if name == CPU_TIMING:
+                cpu_sec += seconds
+            self.latency.add(name, seconds)
+        if self._batcher is not None and audio_sec > 0.0:
+            # CPU считается в процессе распознавания: время потока родителя его не содержит
+            self._batcher.record(
+                audio_ms=audio_sec * 1000.0,
+                cpu_ms=cpu_sec * 1000.0,
+                latency_ms=(time.time() - captured_at) * 1000.0,
+            )
+        # От нескольких моделей обновление приходит с пятым элементом: какая модель и насколько уверена
+        with self._sessions_lock:
+            resolved, choices = [], []
+            for client_id, text_update, words, final, *choice in updates:
+                if client_id in self._sessions:
+                    resolved.append((client_id, self._sessions[client_id], text_update, words, final))
+                    choices.append(choice[0] if choice else None)
+        for entry, delta in self._store_updates(resolved, captured_at, choices):
+            self._publish_text(entry, delta)
+
+    def _store_updates(self, updates: list, captured_at: float, choices: Optional[list] = None) -> list:
         """
-        Быстрый RMS для int16 моно/стерео; возвращает величину в диапазоне ~0..32768 для 16‑бит.
-        Для многоканального ввода берётся среднее RMS по каналам.
+        Сохраняет новые тексты; возвращает [(запись расшифровки, дельта слов или None)].
+        choices: для нескольких моделей — {"model", "confidence"} каждого обновления (или None).
         """
-        # Разворачиваем в int16
-        import array
-
-        # Если не целое число сэмплов — обрезаем хвост
-        tail = len(raw) % 2
-        if tail:
-            raw = raw[:-tail]
+        if updates:
+            self._last_speech = time.monotonic()
+        with self._result_lock:
+            # Обновляем текст, только если есть новый фрагмент
+            for _, session, text_update, _, _ in updates:
+                session.last_text = text_update
+        # Дельты считаются только здесь, всегда в одном потоке (рабочем или, в режиме процесса,
+        # потоке чтения результатов), — состояние слов сессии без блокировок
+        stored = []
+        for i, (client_id, session, text_update, words, final) in enumerate(updates):
+            entry = self.transcript.append(client_id, "final" if final else "partial", text_update, captured_at)
+            delta = session.delta(words, final)
+            choice = choices[i] if choices else None
+            if choice:
+                entry.update(choice)
+                if delta is not None:
+                    delta.update(choice)
+            if final and self.archive is not None:
+                self.archive.add_transcript(
+                    client_id, text_update, words, captured_at,
+                    model=choice["model"] if choice else None,
+                    confidence=choice["confidence"] if choice else None,
+                )
+            stored.append((entry, delta))
+        return stored
+
+    def _publish(self, levels: dict, entries: list):
+        for entry, delta in entries:
+            self._publish_text(entry, delta)
+        now = time.monotonic()
+        if now - self._last_level_event >= self.level_interval:
+            self._last_level_event = now
+            dbfs = levels["dbfs"]
+            self.events.publish("level", {
+                "rms": levels["rms"],
+                # -inf не сериализуется в валидный JSON
+                "dbfs": dbfs if math.isfinite(dbfs) else None,
+                "peak": levels["peak"],
+            })
+
+    def _publish_text(self, entry: dict, delta: Optional[dict]):
+        final = entry["kind"] == "final"
+        self.latency.add("to_final" if final else "to_partial", time.time() - entry["ts"])
+        if delta is not None:
+            # Подписчикам — только изменившийся хвост гипотезы, а не вся растущая строка
+            delta["client"] = entry["client"]
+            delta["seq"] = entry["seq"]
+            delta["ts"] = entry["ts"]
+            self.events.publish("delta", delta)
+        if self.on_text is not None:
+            try:
+                self.on_text(entry["client"], entry["text"], final)
+            except Exception:
+                pass
 
-        if not raw:
-            return 0.0
+    def _sweep_idle(self):
+        # Вытеснение простаивающих распознавателей — не чаще раза в секунду
+        now = time.monotonic()
+        if now - self._last_sweep >= 1.0:
+            self._last_sweep = now
+            self.pool.evict_idle()
 
-        a = array.array("h")
-        a.frombytes(raw)
+    def _drop_session(self, client_id: str):
+        # Колбэк пула: распознаватель клиента отобран по простою
+        with self._sessions_lock:
+            self._sessions.pop(client_id, None)
 
-        # Если несколько каналов, усредняем по каналам
-        if bytes_per_frame > 2:
-            channels = bytes_per_frame // 2
-            n = len(a) // channels
-            if n == 0:
-                return 0.0
-            # Пофреймово среднее по каналам -> моно, затем RMS
-            # Это компромисс: можно точнее, но дороже.
-            acc = 0.0
-            idx = 0
-            for _ in range(n):
-                s = 0.0
-                for c in range(channels):
-                    s += a[idx + c]
-                s /= channels
-                acc += s * s
-                idx += channels
-            mean_sq = acc / n
-            return math.sqrt(mean_sq)
-
-        # Моно
-        acc = 0.0
-        for v in a:
-            acc += v * v
-        mean_sq = acc / len(a)
-        return math.sqrt(mean_sq)
-
-    @staticmethod
-    def _rms_to_dbfs(rms: float) -> float:
-        """
-        Перевод RMS (int16) в dBFS: 0 дБFS соответствует пиковой амплитуде 32767.
-        """
-        # Для RMS максимальное теоретическое значение меньше 32767,
-        # но используем 32767 как full-scale для удобной интерпретации.
-        full_scale = 32767.0
-        if rms <= 0.0:
-            return -float("inf")
-        ratio = rms / full_scale
-        return 20.0 * math.log10(ratio)
-
-    @contextlib.contextmanager
-    def _drain_queue(self, q: "queue.Queue[bytes]"):
-        try:
-            yield
-        finally:
-            with contextlib.suppress(Exception):
-                while not q.empty():
-                    _ = q.get_nowait()
+    def _decode(
+        self, rec: KaldiRecognizer, chunks, end_of_utterance: bool
+    ) -> List[Tuple[str, List[dict], bool]]:
+        """Подаёт чанки в Vosk и возвращает новые тексты по порядку: [(текст, слова с таймингами, финальный ли)]."""
+        return decode_chunks(rec, chunks, end_of_utterance, self.use_partial, self.latency)
 
 
 # Пример самостоятельного запуска:
@@ -269,15 +898,29 @@ if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser()
-    parser.add_argument("--model", required=True, help="Путь к папке модели Vosk")
+    parser.add_argument("--model", required=True, action="append",
+                        help="Путь к папке модели Vosk; несколько --model [имя=]путь — распознавание всеми сразу")
     parser.add_argument("--device", type=int, default=None, help="Индекс микрофона PyAudio")
+    parser.add_argument("--rate", type=int, default=16000, help="Частота захвата микрофона (0 = родная частота устройства)")
     parser.add_argument("--partial", action="store_true", help="Возвращать частичные результаты")
+    parser.add_argument("--wav", default=None, help="Распознать WAV-файл вместо микрофона")
+    parser.add_argument("--speed", type=float, default=1.0, help="Ускорение воспроизведения WAV (0 = максимально быстро)")
     args = parser.parse_args()
 
+    source = None
+    if args.wav:
+        from audio_sources import WavFileSource
+        source = WavFileSource(args.wav, speed=args.speed)
+
+    models = dict(m.split("=", 1) if "=" in m else (m, m) for m in args.model)
+
     stream = SpeechStream(
-        model_path=args.model,
+        model_path=models if len(models) > 1 else next(iter(models.values())),
+        worker="process" if len(models) > 1 else "thread",
         device_index=args.device,
+        sample_rate=args.rate or None,
         use_partial=bool(args.partial),
+        source=source,
     )
     stream.start()
     print("Слушаю... Нажмите Ctrl+C для выхода.")
@@ -286,9 +929,9 @@ if __name__ == "__main__":
             text, rms, dbfs = stream.poll()
             if text is not None:
                 print(f"text='{text}'  rms={rms:.1f}  dBFS={dbfs:.1f}")
-            else:
-                # Периодически печатаем только громкость, если нужно
-                pass
+            elif stream.wait_finished(0):
+                # Файл дочитан, последний текст уже выведен
+                break
             time.sleep(0.02)
     except KeyboardInterrupt:
         pass
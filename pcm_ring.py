@@ -0,0 +1,200 @@
+"""
+Предвыделенный кольцевой буфер int16 PCM для одного писателя (callback источника)
+и одного читателя (поток распознавания).
+
+Память выделяется один раз (bytearray + memoryview); запись — одно копирование
+под одной короткой блокировкой, чтение — readinto() в буфер читателя без
+выделения памяти. Вместе с данными хранится время захвата каждой записи.
+"""
+
+import threading
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+
+
+class PCMRingBuffer:
+    POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+    def __init__(self, capacity: int, policy: str = DROP_OLDEST, frame_bytes: int = 2):
+        """
+        capacity: размер буфера в байтах (округляется вниз до целых фреймов).
+        policy: что делать при переполнении:
+            "drop_oldest" — затирать самые старые данные (живой микрофон),
+            "drop_newest" — отбрасывать новые данные, которые не влезли,
+            "block" — ждать, пока читатель освободит место (запись из файла).
+        frame_bytes: размер фрейма; отбрасывание всегда идёт целыми фреймами.
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Неизвестная политика переполнения: {policy!r}, допустимы {self.POLICIES}")
+        capacity -= capacity % frame_bytes
+        if capacity <= 0:
+            raise ValueError("Ёмкость буфера должна вмещать хотя бы один фрейм")
+
+        self.capacity = capacity
+        self.policy = policy
+        self.frame_bytes = frame_bytes
+
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        # Абсолютные позиции (байт с начала потока); индекс в буфере — pos % capacity
+        self._write_pos = 0
+        self._read_pos = 0
+        # (абсолютная позиция конца записи, время захвата)
+        self._marks: Deque[Tuple[int, float]] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.overruns = 0
+        self.dropped_bytes = 0
+        self.underruns = 0
+
+    @property
+    def available(self) -> int:
+        """Сколько байт готово к чтению."""
+        return self._write_pos - self._read_pos
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def write(self, data, captured_at: float = 0.0, timeout: Optional[float] = None) -> int:
+        """
+        Записывает данные (bytes-like). Возвращает число записанных байт.
+        При политике "block" ждёт свободного места до timeout секунд (None — без ограничения).
+        """
+        src = memoryview(data).cast("B")
+        total = len(src)
+        if total == 0:
+            return 0
+
+        with self._cond:
+            if self._closed:
+                return 0
+
+            if self.policy == BLOCK:
+                written = 0
+                while written < total:
+                    if not self._cond.wait_for(lambda: self._closed or self.available < self.capacity, timeout):
+                        self.overruns += 1
+                        self.dropped_bytes += total - written
+                        break
+                    if self._closed:
+                        break
+                    n = min(total - written, self.capacity - self.available)
+                    self._copy_in_locked(src[written:written + n])
+                    written += n
+                    self._mark_locked(captured_at)
+                return written
+
+            free = self.capacity - self.available
+            if total > free:
+                self.overruns += 1
+                if self.policy == DROP_NEWEST:
+                    keep = free - free % self.frame_bytes
+                    self.dropped_bytes += total - keep
+                    src = src[:keep]
+                else:
+                    if total > self.capacity:
+                        # Больше всего буфера: остаётся только хвост записи
+                        self.dropped_bytes += total - self.capacity
+                        src = src[total - self.capacity:]
+                    drop = len(src) - free
+                    drop += -drop % self.frame_bytes
+                    drop = min(drop, self.available)
+                    self._read_pos += drop
+                    self.dropped_bytes += drop
+                    self._pop_marks_locked()
+            if len(src):
+                self._copy_in_locked(src)
+                self._mark_locked(captured_at)
+            return len(src)
+
+    def readinto(self, out, min_bytes: int = 1, timeout: Optional[float] = None) -> Tuple[int, float]:
+        """
+        Читает до len(out) байт в готовый буфер читателя (bytearray/memoryview), не выделяя память.
+        Ждёт, пока накопится min_bytes; после close() отдаёт и неполный остаток.
+        Возвращает (прочитано байт, время захвата последнего прочитанного байта).
+        0 байт означает таймаут (считается как underrun) или закрытый и пустой буфер.
+        """
+        dst = memoryview(out).cast("B")
+        want = len(dst)
+        want -= want % self.frame_bytes
+        min_bytes = max(1, min(min_bytes, want))
+
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._closed or self.available >= min_bytes, timeout):
+                # Недобор: за timeout не накопилось столько, сколько нужно читателю
+                self.underruns += 1
+                return 0, 0.0
+            n = min(want, self.available)
+            n -= n % self.frame_bytes
+            if n <= 0:
+                return 0, 0.0
+
+            start = self._read_pos % self.capacity
+            first = min(n, self.capacity - start)
+            dst[:first] = self._view[start:start + first]
+            if first < n:
+                dst[first:n] = self._view[:n - first]
+            self._read_pos += n
+            captured_at = self._pop_marks_locked()
+            self._cond.notify_all()
+            return n, captured_at
+
+    def close(self):
+        """Закрывает буфер: писатель больше не пишет, читатель дочитывает остаток и получает 0."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reset(self):
+        """Очищает данные и открывает буфер заново (счётчики сохраняются)."""
+        with self._cond:
+            self._write_pos = 0
+            self._read_pos = 0
+            self._marks.clear()
+            self._closed = False
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "available": self.available,
+            "policy": self.policy,
+            "overruns": self.overruns,
+            "dropped_bytes": self.dropped_bytes,
+            "underruns": self.underruns,
+        }
+
+    # =========================
+    # Внутренние методы
+    # =========================
+
+    def _copy_in_locked(self, src: memoryview):
+        n = len(src)
+        start = self._write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self._view[start:start + first] = src[:first]
+        if first < n:
+            self._view[:n - first] = src[first:]
+        self._write_pos += n
+        self._cond.notify_all()
+
+    def _mark_locked(self, captured_at: float):
+        self._marks.append((self._write_pos, captured_at))
+
+    def _pop_marks_locked(self) -> float:
+        # Время захвата записи, в которую попал последний прочитанный байт
+        marks = self._marks
+        while marks and marks[0][0] < self._read_pos:
+            marks.popleft()
+        if not marks:
+            return 0.0
+        end, captured_at = marks[0]
+        if end == self._read_pos:
+            marks.popleft()
+        return captured_at
@@ -0,0 +1,323 @@
+"""
+Клиентский ограничитель запросов к API моделей: бюджеты запросов и токенов в минуту
+(token bucket), приоритет интерактивного чата над фоновыми пакетами и расписание
+повторов с экспоненциальной задержкой и случайным разбросом.
+
+Запрос сначала резервирует один запрос и оценку токенов (промпт + max_tokens),
+после ответа резерв уточняется по usage. Заголовки ответа (x-ratelimit-remaining-*)
+подтягивают локальные бюджеты к серверным, а 429 с retry-after придерживает
+всех ожидающих до указанного времени — так поток держится у лимита, не упираясь в него.
+"""
+
+import time
+import heapq
+import random
+import asyncio
+import threading
+import itertools
+import email.utils
+from typing import Dict, List, Mapping, Optional, Tuple
+
+# Приоритеты: меньше — раньше
+INTERACTIVE = 0
+BATCH = 1
+
+# Как часто асинхронный ожидающий, который ещё не первый в очереди, проверяет её, с
+ASYNC_POLL_SEC = 0.05
+# Разброс поверх retry-after, доля: ожидающие не просыпаются одновременно
+RETRY_AFTER_JITTER = 0.1
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Длительность из заголовков x-ratelimit-reset-*: "1s", "6m0s", "250ms", "2.5"."""
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total = 0.0
+    number = ""
+    i = 0
+    while i < len(value):
+        ch = value[i]
+        if ch.isdigit() or ch == ".":
+            number += ch
+            i += 1
+            continue
+        unit = "ms" if value.startswith("ms", i) else ch
+        i += len(unit)
+        if not number:
+            return None
+        scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}.get(unit)
+        if scale is None:
+            return None
+        total += float(number) * scale
+        number = ""
+    return total if not number else None
+
+
+def retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Сколько ждать по заголовкам ответа (retry-after-ms, retry-after, x-ratelimit-reset-*), с."""
+    if not headers:
+        return None
+    raw = headers.get("retry-after-ms")
+    if raw:
+        try:
+            return float(raw) / 1000.0
+        except ValueError:
+            pass
+    raw = headers.get("retry-after")
+    if raw:
+        try:
+            return max(0.0, float(raw))
+        except ValueError:
+            # HTTP-дата
+            try:
+                parsed = email.utils.parsedate_to_datetime(raw)
+            except (TypeError, ValueError):
+                parsed = None
+            if parsed is not None:
+                return max(0.0, parsed.timestamp() - time.time())
+    # Бюджет исчерпан — ждём его восстановления
+    resets = []
+    for kind in ("requests", "tokens"):
+        remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+        reset = headers.get(f"x-ratelimit-reset-{kind}")
+        if remaining is not None and reset and remaining.strip() == "0":
+            seconds = _parse_duration(reset)
+            if seconds is not None:
+                resets.append(seconds)
+    return max(resets) if resets else None
+
+
+class TokenBucket:
+    """Бюджет «столько-то в минуту» с накоплением до burst; None — без ограничения."""
+
+    def __init__(self, per_minute: Optional[float], burst: Optional[float] = None):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0 if per_minute else None
+        self.capacity = float(burst or per_minute or 0.0)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.rate is not None:
+            self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Сколько ждать, пока в бюджете будет amount (больше ёмкости — ждём полный бюджет)."""
+        if self.rate is None:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float, now: float):
+        """Списать amount; бюджет может уйти в минус (долг гасится пополнением)."""
+        if self.rate is None:
+            return
+        self._refill(now)
+        self.level -= amount
+
+    def give(self, amount: float, now: float):
+        if self.rate is None:
+            return
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def limit_to(self, remaining: float, now: float):
+        """Сервер сообщил, сколько осталось: локальный бюджет не должен быть щедрее."""
+        if self.rate is None:
+            return
+        self._refill(now)
+        self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """
+    Общий для всех клиентов одного токена ограничитель. Использование:
+        limiter = RateLimiter(rpm=15, tpm=40000)
+        chat = ChatSession(rate_limiter=limiter)
+        batch = AsyncGitHubModelsClient(rate_limiter=limiter)   # пакеты уступают чату
+    """
+
+    def __init__(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        max_retries: int = 4,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        """
+        rpm, tpm: запросов и токенов в минуту; None — без ограничения.
+        max_retries: сколько раз повторять запрос после 429, 5xx и сетевых ошибок.
+        backoff_base, backoff_max: экспоненциальная задержка повтора без retry-after, с.
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._cond = threading.Condition()
+        # Очередь ожидающих: (приоритет, номер) — внутри приоритета строго по порядку
+        self._queue: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        # После 429 никто не отправляет запросы до этого момента (monotonic)
+        self._blocked_until = 0.0
+
+        self.acquired = {INTERACTIVE: 0, BATCH: 0}
+        self.waited_sec = {INTERACTIVE: 0.0, BATCH: 0.0}
+        self.throttled = 0
+        self.retries = 0
+
+    def acquire(self, tokens: float, priority: int = INTERACTIVE) -> float:
+        """Блокируется, пока бюджеты не позволят отправить запрос. Возвращает время ожидания, с."""
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._enter_locked(priority)
+            try:
+                while True:
+                    wait = self._try_locked(ticket, tokens)
+                    if wait == 0.0:
+                        break
+                    self._cond.wait(wait)
+            except BaseException:
+                self._leave_locked(ticket)
+                raise
+        return self._record(priority, started)
+
+    async def acquire_async(self, tokens: float, priority: int = INTERACTIVE) -> float:
+        """То же для asyncio: ожидание не блокирует цикл событий."""
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._enter_locked(priority)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_locked(ticket, tokens)
+                if wait == 0.0:
+                    break
+                await asyncio.sleep(min(wait, ASYNC_POLL_SEC) if wait is not None else ASYNC_POLL_SEC)
+        except BaseException:
+            with self._cond:
+                self._leave_locked(ticket)
+            raise
+        return self._record(priority, started)
+
+    def settle(self, reserved: float, used: Optional[float]):
+        """Уточнить резерв токенов по usage ответа (None — оставить резерв как есть)."""
+        if used is None:
+            return
+        with self._cond:
+            now = time.monotonic()
+            if used < reserved:
+                self.tokens.give(reserved - used, now)
+                self._cond.notify_all()
+            elif used > reserved:
+                self.tokens.take(used - reserved, now)
+
+    def update(self, headers: Optional[Mapping[str, str]]):
+        """Подтянуть бюджеты к заголовкам x-ratelimit-remaining-* ответа."""
+        if not headers:
+            return
+        with self._cond:
+            now = time.monotonic()
+            for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                raw = headers.get(f"x-ratelimit-remaining-{kind}")
+                if raw is None:
+                    continue
+                try:
+                    bucket.limit_to(float(raw), now)
+                except ValueError:
+                    continue
+
+    def throttle(self, headers: Optional[Mapping[str, str]], attempt: int) -> float:
+        """
+        Сервер ответил 429: все ожидающие ждут retry-after (или задержку повтора).
+        Возвращает назначенную задержку, с.
+        """
+        delay = self.retry_delay(attempt, headers)
+        with self._cond:
+            self.throttled += 1
+            # Бюджет запросов на этом интервале точно исчерпан
+            self.requests.limit_to(0.0, time.monotonic())
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+            self._cond.notify_all()
+        return delay
+
+    def retry_delay(self, attempt: int, headers: Optional[Mapping[str, str]] = None) -> float:
+        """Задержка перед повтором attempt (с 0): retry-after с разбросом, иначе экспонента с разбросом."""
+        with self._cond:
+            self.retries += 1
+        server = retry_after(headers)
+        if server is not None:
+            return server + random.uniform(0.0, max(server * RETRY_AFTER_JITTER, 0.05))
+        cap = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        # «Равный» разброс: не меньше половины экспоненты, но ожидающие расходятся во времени
+        return random.uniform(cap / 2.0, cap)
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            now = time.monotonic()
+            return {
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "requests_available": self.requests.level if self.rpm else None,
+                "tokens_available": self.tokens.level if self.tpm else None,
+                "waiting": len(self._queue),
+                "blocked_sec": max(0.0, self._blocked_until - now),
+                "acquired": {"interactive": self.acquired[INTERACTIVE], "batch": self.acquired[BATCH]},
+                "waited_sec": {"interactive": self.waited_sec[INTERACTIVE], "batch": self.waited_sec[BATCH]},
+                "throttled": self.throttled,
+                "retries": self.retries,
+            }
+
+    # =========================
+    # Внутренние методы
+    # =========================
+
+    def _enter_locked(self, priority: int) -> Tuple[int, int]:
+        ticket = (priority, next(self._seq))
+        heapq.heappush(self._queue, ticket)
+        return ticket
+
+    def _leave_locked(self, ticket: Tuple[int, int]):
+        if ticket in self._queue:
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+        self._cond.notify_all()
+
+    def _try_locked(self, ticket: Tuple[int, int], tokens: float) -> Optional[float]:
+        """0 — бюджет списан; иначе сколько ждать (None — пока не подойдёт очередь)."""
+        if self._queue[0] != ticket:
+            return None
+        now = time.monotonic()
+        wait = max(
+            self._blocked_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(tokens, now),
+        )
+        if wait > 0.0:
+            return wait
+        heapq.heappop(self._queue)
+        self.requests.take(1, now)
+        self.tokens.take(tokens, now)
+        # Следующий в очереди проверяет бюджеты сразу
+        self._cond.notify_all()
+        return 0.0
+
+    def _record(self, priority: int, started: float) -> float:
+        waited = time.monotonic() - started
+        with self._cond:
+            self.acquired[priority] = self.acquired.get(priority, 0) + 1
+            self.waited_sec[priority] = self.waited_sec.get(priority, 0.0) + waited
+        return waited
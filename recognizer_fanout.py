@@ -0,0 +1,301 @@
+"""
+Распознавание одного потока несколькими моделями (например, русской и английской).
+
+Каждая модель работает в своём процессе (RecognizerProcess), все процессы читают
+один общий кольцевой буфер в shared_memory: захваченное и предобработанное аудио
+записывается туда один раз, процессам уходят только позиции чанков.
+
+Гипотезы моделей оцениваются по средней уверенности слов (conf из Vosk).
+Частичные гипотезы показываются от текущего лидера, финал фразы выбирается
+один — от модели с наибольшей уверенностью.
+"""
+
+import time
+import threading
+from typing import Callable, Dict, List, Optional
+
+from recognizer_worker import RecognizerProcess, SharedPCMRing
+
+# Колбэк результатов — как у RecognizerProcess, но обновления с метаданными выбора:
+# [(client_id, text, words, final, {"model": имя, "confidence": уверенность})]
+ResultsCallback = Callable[[list, float, list], None]
+
+# Насколько другая модель должна обогнать лидера, чтобы partial переключился на неё
+SWITCH_MARGIN = 0.05
+# Сколько ждать финала отстающих моделей, если остальные фразу уже завершили, с
+DECIDE_TIMEOUT = 1.5
+
+
+def confidence(words: List[dict]) -> Optional[float]:
+    """Средняя уверенность слов гипотезы; None — Vosk не вернул conf (частичные гипотезы)."""
+    confs = [w["conf"] for w in words if w.get("conf") is not None]
+    if not confs:
+        return None
+    return sum(confs) / len(confs)
+
+
+class _Hypothesis:
+    """Гипотеза одной модели для одного клиента в пределах текущей фразы."""
+
+    __slots__ = ("segments", "partial", "closed_at")
+
+    def __init__(self):
+        # Финальные сегменты фразы (Vosk может завершить её по своей паузе несколько раз)
+        self.segments: List[dict] = []
+        self.partial: List[dict] = []
+        self.closed_at: Optional[float] = None
+
+    def words(self) -> List[dict]:
+        return self.segments + self.partial
+
+
+class ModelFanout:
+    """
+    Несколько моделей над одним потоком. Интерфейс как у RecognizerProcess
+    (start/stop/feed/flush/stats), поэтому SpeechStream использует его вместо одного процесса.
+    Использование:
+        fanout = ModelFanout({"ru": "vosk-model-small-ru-0.22", "en": "vosk-model-small-en-us-0.15"},
+                             on_results=callback)
+        fanout.start()
+        fanout.feed(chunks, end_of_utterance, ["default"], captured_at)
+        ...
+        fanout.stop()
+    """
+
+    def __init__(
+        self,
+        models: Dict[str, str],
+        sample_rate: int = 16000,
+        use_partial: bool = True,
+        on_results: Optional[ResultsCallback] = None,
+        buffer_sec: float = 8.0,
+        slow_timeout: float = 5.0,
+        start_timeout: float = 60.0,
+    ):
+        """
+        models: имя (язык) -> путь к модели Vosk; порядок задаёт лидера по умолчанию.
+        on_results: колбэк выбранных гипотез, вызывается из потоков чтения результатов
+            процессов, но всегда по одному.
+        buffer_sec: ёмкость общего буфера; место освобождается, когда чанк прочитали все модели.
+        slow_timeout, start_timeout: см. RecognizerProcess.
+        """
+        if not models:
+            raise ValueError("Нужна хотя бы одна модель")
+        self.models = dict(models)
+        self.sample_rate = sample_rate
+        self.use_partial = use_partial
+        self.on_results = on_results
+        self.slow_timeout = slow_timeout
+
+        self._ring = SharedPCMRing(int(buffer_sec * sample_rate) * 2)
+        self.workers: Dict[str, RecognizerProcess] = {
+            name: RecognizerProcess(
+                path,
+                sample_rate,
+                use_partial=use_partial,
+                on_results=lambda updates, captured_at, timings, name=name: self._on_results(
+                    name, updates, captured_at, timings
+                ),
+                slow_timeout=slow_timeout,
+                start_timeout=start_timeout,
+                ring=self._ring,
+                name=f"Recognizer-{name}",
+                empty_finals=True,
+            )
+            for name, path in self.models.items()
+        }
+        # Запись в буфер — из рабочего потока; выбор гипотез — из потоков чтения результатов
+        self._write_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._hypotheses: Dict[str, Dict[str, _Hypothesis]] = {}
+        self._leaders: Dict[str, str] = {}
+        self._last_partial: Dict[str, str] = {}
+
+        self.overruns = 0
+        self.dropped_bytes = 0
+        self.utterances = 0
+        self.wins = {name: 0 for name in self.models}
+
+    def start(self):
+        """Открывает общий буфер и запускает процессы всех моделей (модели грузятся параллельно)."""
+        self._ring.open()
+        errors = []
+
+        def run(worker):
+            try:
+                worker.start()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(w,), daemon=True) for w in self.workers.values()]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if errors:
+            self.stop()
+            raise errors[0]
+
+    def stop(self):
+        for worker in self.workers.values():
+            worker.stop()
+        self._ring.close()
+        with self._state_lock:
+            self._hypotheses.clear()
+            self._last_partial.clear()
+
+    def feed(self, chunks: List[bytes], end_of_utterance: bool, clients: List[str], captured_at: float) -> bool:
+        """
+        Записывает чанки в общий буфер один раз и рассылает их позиции всем моделям.
+        False — места нет (какая-то модель отстаёт) или ни одна модель не готова.
+        """
+        sizes = [len(c) for c in chunks]
+        total = sum(sizes)
+        with self._write_lock:
+            ready = [w for w in self.workers.values() if w.ready]
+            if not ready:
+                self.dropped_bytes += total
+                return False
+            # Чанк можно перезаписать, только когда его прочитали все работающие модели
+            oldest = min(w.acked_pos for w in ready)
+            if total > self._ring.capacity - (self._ring.write_pos - oldest):
+                self.overruns += 1
+                self.dropped_bytes += total
+                return False
+            start = self._ring.write(chunks)
+            sent = [w.feed_at(start, sizes, end_of_utterance, clients, captured_at) for w in ready]
+        return any(sent)
+
+    def flush(self, clients: List[str], timeout: Optional[float] = None) -> bool:
+        """Завершает фразы во всех моделях и ждёт, пока выбранные финалы уйдут в on_results."""
+        events = []
+        with self._write_lock:
+            for worker in self.workers.values():
+                done = threading.Event()
+                if worker.ready and worker.feed_at(self._ring.write_pos, [], True, clients, time.time(), done):
+                    events.append(done)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ok = bool(events)
+        for done in events:
+            left = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ok = done.wait(left) and ok
+        # Модели, упавшие посреди фразы, не держат выбор финала
+        self._decide_all()
+        return ok
+
+    def stats(self) -> dict:
+        with self._state_lock:
+            wins = dict(self.wins)
+            utterances = self.utterances
+            leaders = dict(self._leaders)
+        return {
+            "models": {name: dict(w.stats(), path=self.models[name]) for name, w in self.workers.items()},
+            "utterances": utterances,
+            "wins": wins,
+            "leaders": leaders,
+            "buffer_capacity": self._ring.capacity,
+            "overruns": self.overruns,
+            "dropped_bytes": self.dropped_bytes,
+        }
+
+    # =========================
+    # Внутренние методы
+    # =========================
+
+    def _on_results(self, model: str, updates: list, captured_at: float, timings: list):
+        # Под блокировкой: выбор и колбэк не перемешиваются между потоками разных моделей
+        with self._state_lock:
+            out = []
+            now = time.monotonic()
+            touched = set()
+            for client_id, text, words, final in updates:
+                hyp = self._hypotheses.setdefault(client_id, {}).setdefault(model, _Hypothesis())
+                if final:
+                    hyp.segments.extend(words)
+                    hyp.partial = []
+                    if hyp.closed_at is None:
+                        hyp.closed_at = now
+                else:
+                    hyp.partial = words
+                touched.add(client_id)
+            for client_id in touched:
+                out.extend(self._select_locked(client_id, now))
+            # Клиенты, у которых отстающая модель так и не завершила фразу
+            for client_id in list(self._hypotheses):
+                if client_id not in touched:
+                    out.extend(self._select_locked(client_id, now, only_timeout=True))
+            if self.on_results is not None and (out or timings):
+                try:
+                    self.on_results(out, captured_at, timings)
+                except Exception:
+                    pass
+
+    def _decide_all(self):
+        with self._state_lock:
+            out = []
+            for client_id in list(self._hypotheses):
+                out.extend(self._select_locked(client_id, time.monotonic(), force=True))
+            if out and self.on_results is not None:
+                try:
+                    self.on_results(out, time.time(), [])
+                except Exception:
+                    pass
+
+    def _select_locked(self, client_id: str, now: float, only_timeout: bool = False, force: bool = False) -> list:
+        hyps = self._hypotheses.get(client_id) or {}
+        active = [name for name, w in self.workers.items() if w.ready]
+        closed = [name for name, h in hyps.items() if h.closed_at is not None]
+        if closed and (
+            force
+            or (not only_timeout and all(name in closed for name in active))
+            or now - min(hyps[name].closed_at for name in closed) >= DECIDE_TIMEOUT
+        ):
+            return self._finalize_locked(client_id, hyps, closed)
+        if only_timeout or force:
+            return []
+        return self._partial_locked(client_id, hyps)
+
+    def _finalize_locked(self, client_id: str, hyps: Dict[str, _Hypothesis], closed: List[str]) -> list:
+        best, best_conf = None, -1.0
+        for name in closed:
+            words = hyps[name].segments
+            if not words:
+                continue
+            conf = confidence(words)
+            conf = conf if conf is not None else 0.0
+            if conf > best_conf:
+                best, best_conf = name, conf
+        # Следующая фраза начинается с чистых гипотез у всех моделей
+        del self._hypotheses[client_id]
+        self._last_partial.pop(client_id, None)
+        if best is None:
+            return []
+        self.utterances += 1
+        self.wins[best] += 1
+        self._leaders[client_id] = best
+        words = hyps[best].segments
+        text = " ".join(w["word"] for w in words)
+        return [(client_id, text, words, True, {"model": best, "confidence": round(best_conf, 3)})]
+
+    def _partial_locked(self, client_id: str, hyps: Dict[str, _Hypothesis]) -> list:
+        if not self.use_partial:
+            return []
+        leader = self._leaders.get(client_id) or next(iter(self.models))
+        scores = {name: confidence(h.words()) for name, h in hyps.items() if h.words()}
+        lead_score = scores.get(leader)
+        for name, score in scores.items():
+            if score is None or name == leader:
+                continue
+            if lead_score is None or score > lead_score + SWITCH_MARGIN:
+                leader, lead_score = name, score
+        self._leaders[client_id] = leader
+        hyp = hyps.get(leader)
+        if hyp is None or not hyp.words():
+            return []
+        words = hyp.words()
+        text = " ".join(w["word"] for w in words)
+        if self._last_partial.get(client_id) == text:
+            return []
+        self._last_partial[client_id] = text
+        meta = {"model": leader, "confidence": round(lead_score, 3) if lead_score is not None else None}
+        return [(client_id, text, words, False, meta)]
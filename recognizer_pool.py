@@ -0,0 +1,226 @@
+"""
+Общие модели Vosk и пул распознавателей.
+
+Модель (сотни МБ, загрузка — секунды) загружается один раз на процесс для
+каждого пути, а KaldiRecognizer выдаются клиентам из ограниченного пула:
+один распознаватель на клиента/сессию, простаивающие возвращаются в пул.
+"""
+
+import time
+import threading
+from typing import Callable, Dict, List, Optional
+
+from vosk import Model, KaldiRecognizer
+
+_models: Dict[str, Model] = {}
+_model_locks: Dict[str, threading.Lock] = {}
+_models_lock = threading.Lock()
+
+
+def get_model(model_path: str) -> Model:
+    """Возвращает модель Vosk для пути, загружая её не более одного раза на процесс."""
+    model = _models.get(model_path)
+    if model is not None:
+        return model
+
+    with _models_lock:
+        path_lock = _model_locks.setdefault(model_path, threading.Lock())
+    # Отдельная блокировка на путь: разные модели могут грузиться параллельно
+    with path_lock:
+        model = _models.get(model_path)
+        if model is None:
+            model = Model(model_path)
+            _models[model_path] = model
+    return model
+
+
+def loaded_models() -> List[str]:
+    """Пути уже загруженных моделей."""
+    return list(_models)
+
+
+class PoolExhausted(RuntimeError):
+    """Все распознаватели пула заняты, и ни один не простаивает дольше idle_timeout."""
+
+
+class _Lease:
+    __slots__ = ("recognizer", "last_used", "on_evict")
+
+    def __init__(self, recognizer: KaldiRecognizer, on_evict: Optional[Callable[[str], None]]):
+        self.recognizer = recognizer
+        self.last_used = time.monotonic()
+        self.on_evict = on_evict
+
+
+class RecognizerPool:
+    """
+    Ограниченный пул KaldiRecognizer поверх одной общей модели.
+    Использование:
+        pool = RecognizerPool("vosk-model-small-ru-0.22", max_recognizers=4)
+        rec = pool.acquire("client-1")
+        ...
+        pool.release("client-1")
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        sample_rate: int = 16000,
+        max_recognizers: int = 4,
+        idle_timeout: float = 300.0,
+        spare: int = 1,
+        factory: Optional[Callable[[], object]] = None,
+    ):
+        """
+        model_path: путь к папке модели Vosk (модель общая для всех пулов процесса).
+        sample_rate: частота дискретизации для создаваемых распознавателей.
+        max_recognizers: максимум одновременно выданных распознавателей.
+        idle_timeout: через сколько секунд без touch()/acquire() распознаватель
+            считается простаивающим и может быть отобран у клиента.
+        spare: сколько освобождённых распознавателей держать для повторного
+            использования, чтобы не создавать их заново.
+        factory: создание распознавателя; None = KaldiRecognizer над общей моделью процесса.
+            Если распознаватели живут в другом процессе, фабрика возвращает None, и пул
+            только ограничивает число клиентов и вытесняет простаивающих, не загружая модель.
+        """
+        self.model_path = model_path
+        self.sample_rate = sample_rate
+        self.max_recognizers = max_recognizers
+        self.idle_timeout = idle_timeout
+        self.spare = spare
+        self.factory = factory
+
+        self._cond = threading.Condition()
+        self._leases: Dict[str, _Lease] = {}
+        self._free: List[KaldiRecognizer] = []
+
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def acquire(
+        self,
+        client_id: str,
+        timeout: Optional[float] = 0.0,
+        on_evict: Optional[Callable[[str], None]] = None,
+    ) -> KaldiRecognizer:
+        """
+        Выдаёт распознаватель клиенту (повторный вызов возвращает тот же объект).
+        Если свободных мест нет, сначала отбираются простаивающие, затем ожидание
+        до timeout секунд (None = без ограничения); по истечении — PoolExhausted.
+        on_evict(client_id) вызывается, если распознаватель отобран по простою.
+        """
+        if self.factory is None:
+            # Модель грузится до захвата блокировки пула (повторно — из кэша процесса)
+            get_model(self.model_path)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        evicted: List[tuple] = []
+        try:
+            with self._cond:
+                while True:
+                    lease = self._leases.get(client_id)
+                    if lease is not None:
+                        lease.last_used = time.monotonic()
+                        return lease.recognizer
+                    evicted.extend(self._collect_idle_locked())
+                    if len(self._leases) < self.max_recognizers:
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise PoolExhausted(
+                            f"Все {self.max_recognizers} распознавателя заняты ({self.model_path})"
+                        )
+                    self._cond.wait(remaining)
+
+                if self._free:
+                    rec = self._free.pop()
+                    self.reused += 1
+                else:
+                    rec = self._create()
+                    self.created += 1
+                self._leases[client_id] = _Lease(rec, on_evict)
+                return rec
+        finally:
+            self._finish_evictions(evicted)
+
+    def touch(self, client_id: str) -> bool:
+        """Отмечает активность клиента. False, если распознаватель у него уже отобран."""
+        with self._cond:
+            lease = self._leases.get(client_id)
+            if lease is None:
+                return False
+            lease.last_used = time.monotonic()
+            return True
+
+    def release(self, client_id: str):
+        """Возвращает распознаватель клиента в пул."""
+        with self._cond:
+            lease = self._leases.pop(client_id, None)
+            if lease is None:
+                return
+            self._recycle_locked(lease.recognizer)
+            self._cond.notify()
+
+    def evict_idle(self) -> List[str]:
+        """Отбирает распознаватели, простаивающие дольше idle_timeout. Возвращает id клиентов."""
+        with self._cond:
+            evicted = self._collect_idle_locked()
+        self._finish_evictions(evicted)
+        return [client_id for client_id, _ in evicted]
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "model_path": self.model_path,
+                "active": len(self._leases),
+                "spare": len(self._free),
+                "max_recognizers": self.max_recognizers,
+                "created": self.created,
+                "reused": self.reused,
+                "evicted": self.evicted,
+            }
+
+    # =========================
+    # Внутренние методы
+    # =========================
+
+    def _collect_idle_locked(self) -> List[tuple]:
+        if self.idle_timeout is None:
+            return []
+        now = time.monotonic()
+        idle = [cid for cid, lease in self._leases.items() if now - lease.last_used >= self.idle_timeout]
+        return [(cid, self._leases.pop(cid)) for cid in idle]
+
+    def _finish_evictions(self, evicted: List[tuple]):
+        if not evicted:
+            return
+        # Колбэки вызываются без блокировки пула: владелец может сам брать свои блокировки
+        for client_id, lease in evicted:
+            if lease.on_evict is not None:
+                try:
+                    lease.on_evict(client_id)
+                except Exception:
+                    pass
+        with self._cond:
+            for _, lease in evicted:
+                self.evicted += 1
+                self._recycle_locked(lease.recognizer)
+            self._cond.notify_all()
+
+    def _create(self):
+        if self.factory is not None:
+            return self.factory()
+        rec = KaldiRecognizer(get_model(self.model_path), self.sample_rate)
+        # Слова с таймингами и в финальных, и в частичных гипотезах
+        rec.SetWords(True)
+        rec.SetPartialWords(True)
+        return rec
+
+    def _recycle_locked(self, rec: KaldiRecognizer):
+        if rec is None or len(self._free) >= self.spare:
+            return
+        try:
+            rec.Reset()
+        except Exception:
+            return
+        self._free.append(rec)
@@ -0,0 +1,544 @@
+"""
+Распознавание в отдельном процессе.
+
+AcceptWaveform и разбор JSON Vosk конкурируют за GIL с Flask и мостом webview.
+RecognizerProcess выносит их в дочерний процесс: аудио передаётся через кольцевой
+буфер в multiprocessing.shared_memory (по каналу идут только позиции и размеры
+чанков), результаты возвращаются через Pipe. Упавший или зависший процесс
+перезапускается автоматически; сессии клиентов в нём создаются заново.
+
+Один буфер (SharedPCMRing) могут читать несколько процессов с разными моделями —
+аудио записывается в общую память один раз (см. recognizer_fanout).
+"""
+
+import json
+import os
+import time
+import threading
+import multiprocessing
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Callable, Deque, List, Optional, Tuple
+
+from vosk import Model, KaldiRecognizer
+
+# Колбэк результатов: (обновления [(client_id, text, words, final)], время захвата, замеры [(имя, сек)])
+ResultsCallback = Callable[[list, float, list], None]
+
+# Замеры пачки, которые не являются задержками: CPU процесса на декодирование пачки
+# и длительность её аудио — по их отношению родитель подбирает размер пачки
+CPU_TIMING = "cpu"
+AUDIO_TIMING = "audio"
+
+# Spawn, а не fork: родитель многопоточный (Flask, захват, пул)
+_mp = multiprocessing.get_context("spawn")
+
+
+def result_words(res: dict, key: str, text: str) -> List[dict]:
+    # Слова с таймингами из ответа Vosk; если их нет (старый Vosk) — только текст
+    words = res.get(key)
+    if words:
+        return words
+    return [{"word": w} for w in text.split()]
+
+
+def result_json(method, latency) -> dict:
+    # Отдельно меряем вызов Vosk и разбор его JSON
+    t0 = time.perf_counter()
+    raw = method()
+    t1 = time.perf_counter()
+    res = json.loads(raw)
+    latency.add("result", t1 - t0)
+    latency.add("json_parse", time.perf_counter() - t1)
+    return res
+
+
+def decode_chunks(
+    rec: KaldiRecognizer, chunks, end_of_utterance: bool, use_partial: bool, latency
+) -> List[Tuple[str, List[dict], bool]]:
+    """
+    Подаёт чанки в Vosk и возвращает новые тексты по порядку: [(текст, слова с таймингами, финальный ли)].
+    В одной пачке Vosk может завершить несколько фраз — каждая финальная гипотеза идёт
+    отдельным элементом; частичная (не больше одной) — только если фраз не завершилось.
+    latency — объект с методом add(имя, секунды) для замеров decode/result/json_parse.
+    """
+    results: List[Tuple[str, List[dict], bool]] = []
+    accepted = False
+    for chunk in chunks:
+        t0 = time.perf_counter()
+        ok = rec.AcceptWaveform(chunk)
+        latency.add("decode", time.perf_counter() - t0)
+        if ok:
+            accepted = True
+            # Финальная гипотеза после детектированной паузы
+            res = result_json(rec.Result, latency)
+            t = res.get("text", "").strip()
+            if t:
+                results.append((t, result_words(res, "result", t), True))
+
+    if end_of_utterance:
+        # VAD зафиксировал конец речи — принудительно завершаем фразу
+        res = result_json(rec.FinalResult, latency)
+        t = res.get("text", "").strip()
+        if t:
+            results.append((t, result_words(res, "result", t), True))
+    elif not accepted and use_partial:
+        # Частичная гипотеза для онлайна — одна на пачку чанков
+        pres = result_json(rec.PartialResult, latency)
+        pt = pres.get("partial", "").strip()
+        if pt:
+            results.append((pt, result_words(pres, "partial_result", pt), False))
+    return results
+
+
+class _Timings:
+    """Замеры в дочернем процессе: копятся списком и уходят родителю вместе с результатами."""
+
+    __slots__ = ("items",)
+
+    def __init__(self):
+        self.items: List[Tuple[str, float]] = []
+
+    def add(self, name: str, seconds: float):
+        self.items.append((name, seconds))
+
+
+def _read_ring(view: memoryview, capacity: int, pos: int, n: int) -> bytes:
+    start = pos % capacity
+    first = min(n, capacity - start)
+    if first == n:
+        return bytes(view[start:start + n])
+    return bytes(view[start:capacity]) + bytes(view[:n - first])
+
+
+def _worker_main(
+    model_path: str, sample_rate: int, shm_name: str, capacity: int, conn, use_partial: bool, empty_finals: bool
+):
+    """Точка входа дочернего процесса."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    view = shm.buf
+    try:
+        try:
+            model = Model(model_path)
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+            return
+        recs = {}
+        conn.send(("ready", os.getpid()))
+        while True:
+            msg = conn.recv()
+            if msg[0] == "stop":
+                return
+            _, seq, pos, sizes, end_of_utterance, clients = msg
+
+            # Сессии в процессе повторяют список клиентов родителя
+            for client_id in list(recs):
+                if client_id not in clients:
+                    del recs[client_id]
+            for client_id in clients:
+                if client_id not in recs:
+                    rec = KaldiRecognizer(model, sample_rate)
+                    rec.SetWords(True)
+                    rec.SetPartialWords(True)
+                    recs[client_id] = rec
+
+            chunks = []
+            for n in sizes:
+                chunks.append(_read_ring(view, capacity, pos, n))
+                pos += n
+
+            timings = _Timings()
+            updates = []
+            cpu_started = time.thread_time()
+            for client_id in clients:
+                try:
+                    results = decode_chunks(recs[client_id], chunks, end_of_utterance, use_partial, timings)
+                except Exception:
+                    continue
+                for text, words, final in results:
+                    updates.append((client_id, text, words, final))
+                if end_of_utterance and empty_finals and not results:
+                    updates.append((client_id, "", [], True))
+            if sizes:
+                timings.add(CPU_TIMING, time.thread_time() - cpu_started)
+                timings.add(AUDIO_TIMING, sum(sizes) / 2.0 / sample_rate)
+            conn.send(("done", seq, pos, updates, timings.items))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del view
+        shm.close()
+
+
+class SharedPCMRing:
+    """
+    Кольцевой буфер int16 PCM в shared_memory. Пишет только родитель, процессы
+    распознавания читают по абсолютным позициям из своих сообщений feed.
+    Свободное место считает владелец: позиции, которые ещё не подтвердил хотя бы
+    один читатель, перезаписывать нельзя.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(2, capacity)
+        self.write_pos = 0
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._view: Optional[memoryview] = None
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def open(self):
+        if self._shm is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=self.capacity)
+            self._view = self._shm.buf
+
+    def write(self, chunks: List[bytes]) -> int:
+        """Записывает чанки подряд; возвращает абсолютную позицию первого."""
+        start = self.write_pos
+        for chunk in chunks:
+            n = len(chunk)
+            pos = self.write_pos % self.capacity
+            first = min(n, self.capacity - pos)
+            src = memoryview(chunk)
+            self._view[pos:pos + first] = src[:first]
+            if first < n:
+                self._view[:n - first] = src[first:]
+            self.write_pos += n
+        return start
+
+    def close(self):
+        if self._shm is None:
+            return
+        self._view = None
+        try:
+            self._shm.close()
+            self._shm.unlink()
+        except Exception:
+            pass
+        self._shm = None
+
+
+class _Pending:
+    __slots__ = ("seq", "end", "sent_at", "captured_at", "done")
+
+    def __init__(self, seq: int, end: int, captured_at: float, done: Optional[threading.Event]):
+        self.seq = seq
+        self.end = end
+        self.sent_at = time.monotonic()
+        self.captured_at = captured_at
+        self.done = done
+
+
+class RecognizerProcess:
+    """
+    Распознаватели клиентов в отдельном процессе.
+    Использование:
+        proc = RecognizerProcess("vosk-model-small-ru-0.22", on_results=callback)
+        proc.start()
+        proc.feed(chunks, end_of_utterance, ["default"], captured_at)
+        ...
+        proc.stop()
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        sample_rate: int = 16000,
+        use_partial: bool = True,
+        on_results: Optional[ResultsCallback] = None,
+        buffer_sec: float = 8.0,
+        slow_timeout: float = 5.0,
+        start_timeout: float = 60.0,
+        restart_delay: float = 2.0,
+        ring: Optional[SharedPCMRing] = None,
+        name: str = "RecognizerProcess",
+        empty_finals: bool = False,
+    ):
+        """
+        model_path: модель Vosk; дочерний процесс загружает её сам.
+        sample_rate: частота int16 моно, которое подаётся в feed().
+        on_results: колбэк результатов, вызывается из потока чтения результатов.
+        buffer_sec: ёмкость общего кольцевого буфера, секунды аудио. Если процесс
+            не успевает и места нет, новое аудио отбрасывается (overruns).
+        slow_timeout: процесс, не ответивший на пачку за столько секунд, перезапускается.
+        start_timeout: сколько ждать загрузки модели при запуске процесса.
+        restart_delay: пауза между неудачными попытками перезапуска.
+        ring: общий буфер, который пишет и открывает владелец (тогда аудио передаётся
+            через feed_at(), а buffer_sec не используется); None — собственный буфер.
+        name: имя процесса и потока чтения результатов.
+        empty_finals: сообщать о фразах, завершённых без текста, обновлением с пустым текстом
+            (нужно, чтобы выбирать между моделями, не дожидаясь таймаута).
+        """
+        self.model_path = model_path
+        self.sample_rate = sample_rate
+        self.use_partial = use_partial
+        self.on_results = on_results
+        self._own_ring = ring is None
+        self._ring = ring if ring is not None else SharedPCMRing(int(buffer_sec * sample_rate) * 2)
+        self.capacity = self._ring.capacity
+        self.name = name
+        self.empty_finals = empty_finals
+        self.slow_timeout = slow_timeout
+        self.start_timeout = start_timeout
+        self.restart_delay = restart_delay
+
+        self._proc = None
+        self._conn = None
+        self._ready = False
+        self._lock = threading.Lock()
+        self._reader: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+        # Абсолютная позиция в общем буфере, до которой процесс всё прочитал
+        self._acked_pos = 0
+        self._seq = 0
+        self._pending: Deque[_Pending] = deque()
+        self._last_restart_try = 0.0
+
+        self.pid: Optional[int] = None
+        self.starts = 0
+        self.crashes = 0
+        self.timeouts = 0
+        self.overruns = 0
+        self.dropped_bytes = 0
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        """Создаёт общий буфер (если он свой) и запускает процесс (ждёт загрузки модели)."""
+        if self._reader is not None:
+            return
+        if self._own_ring:
+            self._ring.open()
+        self._stopping.clear()
+        try:
+            launched = self._launch()
+        except Exception:
+            if self._own_ring:
+                self._ring.close()
+            raise
+        with self._lock:
+            self._install_locked(*launched)
+        self._reader = threading.Thread(target=self._read_results, name=f"{self.name}Reader", daemon=True)
+        self._reader.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._reader is not None:
+            self._reader.join(timeout=2.0)
+            self._reader = None
+        with self._lock:
+            self._kill_locked(graceful=True)
+        if self._own_ring:
+            self._ring.close()
+
+    def feed(self, chunks: List[bytes], end_of_utterance: bool, clients: List[str], captured_at: float) -> bool:
+        """
+        Кладёт чанки в общий буфер и отправляет процессу их позиции.
+        False — процесс перезапускается или буфер полон, аудио отброшено.
+        """
+        return self._send(chunks, end_of_utterance, clients, captured_at, None)
+
+    def feed_at(
+        self,
+        start: int,
+        sizes: List[int],
+        end_of_utterance: bool,
+        clients: List[str],
+        captured_at: float,
+        done: Optional[threading.Event] = None,
+    ) -> bool:
+        """
+        Отправляет процессу чанки, уже записанные владельцем в общий буфер с позиции start.
+        False — процесс перезапускается, аудио для него потеряно.
+        """
+        with self._lock:
+            if not self._ready:
+                self.dropped_bytes += sum(sizes)
+                return False
+            return self._post_locked(start, sizes, end_of_utterance, clients, captured_at, done)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    @property
+    def acked_pos(self) -> int:
+        """До какой позиции общего буфера процесс всё прочитал (для учёта свободного места)."""
+        return self._acked_pos
+
+    def flush(self, clients: List[str], timeout: Optional[float] = None) -> bool:
+        """Завершает фразы всех клиентов и ждёт, пока результаты будут переданы в on_results."""
+        done = threading.Event()
+        if not self._send([], True, clients, time.time(), done):
+            return False
+        return done.wait(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pid": self.pid,
+                "ready": self._ready,
+                "starts": self.starts,
+                "restarts": max(0, self.starts - 1),
+                "crashes": self.crashes,
+                "timeouts": self.timeouts,
+                "overruns": self.overruns,
+                "dropped_bytes": self.dropped_bytes,
+                "buffer_capacity": self.capacity,
+                "outstanding_bytes": self._ring.write_pos - self._acked_pos if self._ready else 0,
+                "pending_batches": len(self._pending),
+                "last_error": self.last_error,
+            }
+
+    # =========================
+    # Внутренние методы
+    # =========================
+
+    def _send(self, chunks, end_of_utterance, clients, captured_at, done) -> bool:
+        total = sum(len(c) for c in chunks)
+        with self._lock:
+            if not self._ready:
+                self.dropped_bytes += total
+                return False
+            if total > self.capacity - (self._ring.write_pos - self._acked_pos):
+                # Процесс не успевает: позиции читателя не затираем, теряем новое аудио
+                self.overruns += 1
+                self.dropped_bytes += total
+                return False
+            start = self._ring.write(chunks)
+            return self._post_locked(start, [len(c) for c in chunks], end_of_utterance, clients, captured_at, done)
+
+    def _post_locked(self, start, sizes, end_of_utterance, clients, captured_at, done) -> bool:
+        self._seq += 1
+        try:
+            self._conn.send(("feed", self._seq, start, list(sizes), end_of_utterance, list(clients)))
+        except (OSError, ValueError):
+            # Канал закрыт — процесс упал; перезапуск сделает поток чтения
+            self.dropped_bytes += sum(sizes)
+            return False
+        self._pending.append(_Pending(self._seq, start + sum(sizes), captured_at, done))
+        return True
+
+    def _read_results(self):
+        while not self._stopping.is_set():
+            conn = self._conn
+            msg = None
+            try:
+                if conn is not None and conn.poll(0.1):
+                    msg = conn.recv()
+            except (EOFError, OSError):
+                msg = None
+            if msg is not None and msg[0] == "done":
+                self._on_done(msg)
+                continue
+            if conn is None:
+                self._stopping.wait(0.1)
+            self._check_health()
+
+    def _on_done(self, msg):
+        _, seq, end, updates, timings = msg
+        with self._lock:
+            finished = []
+            while self._pending and self._pending[0].seq <= seq:
+                finished.append(self._pending.popleft())
+            self._acked_pos = max(self._acked_pos, end)
+        captured_at = finished[-1].captured_at if finished else time.time()
+        if self.on_results is not None and (updates or timings):
+            try:
+                self.on_results(updates, captured_at, timings)
+            except Exception:
+                pass
+        for pending in finished:
+            if pending.done is not None:
+                pending.done.set()
+
+    def _check_health(self):
+        with self._lock:
+            if self._stopping.is_set():
+                return
+            if self._ready:
+                if not self._proc.is_alive():
+                    self.crashes += 1
+                    self.last_error = f"exit code {self._proc.exitcode}"
+                elif self._pending and time.monotonic() - self._pending[0].sent_at > self.slow_timeout:
+                    self.timeouts += 1
+                    self.last_error = f"no result for {self.slow_timeout:.1f} s"
+                else:
+                    return
+            elif time.monotonic() - self._last_restart_try < self.restart_delay:
+                return
+            self._kill_locked(graceful=False)
+            self._last_restart_try = time.monotonic()
+        # Модель грузится секунды: без блокировки, feed() тем временем отбрасывает аудио
+        try:
+            launched = self._launch()
+        except Exception as e:
+            with self._lock:
+                self.last_error = f"restart failed: {e}"
+            return
+        with self._lock:
+            self._install_locked(*launched)
+
+    def _launch(self):
+        parent_conn, child_conn = _mp.Pipe()
+        proc = _mp.Process(
+            target=_worker_main,
+            args=(self.model_path, self.sample_rate, self._ring.name, self.capacity, child_conn, self.use_partial,
+                  self.empty_finals),
+            name=self.name,
+            daemon=True,
+        )
+        proc.start()
+        child_conn.close()
+        self.starts += 1
+        try:
+            if not parent_conn.poll(self.start_timeout):
+                raise RuntimeError(f"Процесс распознавания не загрузил модель за {self.start_timeout:.0f} с")
+            try:
+                msg = parent_conn.recv()
+            except EOFError:
+                proc.join(timeout=1.0)
+                raise RuntimeError(f"Процесс распознавания завершился при запуске (код {proc.exitcode})")
+            if msg[0] == "error":
+                raise RuntimeError(f"Процесс распознавания не загрузил модель: {msg[1]}")
+        except Exception:
+            parent_conn.close()
+            if proc.is_alive():
+                proc.kill()
+            proc.join(timeout=1.0)
+            raise
+        return proc, parent_conn, msg[1]
+
+    def _install_locked(self, proc, conn, pid: int):
+        self._proc = proc
+        self._conn = conn
+        self.pid = pid
+        # Всё, что не подтвердил прежний процесс, считается потерянным
+        self._acked_pos = self._ring.write_pos
+        self._ready = True
+
+    def _kill_locked(self, graceful: bool):
+        self._ready = False
+        # Ожидающие flush() не должны висеть после гибели процесса
+        while self._pending:
+            pending = self._pending.popleft()
+            if pending.done is not None:
+                pending.done.set()
+        proc, conn = self._proc, self._conn
+        self._proc = self._conn = None
+        if conn is not None:
+            if graceful:
+                try:
+                    conn.send(("stop",))
+                except (OSError, ValueError):
+                    pass
+            conn.close()
+        if proc is not None:
+            proc.join(timeout=1.0 if graceful else 0.0)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join(timeout=1.0)
+            if proc.is_alive():
+                proc.kill()
+                proc.join(timeout=1.0)
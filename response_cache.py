@@ -0,0 +1,244 @@
+"""
+Кэш ответов модели для детерминированных запросов (temperature=0): повторный
+вопрос возвращается из памяти за микросекунды вместо похода в сеть.
+
+Два уровня:
+  - память: LRU с ограничением по числу записей, объёму текста и времени жизни;
+  - SQLite (необязательно): переживает перезапуск приложения, при попадании
+    запись поднимается в память.
+
+Ключ — SHA-256 канонического JSON из model, messages, temperature и max_tokens,
+поэтому порядок ключей в словарях и пробелы на попадание не влияют.
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS responses_expires ON responses(expires_at);
+"""
+
+# Просроченные записи на диске удаляются раз в столько записей put()
+PURGE_EVERY = 256
+
+
+def make_key(request_params: dict) -> str:
+    """Канонический хэш запроса: model, messages, temperature, max_tokens."""
+    canonical = json.dumps(
+        {
+            "model": request_params.get("model"),
+            "messages": request_params.get("messages"),
+            "temperature": float(request_params.get("temperature") or 0.0),
+            "max_tokens": request_params.get("max_tokens"),
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Использование:
+        cache = ResponseCache(path="cache/responses.sqlite")
+        client = GitHubModelsClient(cache=cache, temperature=0.0)
+        client.single_request("Объясни ошибку ...")                      # сеть
+        client.single_request("Объясни ошибку ...")                      # память
+        client.single_request("Объясни ошибку ...", bypass_cache=True)   # снова сеть
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl_sec: Optional[float] = 24 * 3600.0,
+        path: Optional[str] = None,
+        max_temperature: float = 0.0,
+    ):
+        """
+        max_entries, max_bytes: пределы уровня в памяти (объём — по UTF-8 тексту ответов).
+        ttl_sec: время жизни записи на обоих уровнях; None — без ограничения.
+        path: файл SQLite для постоянного уровня; None — только память.
+        max_temperature: запросы с temperature выше не кэшируются — ответ не детерминирован.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_sec = ttl_sec
+        self.path = path
+        self.max_temperature = max_temperature
+
+        self._lock = threading.Lock()
+        # key -> (ответ, истекает (monotonic) или None, размер)
+        self._memory: "OrderedDict[str, Tuple[str, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._puts = 0
+        if path:
+            self._db = sqlite3.connect(path, timeout=10.0, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+            with self._db_lock:
+                self._purge_disk_locked(self._db)
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bypassed = 0
+        self.uncacheable = 0
+
+    def key(self, request_params: dict) -> Optional[str]:
+        """Ключ запроса или None, если запрос не кэшируется (temperature выше порога)."""
+        if float(request_params.get("temperature") or 0.0) > self.max_temperature:
+            self.uncacheable += 1
+            return None
+        return make_key(request_params)
+
+    def get(self, key: str) -> Optional[str]:
+        """Ответ из памяти, затем с диска; None — промах."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at, size = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                self._drop_locked(key)
+                self.expirations += 1
+
+        value, expires_at = self._disk_get(key)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.disk_hits += 1
+            # Остаток времени жизни переносится с диска (wall clock) в память (monotonic)
+            left = None if expires_at is None else expires_at - time.time()
+            self._store_locked(key, value, left)
+        return value
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self.stores += 1
+            self._store_locked(key, value, self.ttl_sec)
+        created = time.time()
+        expires_at = created + self.ttl_sec if self.ttl_sec is not None else None
+        # Проверка и запись под одной блокировкой: close() мог закрыть соединение
+        with self._db_lock:
+            db = self._db
+            if db is None:
+                return
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, value, created, expires_at),
+                )
+            self._puts += 1
+            if self._puts % PURGE_EVERY == 0:
+                self._purge_disk_locked(db)
+
+    def record_bypass(self):
+        """Учесть запрос, который явно прошёл мимо кэша (bypass_cache=True)."""
+        with self._lock:
+            self.bypassed += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._bytes = 0
+        with self._db_lock:
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM responses")
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            data = {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "bypassed": self.bypassed,
+                "uncacheable": self.uncacheable,
+            }
+        with self._db_lock:
+            if self._db is not None:
+                data["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return data
+
+    # =========================
+    # Внутренние методы
+    # =========================
+
+    def _store_locked(self, key: str, value: str, ttl: Optional[float]):
+        if ttl is not None and ttl <= 0:
+            return
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            # Ответ больше всего уровня памяти — хранится только на диске
+            return
+        if key in self._memory:
+            self._drop_locked(key)
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._memory[key] = (value, expires_at, size)
+        self._bytes += size
+        while len(self._memory) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._memory))
+            self._drop_locked(oldest)
+            self.evictions += 1
+
+    def _drop_locked(self, key: str):
+        _, _, size = self._memory.pop(key)
+        self._bytes -= size
+
+    def _disk_get(self, key: str) -> Tuple[Optional[str], Optional[float]]:
+        with self._db_lock:
+            if self._db is None:
+                return None, None
+            row = self._db.execute(
+                "SELECT response, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None, None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            with self._lock:
+                self.expirations += 1
+            return None, None
+        return value, expires_at
+
+    def _purge_disk_locked(self, db: sqlite3.Connection):
+        with db:
+            db.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
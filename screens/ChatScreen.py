@@ -0,0 +1,119 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+from AEngineApps.screen import Screen
+from AEngineApps.json_dict import JsonDict
+from flask import Response, request
+from speech_events import format_sse
+from screens.SpeechScreen import CONFIG_PATH
+
+# Сколько чатов держать в памяти: дольше всех не использованные вытесняются
+MAX_SESSIONS = 32
+# Чат без сообщений дольше этого времени вытесняется, с
+SESSION_IDLE_SEC = 3600.0
+
+# Сессии чатов по идентификатору вкладки/чата: своя история у каждого.
+# Порядок — от давно использованных к недавним
+_sessions = OrderedDict()
+_locks = {}
+_last_used = {}
+_sessions_lock = threading.Lock()
+# Лимиты API общие для токена, поэтому ограничитель один на все чаты
+_limiter = None
+
+
+def get_limiter():
+    global _limiter
+    from rate_limiter import RateLimiter
+    from client_registry import registry
+
+    with _sessions_lock:
+        if _limiter is None:
+            config = JsonDict(CONFIG_PATH)
+            # Конфиг "rate_limit": параметры RateLimiter (rpm, tpm, max_retries...)
+            _limiter = RateLimiter(**(config.get("rate_limit") or {}))
+            # Конфиг "http": пул соединений общих клиентов (max_connections, keepalive_expiry...)
+            registry.configure(**(config.get("http") or {}))
+        return _limiter
+
+
+def _get_session(chat_id: str):
+    # Импорт здесь: без openai/tiktoken остальные экраны приложения должны работать
+    from ai import ChatSession
+
+    limiter = get_limiter()
+    with _sessions_lock:
+        session = _sessions.get(chat_id)
+        if session is None:
+            # Конфиг "chat": параметры ChatSession (model, max_history_tokens, system_prompt...)
+            session = ChatSession(rate_limiter=limiter, **(JsonDict(CONFIG_PATH).get("chat") or {}))
+            _sessions[chat_id] = session
+            _locks[chat_id] = threading.Lock()
+        _sessions.move_to_end(chat_id)
+        _last_used[chat_id] = time.monotonic()
+        _evict_locked(keep=chat_id)
+        return session, _locks[chat_id]
+
+
+def _evict_locked(keep: str):
+    # Чаты, отвечающие прямо сейчас (блокировка занята), не трогаем
+    now = time.monotonic()
+    for chat_id in list(_sessions):
+        if len(_sessions) <= MAX_SESSIONS and now - _last_used[chat_id] < SESSION_IDLE_SEC:
+            break
+        if chat_id == keep or _locks[chat_id].locked():
+            continue
+        del _sessions[chat_id], _locks[chat_id], _last_used[chat_id]
+
+
+def get_sessions() -> dict:
+    with _sessions_lock:
+        return dict(_sessions)
+
+
+class ChatScreen(Screen):
+    route = "/chat/stream"
+    __options__ = {"methods": ["POST"]}
+
+    def run(self):
+        body = request.get_json(silent=True) or {}
+        message = (body.get("message") or "").strip()
+        if not message:
+            return Response(json.dumps({"error": "empty_message"}), mimetype="application/json", status=400)
+        chat_id = str(body.get("chat") or "default")
+        try:
+            session, lock = _get_session(chat_id)
+        except (ImportError, ValueError) as e:
+            err = {"error": f"chat_unavailable: {e}"}
+            return Response(json.dumps(err, ensure_ascii=False), mimetype="application/json", status=503)
+
+        def generate():
+            # Один ответ на чат за раз: параллельные запросы перемешали бы историю
+            if not lock.acquire(blocking=False):
+                yield format_sse(1, "error", {"error": "chat_busy"})
+                return
+            event_id = 0
+            started = time.perf_counter()
+            chars = 0
+            try:
+                for delta in session.chat(message, stream=True):
+                    event_id += 1
+                    chars += len(delta)
+                    yield format_sse(event_id, "delta", {"text": delta})
+                ttft = session.last_ttft
+                yield format_sse(event_id + 1, "done", {
+                    "ttft_ms": round(ttft * 1000.0, 1) if ttft is not None else None,
+                    "total_ms": round((time.perf_counter() - started) * 1000.0, 1),
+                    "chars": chars,
+                })
+            except Exception as e:
+                yield format_sse(event_id + 1, "error", {"error": str(e)})
+            finally:
+                lock.release()
+
+        headers = {
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+        return Response(generate(), mimetype="text/event-stream", headers=headers)
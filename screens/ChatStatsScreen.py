@@ -0,0 +1,23 @@
+import json
+from AEngineApps.screen import Screen
+from flask import Response
+from screens.ChatScreen import get_sessions, get_limiter
+
+
+class ChatStatsScreen(Screen):
+    route = "/chat/stats"
+
+    def run(self):
+        from client_registry import registry
+
+        # Время до первого токена по каждому чату: гистограмма и последний ответ
+        data = {
+            chat_id: {
+                "ttft": session.ttft.snapshot(),
+                "last_ttft_ms": round(session.last_ttft * 1000.0, 1) if session.last_ttft is not None else None,
+                "history_messages": len(session.history),
+            }
+            for chat_id, session in get_sessions().items()
+        }
+        result = {"chats": data, "rate_limit": get_limiter().stats(), "http": registry.stats()}
+        return Response(json.dumps(result, ensure_ascii=False), mimetype="application/json", status=200)
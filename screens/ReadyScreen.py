@@ -0,0 +1,17 @@
+import json
+from AEngineApps.screen import Screen
+from AEngineApps.warmup import warmup
+from flask import Response, request
+
+
+class ReadyScreen(Screen):
+    route = "/ready"
+
+    def run(self):
+        # ?retry=1 — повторить загрузку упавших ресурсов
+        if request.args.get("retry"):
+            warmup.retry_failed()
+        data = warmup.status()
+        # 200 — всё загружено, 503 — ещё греется или что-то упало (подробности в resources)
+        status = 200 if data["ready"] else 503
+        return Response(json.dumps(data, ensure_ascii=False), mimetype="application/json", status=status)
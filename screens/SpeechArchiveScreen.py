@@ -0,0 +1,41 @@
+import json
+import sqlite3
+from AEngineApps.screen import Screen
+from flask import Response, request
+from screens.SpeechScreen import ARCHIVE
+
+
+class SpeechArchiveScreen(Screen):
+    route = "/speech/archive"
+
+    def run(self):
+        if ARCHIVE is None:
+            err = {"error": "archive_disabled"}
+            return Response(json.dumps(err, ensure_ascii=False), mimetype="application/json", status=404)
+
+        # ?id=<фраза> — WAV с её аудио; ?q=<запрос FTS5>[&since=&until=&client=&limit=] — поиск
+        utterance_id = request.args.get("id", type=int)
+        if utterance_id is not None:
+            wav = ARCHIVE.audio_slice(utterance_id)
+            if wav is None:
+                err = {"error": "audio_not_found"}
+                return Response(json.dumps(err, ensure_ascii=False), mimetype="application/json", status=404)
+            return Response(wav, mimetype="audio/wav")
+
+        query = request.args.get("q", "").strip()
+        if not query:
+            err = {"error": "missing_query"}
+            return Response(json.dumps(err, ensure_ascii=False), mimetype="application/json", status=400)
+        try:
+            hits = ARCHIVE.search(
+                query,
+                limit=request.args.get("limit", 50, type=int),
+                since=request.args.get("since", type=float),
+                until=request.args.get("until", type=float),
+                client=request.args.get("client"),
+            )
+        except sqlite3.OperationalError as e:
+            # Синтаксическая ошибка в запросе FTS5
+            err = {"error": f"bad_query: {e}"}
+            return Response(json.dumps(err, ensure_ascii=False), mimetype="application/json", status=400)
+        return Response(json.dumps({"results": hits}, ensure_ascii=False), mimetype="application/json", status=200)
@@ -0,0 +1,119 @@
+import json
+import threading
+import contextlib
+from typing import Dict
+from AEngineApps.screen import Screen
+from flask import Response, request
+from speech_events import format_sse
+from recognizer_pool import PoolExhausted
+from mic_stream import DEFAULT_CLIENT
+from AEngineApps.warmup import warmup, NotReady, FAILED
+from screens.SpeechScreen import get_stream
+
+# Интервал комментариев-пингов, чтобы прокси и webview не рвали тихое соединение
+HEARTBEAT_SEC = 15.0
+# Рекомендуемая клиенту задержка переподключения, мс
+RETRY_MS = 2000
+# Задержка переподключения, пока стрим прогревается, мс
+WARMING_RETRY_MS = 1000
+
+
+# Открытые подписки на клиента: вкладка после перезагрузки подключается с тем же id
+# раньше, чем сервер заметит обрыв старого соединения
+_connections: Dict[str, int] = {}
+_connections_lock = threading.Lock()
+
+
+def _connected(client_id: str):
+    with _connections_lock:
+        _connections[client_id] = _connections.get(client_id, 0) + 1
+
+
+def _disconnected(client_id: str) -> bool:
+    """True — это была последняя подписка клиента."""
+    with _connections_lock:
+        left = _connections.get(client_id, 1) - 1
+        if left > 0:
+            _connections[client_id] = left
+            return False
+        _connections.pop(client_id, None)
+        return True
+
+
+def _parse_last_id() -> int:
+    # EventSource при переподключении сам присылает Last-Event-ID
+    raw = request.headers.get("Last-Event-ID") or request.args.get("last_id") or "0"
+    try:
+        return max(0, int(raw))
+    except ValueError:
+        return 0
+
+
+class SpeechEventsScreen(Screen):
+    route = "/speech/events"
+
+    def run(self):
+        headers = {
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+        try:
+            stream = get_stream()
+        except NotReady as e:
+            if e.state == FAILED:
+                err = {"error": f"stream_start_failed: {e.error}"}
+                return Response(json.dumps(err, ensure_ascii=False), mimetype="application/json", status=500)
+            # Стрим прогревается: сообщаем прогресс и закрываем поток,
+            # EventSource сам переподключится через WARMING_RETRY_MS
+            payload = json.dumps(warmup.status(), ensure_ascii=False)
+            body = f"retry: {WARMING_RETRY_MS}\nevent: warming\ndata: {payload}\n\n"
+            return Response(body, mimetype="text/event-stream", headers=headers)
+
+        # Свой распознаватель на вкладку: ?client=<id>, иначе общая сессия по умолчанию
+        client_id = request.args.get("client") or DEFAULT_CLIENT
+        try:
+            stream.touch(client_id)
+        except PoolExhausted as e:
+            err = {"error": f"too_many_clients: {e}"}
+            return Response(json.dumps(err, ensure_ascii=False), mimetype="application/json", status=503)
+
+        hub = stream.events
+        last_id = _parse_last_id()
+        if last_id == 0:
+            # Новый клиент: старую историю не отправляем, только события с текущего момента
+            last_id = hub.last_id
+
+        def generate():
+            cursor = last_id
+            _connected(client_id)
+            try:
+                yield f"retry: {RETRY_MS}\n\n"
+                while True:
+                    events, gap = hub.wait(cursor, timeout=HEARTBEAT_SEC)
+                    # Открытое соединение — активность клиента, распознаватель не вытесняется.
+                    # Приостановленный по тишине стрим пинг не будит: это делает новый запрос
+                    with contextlib.suppress(PoolExhausted):
+                        stream.touch(client_id, resume=False)
+                    if gap:
+                        # Курсор старше истории: часть дельт потеряна, оставшиеся к состоянию
+                        # клиента не применить. Отдаём текущую гипотезу целиком и продолжаем с конца
+                        cursor = hub.last_id
+                        words = [{"w": w} for w in stream.hypothesis(client_id)]
+                        yield format_sse(cursor, "reset", {"words": words})
+                        continue
+                    if not events:
+                        yield ": ping\n\n"
+                        continue
+                    for event_id, event, data in events:
+                        cursor = event_id
+                        # Дельты текста других клиентов пропускаем, уровни общие для всех
+                        if event == "delta" and data.get("client") != client_id:
+                            continue
+                        yield format_sse(event_id, event, data)
+            finally:
+                # Клиент отключился (GeneratorExit): место в пуле освобождается сразу, а не
+                # по простою, иначе несколько перезагрузок вкладки исчерпывают пул
+                if _disconnected(client_id) and client_id != DEFAULT_CLIENT:
+                    stream.close_session(client_id)
+
+        return Response(generate(), mimetype="text/event-stream", headers=headers)
@@ -1,53 +1,150 @@
+import os
 import json
-import threading
 import time
 from AEngineApps.screen import Screen
-from flask import Response
+from AEngineApps.json_dict import JsonDict
+from AEngineApps.warmup import warmup, NotReady, FAILED
+from flask import Response, request
 from mic_stream import SpeechStream
+from audio_vad import VoiceActivityDetector
+from audio_dsp import DSPChain
+from speech_archive import SpeechArchive
+from wake_word import WakeWordGate
+from recognizer_pool import RecognizerPool, PoolExhausted
 
 # Глобальные объекты для единственного фонового стрима
 _stream = None
-_lock = threading.Lock()
-_started = False
 _last = {"text": None, "rms": 0.0, "dbfs": float("-inf")}
 _last_ts = 0.0
 
-MODEL_PATH = "vosk-model-small-ru-0.22"
+# Конфиг приложения: "speech_models" — модели распознавания {имя: путь},
+# "dsp" — ступени предобработки звука (см. audio_dsp.DSPChain.from_config),
+# "archive" — архив аудио и расшифровок (параметры SpeechArchive и "enabled")
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")
+# Модели по умолчанию, если в конфиге их нет. Несколько моделей (например, "en":
+# "vosk-model-small-en-us-0.15") распознают один захват параллельно, каждая в своём процессе
+MODELS = JsonDict(CONFIG_PATH).get("speech_models") or {"ru": "vosk-model-small-ru-0.22"}
+# Первая модель — для фразы активации
+MODEL_PATH = next(iter(MODELS.values()))
+# Сколько вкладок/клиентов могут одновременно получать независимую расшифровку
+MAX_CLIENTS = 4
+# Через сколько секунд без обращений распознаватель клиента возвращается в пул
+CLIENT_IDLE_SEC = 120.0
+# Фразы активации для режима ожидания; пустой список — полный распознаватель работает всегда
+WAKE_PHRASES = []
+# Через сколько секунд тишины после фразы активации распознаватель снова засыпает
+WAKE_SILENCE_SEC = 8.0
+# Где декодировать: "thread" — поток в процессе приложения, "process" — отдельный процесс,
+# который не конкурирует за GIL с Flask и webview
+WORKER = "process" if len(MODELS) > 1 else "thread"
+# Через сколько секунд без запросов клиентов микрофон освобождается, а распознавание
+# приостанавливается (модель остаётся в памяти); None — не приостанавливать
+SUSPEND_IDLE_SEC = 60.0
+# То же, если столько секунд не распознано ни слова
+SUSPEND_SILENCE_SEC = 300.0
+# Имя ресурса в реестре прогрева
+WARMUP_NAME = "speech_stream"
 
-def _ensure_stream_started():
-    global _stream, _started
-    with _lock:
-        if not _started:
-            if _stream is None:
-                _stream = SpeechStream(model_path=MODEL_PATH, use_partial=True)
-            # Безопасный повторный старт
-            _stream.start()
-            _started = True
+def _make_archive(config):
+    if not config or not config.get("enabled", True):
+        return None
+    params = {k: v for k, v in config.items() if k != "enabled"}
+    return SpeechArchive(**params)
 
-def _poll_once():
+# Архив доступен для поиска, даже пока микрофон не запущен
+ARCHIVE = _make_archive(JsonDict(CONFIG_PATH).get("archive"))
+
+_pool = RecognizerPool(
+    MODEL_PATH,
+    max_recognizers=MAX_CLIENTS,
+    idle_timeout=CLIENT_IDLE_SEC,
+    # В режиме процесса распознаватели живут в нём, пул только ограничивает число клиентов
+    factory=(lambda: None) if WORKER == "process" else None,
+)
+
+def _start_stream() -> SpeechStream:
+    # Загрузка модели и открытие микрофона — секунды; выполняется в потоке прогрева
+    global _stream
+    if _stream is None:
+        _stream = SpeechStream(
+            model_path=MODELS,
+            # Родная частота микрофона: многие USB-гарнитуры не умеют 16 кГц, ресэмплинг — наш
+            sample_rate=None,
+            use_partial=True,
+            vad=VoiceActivityDetector(),
+            pool=_pool,
+            # Короткий период захвата: partial-результаты появляются заметно быстрее
+            low_latency=True,
+            wake=WakeWordGate(MODEL_PATH, WAKE_PHRASES, silence_timeout=WAKE_SILENCE_SEC) if WAKE_PHRASES else None,
+            worker=WORKER,
+            idle_suspend_sec=SUSPEND_IDLE_SEC,
+            silence_suspend_sec=SUSPEND_SILENCE_SEC,
+            dsp=DSPChain.from_config(JsonDict(CONFIG_PATH).get("dsp")),
+            archive=ARCHIVE,
+        )
+    _stream.start()
+    return _stream
+
+warmup.register(WARMUP_NAME, _start_stream)
+
+def get_stream(timeout=0.0) -> SpeechStream:
+    """
+    Возвращает общий запущенный стрим. Если он ещё прогревается — ждёт не дольше timeout
+    и бросает NotReady (прогрев запускается, если App.run() его ещё не начал).
+    """
+    return warmup.get(WARMUP_NAME, timeout)
+
+def warming_response(e: NotReady) -> Response:
+    # Стрим ещё грузится: отвечаем сразу, клиент повторит запрос
+    if e.state == FAILED:
+        err = {"error": f"stream_start_failed: {e.error}"}
+        return Response(json.dumps(err, ensure_ascii=False), mimetype="application/json", status=500)
+    data = {"status": "warming", "warmup": warmup.status()}
+    return Response(json.dumps(data, ensure_ascii=False), mimetype="application/json", status=503,
+                    headers={"Retry-After": "1"})
+
+def _poll_once(client_id=None):
     global _last, _last_ts
     # Быстрый неблокирующий опрос данных
-    text, rms, dbfs = _stream.poll()  # poll() уже неблокирующий
+    text, rms, dbfs = _stream.poll(client_id)  # poll() уже неблокирующий
     # Обновляем кеш даже если текста нет — фронту нужен уровень
-    _last = {"text": text, "rms": float(rms), "dbfs": float(dbfs)}
+    _last = {"text": text, "rms": float(rms), "dbfs": float(dbfs), "vad": _stream.vad_stats()}
     _last_ts = time.time()
     return _last
 
+def _poll_since(since, client_id=None):
+    # Опрос по курсору: все события после since, ничего не сбрасывается
+    events, cursor, gap, rms, dbfs = _stream.poll_since(since, client_id)
+    return {
+        "events": events,
+        "cursor": cursor,
+        "gap": gap,
+        "rms": float(rms),
+        "dbfs": float(dbfs),
+        "vad": _stream.vad_stats(),
+    }
+
 class SpeechScreen(Screen):
     route = "/get_speech"
 
     def run(self):
-        # Стартуем стрим лениво
+        # Запрос не ждёт загрузки модели: пока стрим прогревается — статус "warming"
         try:
-            _ensure_stream_started()
-        except Exception as e:
-            # Возвращаем ошибку как JSON, но без падения сервера
-            err = {"error": f"stream_start_failed: {type(e).__name__}: {e}"}
-            return Response(json.dumps(err, ensure_ascii=False), mimetype="application/json", status=500)
+            get_stream()
+        except NotReady as e:
+            return warming_response(e)
 
         # Опрос текущего состояния
+        client_id = request.args.get("client")
+        since = request.args.get("since", type=int)
         try:
-            data = _poll_once()
+            if since is None:
+                data = _poll_once(client_id)
+            else:
+                data = _poll_since(since, client_id)
+        except PoolExhausted as e:
+            err = {"error": f"too_many_clients: {e}"}
+            return Response(json.dumps(err, ensure_ascii=False), mimetype="application/json", status=503)
         except Exception as e:
             err = {"error": f"poll_failed: {type(e).__name__}: {e}"}
             return Response(json.dumps(err, ensure_ascii=False), mimetype="application/json", status=500)
@@ -0,0 +1,21 @@
+import json
+from AEngineApps.screen import Screen
+from flask import Response, request
+from AEngineApps.warmup import NotReady
+from screens.SpeechScreen import get_stream, warming_response
+
+
+class SpeechStatsScreen(Screen):
+    route = "/speech/stats"
+
+    def run(self):
+        try:
+            stream = get_stream()
+        except NotReady as e:
+            return warming_response(e)
+
+        data = stream.stats()
+        # ?reset=1 — начать новое окно замеров, например после смены chunk_frames
+        if request.args.get("reset"):
+            stream.latency.reset()
+        return Response(json.dumps(data, ensure_ascii=False), mimetype="application/json", status=200)
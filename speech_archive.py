@@ -0,0 +1,386 @@
+"""
+Архив услышанного: аудио и финальные расшифровки на диске, только дозапись.
+
+Аудио (int16 моно с частотой распознавателя) пишется фоновым потоком в сменяющиеся
+WAV-сегменты. Захват только копирует данные в предвыделенный кольцевой буфер и
+никогда не ждёт диска: если писатель не успевает, теряются самые старые данные (overruns).
+
+Финальные расшифровки индексируются в SQLite FTS5 вместе со ссылкой на сегмент
+и смещением в нём — поиск по неделям записей и переход к нужному куску аудио
+не требуют читать файлы целиком.
+
+Структура каталога:
+    <directory>/archive.sqlite
+    <directory>/audio/2026-10-16/20261016-153000.wav
+"""
+
+import io
+import os
+import time
+import wave
+import sqlite3
+import threading
+import contextlib
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from pcm_ring import PCMRingBuffer, DROP_OLDEST
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    sample_rate INTEGER NOT NULL,
+    frames INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS segments_started ON segments(started_at);
+
+CREATE TABLE IF NOT EXISTS utterances (
+    id INTEGER PRIMARY KEY,
+    client TEXT NOT NULL,
+    text TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    ended_at REAL NOT NULL,
+    segment_id INTEGER REFERENCES segments(id),
+    offset_sec REAL,
+    model TEXT,
+    confidence REAL
+);
+CREATE INDEX IF NOT EXISTS utterances_started ON utterances(started_at);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS utterances_fts USING fts5(
+    text, content='utterances', content_rowid='id', tokenize='unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS utterances_ai AFTER INSERT ON utterances BEGIN
+    INSERT INTO utterances_fts(rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+# Запас вокруг фразы при выдаче аудио: время захвата и тайминги слов приблизительны
+SLICE_PAD_SEC = 0.5
+
+
+class SpeechArchive:
+    """
+    Использование:
+        archive = SpeechArchive("archive")
+        stream = SpeechStream(model_path=..., archive=archive)   # start/stop — вместе со стримом
+        ...
+        for hit in archive.search("погода завтра"):
+            wav = archive.audio_slice(hit["id"])
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: int = 16000,
+        segment_sec: float = 600.0,
+        buffer_sec: float = 10.0,
+        gap_sec: float = 1.0,
+        write_interval: float = 0.5,
+    ):
+        """
+        directory: каталог архива (создаётся при необходимости).
+        sample_rate: частота int16 моно, которое подаётся в write().
+        segment_sec: длительность одного WAV-сегмента.
+        buffer_sec: ёмкость буфера между захватом и писателем.
+        gap_sec: разрыв во времени захвата (например, стрим был приостановлен), после
+            которого начинается новый сегмент — иначе смещения в сегменте поплывут.
+        write_interval: как часто писатель сбрасывает накопленное на диск.
+        """
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.segment_frames = int(segment_sec * sample_rate)
+        self.gap_sec = gap_sec
+        self.write_interval = write_interval
+        self.db_path = os.path.join(directory, "archive.sqlite")
+
+        bytes_per_sec = sample_rate * 2
+        self._ring = PCMRingBuffer(int(buffer_sec * bytes_per_sec), policy=DROP_OLDEST, frame_bytes=2)
+        # Буфер чтения писателя: выделяется один раз
+        self._read_buf = bytearray(self._ring.capacity)
+        self._read_view = memoryview(self._read_buf)
+        # Финалы ждут писателя: в SQLite пишет только его поток
+        self._pending: Deque[tuple] = deque()
+        self._thread: Optional[threading.Thread] = None
+
+        # Состояние писателя
+        self._db: Optional[sqlite3.Connection] = None
+        self._wav: Optional[wave.Wave_write] = None
+        self._segment_id: Optional[int] = None
+        self._segment_started = 0.0
+        self._segment_frames = 0
+
+        self.segments_written = 0
+        self.bytes_written = 0
+        self.utterances_written = 0
+        self.last_error: Optional[str] = None
+
+        os.makedirs(directory, exist_ok=True)
+        with contextlib.closing(self._connect()) as db:
+            db.executescript(SCHEMA)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._ring.reset()
+        self._thread = threading.Thread(target=self._writer, name="SpeechArchiveWriter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Дописывает всё накопленное и закрывает сегмент."""
+        if self._thread is None:
+            return
+        self._ring.close()
+        self._thread.join(timeout=5.0)
+        self._thread = None
+
+    def write(self, data, captured_at: float):
+        """Из потока захвата: одно копирование в предвыделенный буфер, без ожидания диска."""
+        self._ring.write(data, captured_at)
+
+    def add_transcript(
+        self,
+        client: str,
+        text: str,
+        words: List[dict],
+        captured_at: float,
+        model: Optional[str] = None,
+        confidence: Optional[float] = None,
+    ):
+        """
+        Ставит финальную фразу в очередь на индексацию. Начало фразы оценивается по
+        таймингам слов: captured_at — время захвата последнего чанка, по которому получен финал.
+        """
+        ended_at = captured_at
+        starts = [w["start"] for w in words if w.get("start") is not None]
+        ends = [w["end"] for w in words if w.get("end") is not None]
+        duration = max(ends) - min(starts) if starts and ends else 0.0
+        self._pending.append((client, text, ended_at - duration, ended_at, model, confidence))
+
+    def search(
+        self,
+        query: str,
+        limit: int = 50,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        client: Optional[str] = None,
+    ) -> List[Dict[str, object]]:
+        """
+        Полнотекстовый поиск (синтаксис FTS5: слова, "фразы", префиксы слово*, OR, NOT).
+        Возвращает найденные фразы, самые свежие первыми: id, text, snippet, started_at,
+        ended_at, client, model, confidence, segment (путь к WAV), offset_sec, duration_sec.
+        """
+        sql = [
+            "SELECT u.id, u.text, snippet(utterances_fts, 0, '[', ']', '…', 12),",
+            "       u.started_at, u.ended_at, u.client, u.model, u.confidence, s.path, u.offset_sec",
+            "FROM utterances_fts JOIN utterances u ON u.id = utterances_fts.rowid",
+            "LEFT JOIN segments s ON s.id = u.segment_id",
+            "WHERE utterances_fts MATCH ?",
+        ]
+        params: list = [query]
+        if since is not None:
+            sql.append("AND u.started_at >= ?")
+            params.append(since)
+        if until is not None:
+            sql.append("AND u.started_at < ?")
+            params.append(until)
+        if client is not None:
+            sql.append("AND u.client = ?")
+            params.append(client)
+        sql.append("ORDER BY u.started_at DESC LIMIT ?")
+        params.append(limit)
+        with contextlib.closing(self._connect()) as db:
+            rows = db.execute("\n".join(sql), params).fetchall()
+        return [
+            {
+                "id": row[0],
+                "text": row[1],
+                "snippet": row[2],
+                "started_at": row[3],
+                "ended_at": row[4],
+                "client": row[5],
+                "model": row[6],
+                "confidence": row[7],
+                "segment": os.path.join(self.directory, row[8]) if row[8] else None,
+                "offset_sec": row[9],
+                "duration_sec": row[4] - row[3],
+            }
+            for row in rows
+        ]
+
+    def audio_slice(self, utterance_id: int, pad_sec: float = SLICE_PAD_SEC) -> Optional[bytes]:
+        """
+        WAV-файл (bytes) с аудио фразы и запасом pad_sec с каждой стороны. Читается только
+        нужный кусок сегмента. None — фраза не найдена или её аудио нет в архиве.
+        """
+        with contextlib.closing(self._connect()) as db:
+            row = db.execute(
+                "SELECT s.path, s.sample_rate, u.offset_sec, u.ended_at - u.started_at "
+                "FROM utterances u JOIN segments s ON s.id = u.segment_id WHERE u.id = ?",
+                (utterance_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        path, rate, offset, duration = row
+        try:
+            with wave.open(os.path.join(self.directory, path), "rb") as wf:
+                total = wf.getnframes()
+                start = max(0, int((offset - pad_sec) * rate))
+                end = min(total, int((offset + duration + pad_sec) * rate))
+                if end <= start:
+                    return None
+                wf.setpos(start)
+                pcm = wf.readframes(end - start)
+        except (OSError, EOFError, wave.Error):
+            return None
+        return _wav_bytes(pcm, rate)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "directory": self.directory,
+            "segments": self.segments_written,
+            "bytes": self.bytes_written,
+            "utterances": self.utterances_written,
+            "pending_utterances": len(self._pending),
+            "buffer": self._ring.stats(),
+            "last_error": self.last_error,
+        }
+
+    # =========================
+    # Внутренние методы
+    # =========================
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.db_path, timeout=10.0)
+        # WAL: поиск читает, пока писатель дописывает
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def _writer(self):
+        self._db = self._connect()
+        try:
+            while True:
+                n, captured_at = self._ring.readinto(self._read_view, timeout=self.write_interval)
+                if n:
+                    self._write_audio(self._read_view[:n], captured_at)
+                # Финалы — после аудио: сегмент, к которому они относятся, уже записан
+                self._write_transcripts()
+                if n == 0 and self._ring.closed and self._ring.available == 0:
+                    break
+        finally:
+            self._close_segment()
+            self._db.close()
+            self._db = None
+
+    def _write_audio(self, pcm: memoryview, captured_at: float):
+        frames = len(pcm) // 2
+        # captured_at — время последнего сэмпла; отсюда время первого
+        started_at = captured_at - frames / self.sample_rate
+        if self._wav is not None:
+            expected = self._segment_started + self._segment_frames / self.sample_rate
+            if started_at - expected > self.gap_sec or self._segment_frames >= self.segment_frames:
+                self._close_segment()
+        try:
+            if self._wav is None:
+                self._open_segment(started_at)
+            # writeframes обновляет длину в заголовке — сегмент читаем и до закрытия
+            self._wav.writeframes(pcm)
+        except OSError as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            self._close_segment()
+            return
+        self._segment_frames += frames
+        self.bytes_written += len(pcm)
+
+    def _open_segment(self, started_at: float):
+        day = time.strftime("%Y-%m-%d", time.localtime(started_at))
+        name = time.strftime("%Y%m%d-%H%M%S", time.localtime(started_at))
+        rel = os.path.join("audio", day, f"{name}.wav")
+        path = os.path.join(self.directory, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        suffix = 1
+        while os.path.exists(path):
+            rel = os.path.join("audio", day, f"{name}-{suffix}.wav")
+            path = os.path.join(self.directory, rel)
+            suffix += 1
+        wav = wave.open(path, "wb")
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(self.sample_rate)
+        self._wav = wav
+        self._segment_started = started_at
+        self._segment_frames = 0
+        with self._db:
+            cur = self._db.execute(
+                "INSERT INTO segments(path, started_at, sample_rate) VALUES (?, ?, ?)",
+                (rel, started_at, self.sample_rate),
+            )
+        self._segment_id = cur.lastrowid
+        self.segments_written += 1
+
+    def _close_segment(self):
+        if self._wav is None:
+            return
+        try:
+            # Заголовок WAV получает итоговую длину при закрытии
+            self._wav.close()
+        except OSError as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+        with self._db:
+            self._db.execute("UPDATE segments SET frames = ? WHERE id = ?", (self._segment_frames, self._segment_id))
+        self._wav = None
+        self._segment_id = None
+
+    def _write_transcripts(self):
+        if not self._pending:
+            return
+        if self._wav is not None:
+            # Длина открытого сегмента нужна поиску сегмента по времени
+            with self._db:
+                self._db.execute(
+                    "UPDATE segments SET frames = ? WHERE id = ?", (self._segment_frames, self._segment_id)
+                )
+        rows = []
+        while self._pending:
+            client, text, started_at, ended_at, model, confidence = self._pending.popleft()
+            segment_id, offset = self._locate(started_at)
+            rows.append((client, text, started_at, ended_at, segment_id, offset, model, confidence))
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO utterances(client, text, started_at, ended_at, segment_id, offset_sec, model, confidence) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        self.utterances_written += len(rows)
+
+    def _locate(self, at: float) -> Tuple[Optional[int], Optional[float]]:
+        # Последний сегмент, начавшийся не позже фразы (с запасом — фраза могла начаться чуть раньше)
+        row = self._db.execute(
+            "SELECT id, started_at, sample_rate, frames FROM segments WHERE started_at <= ? "
+            "ORDER BY started_at DESC LIMIT 1",
+            (at + SLICE_PAD_SEC,),
+        ).fetchone()
+        if row is None:
+            # Фраза началась раньше архива (например, сразу после запуска) — с начала первого сегмента
+            row = self._db.execute(
+                "SELECT id, started_at, sample_rate, frames FROM segments WHERE started_at > ? "
+                "ORDER BY started_at LIMIT 1",
+                (at,),
+            ).fetchone()
+            if row is None:
+                return None, None
+        segment_id, started, rate, frames = row
+        offset = min(max(0.0, at - started), frames / rate)
+        return segment_id, offset
+
+
+def _wav_bytes(pcm: bytes, sample_rate: int) -> bytes:
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm)
+    return out.getvalue()
@@ -0,0 +1,132 @@
+"""
+Шина событий распознавания для push-доставки клиентам (Server-Sent Events).
+Рабочий поток SpeechStream публикует события, HTTP-обработчики ждут новые
+события по курсору last_id — так переподключение с Last-Event-ID ничего не теряет,
+пока событие остаётся в ограниченной истории. Если курсор старше истории, подписчик
+узнаёт о пропуске (gap) и должен пересинхронизироваться.
+"""
+
+import json
+import threading
+from collections import deque
+from itertools import islice
+from typing import Deque, List, Optional, Tuple
+
+# (id, тип события, полезная нагрузка)
+Event = Tuple[int, str, dict]
+
+
+class EventHub:
+    def __init__(self, history: int = 512):
+        """
+        history: сколько последних событий хранить для повторной отправки
+            при переподключении клиента.
+        """
+        self._cond = threading.Condition()
+        self._events: Deque[Event] = deque(maxlen=history)
+        self._last_id = 0
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, event: str, data: dict) -> int:
+        """Добавляет событие и будит всех ожидающих подписчиков. Возвращает id события."""
+        with self._cond:
+            self._last_id += 1
+            self._events.append((self._last_id, event, data))
+            self._cond.notify_all()
+            return self._last_id
+
+    def since(self, last_id: int) -> Tuple[List[Event], bool]:
+        """
+        Возвращает (events, gap): события с id > last_id, которые ещё есть в истории;
+        gap — True, если часть событий после last_id уже вытеснена (или курсор из будущего).
+        """
+        with self._cond:
+            return self._since_locked(last_id)
+
+    def wait(self, last_id: int, timeout: Optional[float] = None) -> Tuple[List[Event], bool]:
+        """
+        Блокируется, пока не появится событие новее last_id (или не истечёт timeout).
+        Возвращает (events, gap) как since(); по таймауту — ([], False).
+        """
+        with self._cond:
+            if last_id > self._last_id:
+                # Курсор из будущего (например, сервер перезапущен) — сразу отдаём историю с пропуском
+                return self._since_locked(last_id)
+            self._cond.wait_for(lambda: self._last_id > last_id, timeout)
+            return self._since_locked(last_id)
+
+    def _since_locked(self, last_id: int) -> Tuple[List[Event], bool]:
+        gap = False
+        if last_id > self._last_id:
+            last_id, gap = 0, True
+        first_id = self._last_id - len(self._events) + 1
+        gap = gap or last_id + 1 < first_id
+        # id идут подряд, поэтому длина нужного хвоста известна заранее
+        count = min(self._last_id - last_id, len(self._events))
+        if count <= 0:
+            return [], gap
+        return list(islice(self._events, len(self._events) - count, None)), gap
+
+
+class TranscriptBuffer:
+    """
+    Ограниченный кольцевой буфер событий расшифровки (partial и final) с монотонными
+    номерами seq. Каждый клиент читает буфер со своего курсора, поэтому результаты
+    не теряются между опросами и не «воруются» другими клиентами.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._lock = threading.Lock()
+        self._events: Deque[dict] = deque(maxlen=capacity)
+        self._last_seq = 0
+
+    @property
+    def last_seq(self) -> int:
+        return self._last_seq
+
+    def append(self, client: str, kind: str, text: str, captured_at: float) -> dict:
+        """
+        Добавляет событие. kind: "partial" или "final"; captured_at — время захвата
+        (time.time()) аудио, по которому получен текст.
+        """
+        with self._lock:
+            self._last_seq += 1
+            event = {
+                "seq": self._last_seq,
+                "kind": kind,
+                "client": client,
+                "text": text,
+                "ts": captured_at,
+            }
+            self._events.append(event)
+            return event
+
+    def since(self, seq: int, client: Optional[str] = None) -> Tuple[List[dict], int, bool]:
+        """
+        Возвращает (events, cursor, gap):
+          - events: события с номером > seq (только клиента client, если он задан);
+          - cursor: значение seq для следующего вызова;
+          - gap: True, если часть событий после seq уже вытеснена из буфера.
+        """
+        with self._lock:
+            if seq > self._last_seq:
+                # Курсор из будущего (например, сервер перезапущен) — читаем с начала
+                seq = 0
+            count = min(self._last_seq - seq, len(self._events))
+            first_seq = self._last_seq - len(self._events) + 1
+            gap = seq + 1 < first_seq
+            tail = islice(self._events, len(self._events) - count, None) if count > 0 else ()
+            if client is None:
+                events = list(tail)
+            else:
+                events = [e for e in tail if e["client"] == client]
+            return events, self._last_seq, gap
+
+
+def format_sse(event_id: int, event: str, data: dict) -> str:
+    """Сериализует событие в формат text/event-stream."""
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
@@ -0,0 +1,93 @@
+// Чат с ассистентом: ответ приходит потоком (/chat/stream) и дописывается по мере генерации
+const CHAT_URL = "/chat/stream";
+// Идентификатор чата: у каждой вкладки своя история на сервере
+const CHAT_ID = (typeof crypto !== "undefined" && crypto.randomUUID)
+  ? crypto.randomUUID()
+  : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+
+let messages = document.querySelector(".messenger .messages");
+let input = document.querySelector(".messenger .text_input");
+let sendButton = document.querySelector(".messenger .sendbutton");
+let sending = false;
+
+function addMessage(kind, text) {
+  const div = document.createElement("div");
+  div.className = `message ${kind}`;
+  div.appendChild(document.createTextNode(text));
+  messages.appendChild(div);
+  messages.scrollTop = messages.scrollHeight;
+  return div;
+}
+
+// Разбор text/event-stream из тела fetch: события разделены пустой строкой
+function* parseEvents(buffer) {
+  let start = 0;
+  let end;
+  while ((end = buffer.text.indexOf("\n\n", start)) !== -1) {
+    const block = buffer.text.slice(start, end);
+    start = end + 2;
+    let event = "message";
+    let data = "";
+    for (const line of block.split("\n")) {
+      if (line.startsWith("event: ")) event = line.slice(7);
+      else if (line.startsWith("data: ")) data += line.slice(6);
+    }
+    try {
+      yield [event, JSON.parse(data)];
+    } catch (err) {
+      // Комментарии и пустые события пропускаем
+    }
+  }
+  buffer.text = buffer.text.slice(start);
+}
+
+async function sendMessage() {
+  const text = input.value.trim();
+  if (!text || sending) return;
+  sending = true;
+  input.value = "";
+  addMessage("my", text);
+  const bubble = addMessage("assistant", "");
+  // Фрагменты дописываются в текстовый узел, без перерисовки всего ответа
+  const node = bubble.firstChild;
+  try {
+    // POST, а не EventSource: тот переподключается сам и повторил бы вопрос
+    const response = await fetch(CHAT_URL, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ message: text, chat: CHAT_ID }),
+    });
+    if (!response.ok) {
+      const err = await response.json().catch(() => ({}));
+      node.appendData(`Ошибка: ${err.error ?? response.status}`);
+      return;
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const buffer = { text: "" };
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer.text += decoder.decode(value, { stream: true });
+      for (const [event, data] of parseEvents(buffer)) {
+        if (event === "delta") {
+          node.appendData(data.text);
+          messages.scrollTop = messages.scrollHeight;
+        } else if (event === "done") {
+          bubble.title = `Первый токен: ${data.ttft_ms} мс, весь ответ: ${data.total_ms} мс`;
+        } else if (event === "error") {
+          node.appendData(`${node.length ? "\n" : ""}Ошибка: ${data.error}`);
+        }
+      }
+    }
+  } catch (err) {
+    node.appendData(`Ошибка: ${err}`);
+  } finally {
+    sending = false;
+  }
+}
+
+sendButton.onclick = sendMessage;
+input.onkeydown = (e) => {
+  if (e.key === "Enter") sendMessage();
+};
@@ -17,8 +17,29 @@ let recording = false;
 let circPolling = false;
 let lastTextTs = 0;
 const NO_TEXT_TIMEOUT_MS = 3000; // 3 секунды без текста — выключаем
-const POLL_INTERVAL_MS = 120;    // частота опроса эндпоинта
-const FETCH_TIMEOUT_MS = 2500;   // таймаут одного запроса
+const WATCHDOG_INTERVAL_MS = 250; // локальная проверка таймаута тишины
+const SUSPENDED_TEXT = "Микрофон приостановлен. Нажмите, чтобы продолжить";
+// Идентификатор вкладки: у каждой свой распознаватель и своя расшифровка.
+// Хранится в sessionStorage — перезагрузка вкладки продолжает ту же сессию, а не занимает новую
+const CLIENT_ID = (() => {
+  const KEY = "speechClientId";
+  let id = null;
+  try {
+    id = sessionStorage.getItem(KEY);
+  } catch (err) {
+    // Хранилище недоступно (например, запрещено настройками) — id только на эту загрузку
+  }
+  if (!id) {
+    id = (typeof crypto !== "undefined" && crypto.randomUUID)
+      ? crypto.randomUUID()
+      : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+    try {
+      sessionStorage.setItem(KEY, id);
+    } catch (err) {}
+  }
+  return id;
+})();
+const EVENTS_URL = `/speech/events?client=${encodeURIComponent(CLIENT_ID)}`;
 
 // DOM
 let mic = document.querySelector(".mic");
@@ -67,76 +88,102 @@ let tw_target = "";   // последняя целевая строка с се
 let tw_shown = "";    // уже отображённое
 let tw_timer = null;
 const TYPE_SPEED_MS = 90;
+// Слова текущей фразы {w, start, end} и длина tw_target после каждого слова
+let tw_words = [];
+let tw_cuts = [0];
 
 // Инициализация подсказки при загрузке
 typewriter_set("Задайте вопрос...");
 
-// Поллинг эндпоинта /get_speech
-let pollTimerId = null;
-let backoffFails = 0;
+// Push-события с сервера (/speech/events) вместо поллинга /get_speech
+let eventSource = null;
+let watchdogTimerId = null;
+
+function handleLevel(data) {
+  const { rms } = data ?? {};
 
-async function fetchWithTimeout(url, init = {}, timeoutMs = FETCH_TIMEOUT_MS) {
-  let useNativeTimeout = typeof AbortSignal !== "undefined" && typeof AbortSignal.timeout === "function";
-  if (useNativeTimeout) {
-    const res = await fetch(url, { ...init, signal: AbortSignal.timeout(timeoutMs) });
-    return res;
+  // Уровень для анимации
+  if (Number.isFinite(rms)) {
+    level = Math.max(0, Math.min(1, rms / 8000)) * 100;
   } else {
-    const controller = new AbortController();
-    const tId = setTimeout(() => controller.abort(), timeoutMs);
-    try {
-      const res = await fetch(url, { ...init, signal: controller.signal });
-      return res;
-    } finally {
-      clearTimeout(tId);
-    }
+    level = 0;
   }
+
+  // Анимация частиц от уровня
+  animateParticlesFromLevel(level);
 }
 
-async function pollOnce() {
-  try {
-    const res = await fetchWithTimeout("/get_speech", { method: "GET", headers: { "accept": "application/json" } }, FETCH_TIMEOUT_MS);
-    if (!res.ok) throw new Error(`HTTP ${res.status}`);
-    const data = await res.json();
-    const { text, rms, dbfs } = data ?? {};
-
-    // Уровень для анимации
-    if (Number.isFinite(rms)) {
-      level = Math.max(0, Math.min(1, rms / 8000)) * 100;
-    } else {
-      level = 0;
-    }
+// Дельта гипотезы: keep слов предыдущей гипотезы остаются, words — новый хвост.
+// Работа на событие не зависит от длины фразы: трогаем только изменившийся хвост
+function handleDelta(data) {
+  if (!data || !Array.isArray(data.words)) return;
+  const keep = Math.min(data.keep | 0, tw_words.length);
+  if (keep === 0) {
+    // Новая фраза (или гипотеза переписана целиком) — печатаем с чистого листа
+    typewriter_truncate(0);
+    tw_target = "";
+  } else {
+    typewriter_truncate(tw_cuts[keep]);
+    tw_target = tw_target.slice(0, tw_cuts[keep]);
+  }
+  tw_words.length = keep;
+  tw_cuts.length = keep + 1;
+  for (const word of data.words) {
+    tw_target += (tw_words.length ? " " : "") + word.w;
+    tw_words.push(word);
+    tw_cuts.push(tw_target.length);
+  }
+  if (data.final) {
+    // Фраза завершена: следующая дельта начнёт новую (keep = 0)
+    tw_words = [];
+    tw_cuts = [0];
+  }
+  if (!tw_timer) typewriter_tick(); // гарантируем запуск печати
+  lastTextTs = performance.now();
+  if (!recording) activateUIColors();
+  recording = true;
+}
 
-    // Обновление цели печатной машинки: только рост, без отката
-    if (typeof text === "string") {
-      const incoming = text.trim();
-      // если пришло больше, чем уже показано — допечатываем
-      if (incoming.length > tw_shown.length) {
-        tw_target = incoming;
-        if (!tw_timer) typewriter_tick(); // гарантируем запуск печати
-        lastTextTs = performance.now();
-        if (!recording) activateUIColors();
-        recording = true;
-      } else if (incoming.length > 0) {
-        // пришёл такой же размер — просто обновим метку активности
-        lastTextTs = performance.now();
-        if (!recording) activateUIColors();
-        recording = true;
-      }
-    }
+// Сервер уже вытеснил часть событий после нашего Last-Event-ID: дельты к показанной
+// фразе не применить — пересобираем её с текущей гипотезы, дальше идут обычные дельты
+function handleReset(data) {
+  const words = data && Array.isArray(data.words) ? data.words : [];
+  tw_words = [];
+  tw_cuts = [0];
+  if (words.length) handleDelta({ keep: 0, words, final: false });
+}
 
-    // Анимация частиц от уровня
-    animateParticlesFromLevel(level);
-
-    backoffFails = 0;
-  } catch (e) {
-    backoffFails += 1;
-  } finally {
-    const since = performance.now() - lastTextTs;
-    if (recording && since >= NO_TEXT_TIMEOUT_MS) {
-      // Завершение записи: отключаем прослушивание и сбрасываем UI к заглушке
-      finishRecordingAndReset();
-      return;
-    }
+// Сервер приостановил захват (простой или долгая тишина): пинги открытой подписки его
+// не будят, поэтому закрываем её и показываем состояние. Следующий клик открывает новую
+// подписку — этот запрос и возобновляет захват
+function handleSuspend(data) {
+  if (!data || !data.suspended) return;
+  stopPollingWithMicOffAnimation();
+  resetTypewriter(SUSPENDED_TEXT);
+}
+
+// Модель ещё прогревается: сервер закрывает поток, EventSource переподключится сам
+function handleWarming(data) {
+  lastTextTs = performance.now(); // ожидание загрузки — не тишина
+  if (!tw_shown) {
+    const pct = data && typeof data.progress === "number" ? Math.round(data.progress * 100) : 0;
+    label.innerText = `Загрузка модели... ${pct}%`;
+  }
+}
+
+function parseEvent(e) {
+  try {
+    return JSON.parse(e.data);
+  } catch (err) {
+    return null;
+  }
+}
+
+function checkSilenceTimeout() {
+  const since = performance.now() - lastTextTs;
+  if (recording && since >= NO_TEXT_TIMEOUT_MS) {
+    // Завершение записи: отключаем прослушивание и сбрасываем UI к заглушке
+    finishRecordingAndReset();
   }
 }
 
@@ -147,15 +194,26 @@ function startPolling() {
   recording = true;
   lastTextTs = performance.now();
   activateUIColors();
-  pollTimerId = setInterval(pollOnce, POLL_INTERVAL_MS);
+  // EventSource сам переподключается и присылает Last-Event-ID
+  eventSource = new EventSource(EVENTS_URL);
+  eventSource.addEventListener("level", (e) => handleLevel(parseEvent(e)));
+  eventSource.addEventListener("delta", (e) => handleDelta(parseEvent(e)));
+  eventSource.addEventListener("warming", (e) => handleWarming(parseEvent(e)));
+  eventSource.addEventListener("reset", (e) => handleReset(parseEvent(e)));
+  eventSource.addEventListener("suspend", (e) => handleSuspend(parseEvent(e)));
+  watchdogTimerId = setInterval(checkSilenceTimeout, WATCHDOG_INTERVAL_MS);
 }
 
 function stopPolling() {
   circPolling = false;
   recording = false;
-  if (pollTimerId) {
-    clearInterval(pollTimerId);
-    pollTimerId = null;
+  if (eventSource) {
+    eventSource.close();
+    eventSource = null;
+  }
+  if (watchdogTimerId) {
+    clearInterval(watchdogTimerId);
+    watchdogTimerId = null;
   }
 }
 
@@ -182,6 +240,8 @@ function resetTypewriter(placeholder) {
   }
   tw_target = String(placeholder ?? "");
   tw_shown = "";
+  tw_words = [];
+  tw_cuts = [0];
   label.innerText = "";
   typewriter_tick();
 }
@@ -195,6 +255,8 @@ function resetSession() {
   }
   tw_target = "";
   tw_shown = "";
+  tw_words = [];
+  tw_cuts = [0];
   label.innerText = "";
   level = 0;
   lastTextTs = 0;
@@ -282,10 +344,29 @@ function typewriter_set(text) {
   typewriter_tick();
 }
 
+// Текстовый узел метки: символы дописываются в него, без перерисовки всей строки
+function typewriter_node() {
+  const node = label.firstChild;
+  // Метку мог переписать кто-то ещё (например, статус загрузки) — восстанавливаем
+  if (!node || node.nodeType !== Node.TEXT_NODE || node.length !== tw_shown.length || node.nextSibling) {
+    label.textContent = tw_shown;
+  }
+  return label.firstChild || label.appendChild(document.createTextNode(""));
+}
+
+// Откат показанного текста до length символов (изменился нестабильный хвост)
+function typewriter_truncate(length) {
+  if (tw_shown.length > length) {
+    typewriter_node().deleteData(length, tw_shown.length - length);
+    tw_shown = tw_shown.slice(0, length);
+  }
+}
+
 function typewriter_tick() {
   if (tw_shown.length < tw_target.length) {
-    tw_shown = tw_target.slice(0, tw_shown.length + 1);
-    label.innerText = tw_shown;
+    const ch = tw_target[tw_shown.length];
+    typewriter_node().appendData(ch);
+    tw_shown += ch;
     tw_timer = setTimeout(typewriter_tick, TYPE_SPEED_MS);
     return;
   }
@@ -299,7 +380,7 @@ function typewriter_tick() {
 circ_out.onmouseover = () => { scaled = true; };
 circ_out.onmouseleave = () => { scaled = false; };
 
-// Клик по кругу: старт/стоп опроса эндпоинта
+// Клик по кругу: старт/стоп подписки на события
 circ_out.onclick = () => {
   if (!circPolling) {
     startPolling();          // старт новой сессии: заглушка показана, затем поступают partial’ы
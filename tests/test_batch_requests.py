@@ -0,0 +1,44 @@
+"""
+Сценарии benchmarks/bench_batch_requests.py против заглушки API: без сети,
+токена и отдельного HTTP-пакета — заглушка строится через классы самого SDK.
+
+Запуск из корня проекта:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import asyncio
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+pytest.importorskip("openai")
+pytest.importorskip("tiktoken")
+
+import bench_batch_requests as bench  # noqa: E402
+
+DELAY = 0.05
+
+
+def test_concurrency():
+    assert asyncio.run(bench.scenario_concurrency(20, 4, DELAY))
+
+
+def test_priority():
+    assert asyncio.run(bench.scenario_priority(6, DELAY))
+
+
+def test_retry_after():
+    assert asyncio.run(bench.scenario_retry_after(20, 4, DELAY, 300.0))
+
+
+def test_refund():
+    assert asyncio.run(bench.scenario_refund(DELAY))
+
+
+def test_cancel():
+    assert asyncio.run(bench.scenario_cancel(20, 4, DELAY))
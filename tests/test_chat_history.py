@@ -0,0 +1,54 @@
+"""
+ChatSession.history — ChatHistory, но читается как прежний список словарей.
+
+Запуск из корня проекта:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import json
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+pytest.importorskip("openai")
+pytest.importorskip("tiktoken")
+
+from ai import ChatSession  # noqa: E402
+
+
+def make_session() -> ChatSession:
+    return ChatSession(github_token="stub", system_prompt="системный", max_history_tokens=10 ** 6)
+
+
+def test_history_reads_like_list():
+    session = make_session()
+    session.history.append({"role": "user", "content": "привет"})
+    session.history.append("assistant", "здравствуйте")
+
+    expected = [
+        {"role": "system", "content": "системный"},
+        {"role": "user", "content": "привет"},
+        {"role": "assistant", "content": "здравствуйте"},
+    ]
+    assert len(session.history) == 3
+    assert list(session.history) == expected
+    assert session.history[0] == expected[0]
+    assert session.history[-1]["content"] == "здравствуйте"
+    assert session.history[1:] == expected[1:]
+    assert session.history == expected
+    assert json.loads(json.dumps(session.history.messages())) == expected
+    with pytest.raises(IndexError):
+        session.history[3]
+
+
+def test_history_assignment_loads_messages():
+    session = make_session()
+    session.history = [{"role": "system", "content": "другой"}, {"role": "user", "content": "вопрос"}]
+
+    assert session.history.messages() == session.get_history()
+    assert session.history.system.content == "другой"
+    assert session.get_token_count() == session.count_tokens(session.get_history())
@@ -0,0 +1,112 @@
+"""
+Предобработка (раздел "dsp" в config.json) не должна открывать VAD на тишине:
+AGC поднимает шум комнаты до уровня речи, поэтому уровень и VAD считаются
+по исходному звуку, а ступени DSP применяются только к аудио для распознавателя.
+
+Запуск из корня проекта:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import json
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("vosk")
+
+from audio_dsp import DSPChain  # noqa: E402
+from audio_sources import GeneratorSource  # noqa: E402
+from audio_vad import VoiceActivityDetector  # noqa: E402
+from mic_stream import DEFAULT_CLIENT, SpeechStream  # noqa: E402
+from recognizer_pool import RecognizerPool  # noqa: E402
+
+MODEL_PATH = os.path.join(ROOT, "vosk-model-small-ru-0.22")
+RATE = 16000
+CHUNK_FRAMES = 1600
+
+
+def default_dsp() -> DSPChain:
+    with open(os.path.join(ROOT, "config.json"), encoding="utf-8") as f:
+        return DSPChain.from_config(json.load(f).get("dsp"), RATE)
+
+
+def noise(seconds: float, dbfs: float, seed: int = 0) -> list:
+    """Белый шум с заданным RMS-уровнем, чанками по CHUNK_FRAMES."""
+    rng = np.random.default_rng(seed)
+    x = rng.normal(0.0, 32768.0 * 10 ** (dbfs / 20.0), int(seconds * RATE))
+    raw = np.clip(np.rint(x), -32768, 32767).astype("<i2").tobytes()
+    step = CHUNK_FRAMES * 2
+    return [raw[i:i + step] for i in range(0, len(raw), step)]
+
+
+class CountingRecognizer:
+    """Распознаватель без модели: считает поданное аудио и ничего не распознаёт."""
+
+    def __init__(self):
+        self.accepted = 0
+
+    def AcceptWaveform(self, data) -> bool:
+        self.accepted += len(data)
+        return False
+
+    def Result(self) -> str:
+        return '{"text": ""}'
+
+    def PartialResult(self) -> str:
+        return '{"partial": ""}'
+
+    def FinalResult(self) -> str:
+        return '{"text": ""}'
+
+    def Reset(self):
+        pass
+
+
+def run_stream(chunks: list):
+    rec = CountingRecognizer()
+    pool = RecognizerPool(MODEL_PATH, RATE, max_recognizers=1, idle_timeout=None, factory=lambda: rec)
+    stream = SpeechStream(
+        model_path=MODEL_PATH,
+        pool=pool,
+        use_partial=True,
+        source=GeneratorSource(chunks, RATE, 1, CHUNK_FRAMES, speed=None),
+        vad=VoiceActivityDetector(sample_rate=RATE),
+        dsp=default_dsp(),
+        level_interval=float("inf"),
+    )
+    # С внешним пулом сессия по умолчанию не открывается сама
+    stream.open_session(DEFAULT_CLIENT)
+    stream.start()
+    try:
+        assert stream.wait_finished(timeout=60.0)
+    finally:
+        stream.stop()
+    return stream, rec
+
+
+def test_room_noise_stays_gated_with_default_dsp():
+    stream, rec = run_stream(noise(5.0, -48.0))
+
+    vad = stream.vad_stats()
+    assert vad["chunks_total"] > 0
+    assert vad["chunks_decoded"] == 0
+    assert rec.accepted == 0
+    # Уровень для интерфейса — исходный, без усиления AGC
+    assert stream.poll()[2] == pytest.approx(-48.0, abs=1.5)
+
+
+def test_loud_signal_reaches_recognizer_after_dsp():
+    # Тон 300 Гц на -20 dBFS — VAD открыт, распознаватель получает обработанное аудио
+    t = np.arange(int(2.0 * RATE)) / RATE
+    x = 32768.0 * 10 ** (-20.0 / 20.0) * np.sqrt(2.0) * np.sin(2 * np.pi * 300.0 * t)
+    raw = np.clip(np.rint(x), -32768, 32767).astype("<i2").tobytes()
+    step = CHUNK_FRAMES * 2
+    stream, rec = run_stream([raw[i:i + step] for i in range(0, len(raw), step)])
+
+    assert stream.vad_stats()["chunks_decoded"] > 0
+    assert rec.accepted > 0
@@ -0,0 +1,53 @@
+"""
+ResponseCache: close() во время обращений других потоков не должен ронять get/put.
+
+Запуск из корня проекта:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import time
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from response_cache import ResponseCache  # noqa: E402
+
+THREADS = 4
+
+
+def test_close_during_concurrent_access(tmp_path):
+    # Память на одну запись: почти каждый get идёт на диск
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"), max_entries=1)
+    errors = []
+    stop = threading.Event()
+
+    def worker(n: int):
+        i = 0
+        try:
+            while not stop.is_set():
+                key = f"{n}-{i % 50}"
+                cache.put(key, "ответ")
+                cache.get(f"{n}-{(i + 25) % 50}")
+                cache.stats()
+                i += 1
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    cache.close()
+    time.sleep(0.1)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    # После закрытия кэш работает только в памяти
+    cache.put("после", "ответ")
+    assert cache.get("после") == "ответ"
+    assert "disk_entries" not in cache.stats()
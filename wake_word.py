@@ -0,0 +1,187 @@
+"""
+Режим ожидания по фразе активации (wake word).
+
+Пока ассистент простаивает, аудио декодирует только дешёвый KaldiRecognizer
+с крошечной JSON-грамматикой из фраз активации. Полный распознаватель с большим
+словарём включается после фразы активации и выключается после заданного времени
+тишины. Аудио незадолго до срабатывания (вместе с самой фразой) отдаётся полному
+распознавателю, чтобы не потерять первые слова.
+"""
+
+import json
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from vosk import KaldiRecognizer
+
+from recognizer_pool import get_model
+
+# Слово грамматики Vosk для всего, что не входит в список фраз
+UNKNOWN = "[unk]"
+
+
+class WakeWordGate:
+    """
+    Шлюз перед полным распознавателем: в ожидании аудио видит только грамматический
+    распознаватель фраз активации, после срабатывания — полный, пока не наступит тишина.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        phrases: List[str],
+        sample_rate: int = 16000,
+        channels: int = 1,
+        silence_timeout: float = 8.0,
+        energy_threshold_dbfs: float = -45.0,
+        preroll_ms: int = 1500,
+        trigger_on_partial: bool = True,
+    ):
+        """
+        model_path: модель Vosk (та же, что у полного распознавателя; загружается один раз на процесс).
+        phrases: фразы активации, например ["привет ассистент", "окей компьютер"].
+        sample_rate, channels: формат входного int16 PCM.
+        silence_timeout: через сколько секунд тишины полный распознаватель выключается.
+        energy_threshold_dbfs: уровень, ниже которого чанк считается тишиной.
+        preroll_ms: сколько аудио до срабатывания отдаётся полному распознавателю.
+        trigger_on_partial: срабатывать уже по частичной гипотезе — быстрее, но чуть
+            больше ложных срабатываний, чем по финальной.
+        """
+        self.phrases = [" ".join(p.lower().split()) for p in phrases if p.strip()]
+        if not self.phrases:
+            raise ValueError("Нужна хотя бы одна фраза активации")
+        self.model_path = model_path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.silence_timeout = silence_timeout
+        self.energy_threshold_dbfs = energy_threshold_dbfs
+        self.preroll_ms = preroll_ms
+        self.trigger_on_partial = trigger_on_partial
+
+        self._bytes_per_ms = sample_rate * channels * 2 / 1000.0
+        self._rec: Optional[KaldiRecognizer] = None
+        self._preroll: Deque[bytes] = deque()
+        self._preroll_bytes = 0
+        self._awake = False
+        self._silence_ms = 0.0
+
+        self.last_phrase: Optional[str] = None
+        self.wakeups = 0
+        self.chunks_standby = 0
+        self.chunks_awake = 0
+        # Суммарное время грамматического распознавателя, с
+        self.standby_decode_sec = 0.0
+
+    @property
+    def awake(self) -> bool:
+        return self._awake
+
+    def feed(self, data: bytes, dbfs: float) -> Tuple[List[bytes], bool]:
+        """
+        Принимает очередной чанк и его уровень (dBFS).
+        Возвращает (replay, fell_asleep):
+          - replay: в момент срабатывания — предзапись вместе с текущим чанком,
+            которую нужно сразу отдать полному распознавателю; иначе пусто;
+          - fell_asleep: True, если по тишине только что вернулись в ожидание
+            и фразу полного распознавателя пора завершить.
+        Пока awake, текущий чанк в replay не входит — его обрабатывают как обычно.
+        """
+        if self._awake:
+            self.chunks_awake += 1
+            if dbfs >= self.energy_threshold_dbfs:
+                self._silence_ms = 0.0
+                return [], False
+            self._silence_ms += len(data) / self._bytes_per_ms
+            if self._silence_ms >= self.silence_timeout * 1000.0:
+                self.sleep()
+                return [], True
+            return [], False
+
+        self.chunks_standby += 1
+        self._push_preroll(data)
+        phrase = self._detect(data)
+        if phrase is None:
+            return [], False
+
+        self._awake = True
+        self._silence_ms = 0.0
+        self.last_phrase = phrase
+        self.wakeups += 1
+        replay = list(self._preroll) or [data]
+        self._preroll.clear()
+        self._preroll_bytes = 0
+        return replay, False
+
+    def sleep(self):
+        """Возвращает в режим ожидания."""
+        self._awake = False
+        self._silence_ms = 0.0
+        if self._rec is not None:
+            self._rec.Reset()
+
+    def reset(self):
+        """Сбрасывает состояние (но не статистику)."""
+        self.sleep()
+        self._preroll.clear()
+        self._preroll_bytes = 0
+
+    def stats(self) -> Dict[str, object]:
+        total = self.chunks_standby + self.chunks_awake
+        return {
+            "awake": self._awake,
+            "phrases": self.phrases,
+            "last_phrase": self.last_phrase,
+            "wakeups": self.wakeups,
+            "chunks_standby": self.chunks_standby,
+            "chunks_awake": self.chunks_awake,
+            "standby_ratio": (self.chunks_standby / total) if total else 0.0,
+            "standby_decode_ms_per_chunk": (
+                self.standby_decode_sec / self.chunks_standby * 1000.0 if self.chunks_standby else 0.0
+            ),
+        }
+
+    # =========================
+    # Внутренние методы
+    # =========================
+
+    def _recognizer(self) -> KaldiRecognizer:
+        if self._rec is None:
+            # Грамматика ограничивает поиск фразами активации — декодирование намного дешевле
+            grammar = json.dumps(self.phrases + [UNKNOWN], ensure_ascii=False)
+            self._rec = KaldiRecognizer(get_model(self.model_path), self.sample_rate, grammar)
+        return self._rec
+
+    def _detect(self, data: bytes) -> Optional[str]:
+        rec = self._recognizer()
+        t0 = time.perf_counter()
+        if rec.AcceptWaveform(data):
+            text = json.loads(rec.Result()).get("text", "")
+        elif self.trigger_on_partial:
+            text = json.loads(rec.PartialResult()).get("partial", "")
+        else:
+            text = ""
+        self.standby_decode_sec += time.perf_counter() - t0
+
+        phrase = self._match(text)
+        if phrase is not None:
+            # Следующее ожидание начнётся с чистого распознавателя
+            rec.Reset()
+        return phrase
+
+    def _match(self, text: str) -> Optional[str]:
+        padded = f" {text} "
+        for phrase in self.phrases:
+            if f" {phrase} " in padded:
+                return phrase
+        return None
+
+    def _push_preroll(self, data: bytes):
+        if self.preroll_ms <= 0:
+            return
+        self._preroll.append(data)
+        self._preroll_bytes += len(data)
+        limit = self.preroll_ms * self._bytes_per_ms
+        # Оставляем хотя бы последний чанк, даже если он длиннее предзаписи
+        while len(self._preroll) > 1 and self._preroll_bytes - len(self._preroll[0]) >= limit:
+            self._preroll_bytes -= len(self._preroll.popleft())